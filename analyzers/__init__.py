@@ -0,0 +1,121 @@
+import hashlib
+import os
+from functools import lru_cache
+from typing import Any, Dict, List
+from core.engine import Engine
+from core.types import Issue
+from analyzers.complexity import ComplexityRule
+from analyzers.patterns import PatternRule
+from analyzers.security import SecurityRule
+from analyzers.unused import UnusedRule
+from analyzers.performance import PerformanceRule
+from analyzers.logic import LogicRule
+from analyzers.style import StyleRule
+
+# Registration order is output order.
+DEFAULT_RULES = [
+    ComplexityRule,
+    PatternRule,
+    SecurityRule,
+    UnusedRule,
+    PerformanceRule,
+    LogicRule,
+    StyleRule,
+]
+
+ENGINE = Engine(DEFAULT_RULES)
+
+# Profile fingerprint -> engine compiled for it
+_ENGINES: Dict[str, Engine] = {"": ENGINE}
+
+# Recomputes metrics for functions whose issues came from the cache
+METRICS_ENGINE = Engine([ComplexityRule])
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_CORE_DIR = os.path.join(os.path.dirname(_HERE), "core")
+_CORE_MODULES = (
+    "config.py", "engine.py", "parser.py", "project.py", "snippets.py", "symbols.py",
+    "taint.py", "types.py",
+)
+
+
+@lru_cache(maxsize=None)
+def ruleset_version() -> str:
+    """
+    Fingerprint of the code that decides which issues a file produces.
+    Any edit to an analyzer, the engine or the parser changes it, which
+    invalidates cached results without a manual version bump.
+    """
+    paths = sorted(
+        os.path.join(_HERE, name) for name in os.listdir(_HERE)
+        if name.endswith(".py")
+    )
+    paths += [os.path.join(_CORE_DIR, name) for name in _CORE_MODULES]
+
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _tuned(rule_cls, values: Dict[str, Any]):
+    # A subclass carrying the configured settings as class attributes,
+    # so rules read them exactly as they read their defaults.
+    attrs = {}
+    for name, value in values.items():
+        default = getattr(rule_cls, name)
+        if isinstance(default, (set, frozenset)):
+            value = set(value)
+        elif isinstance(default, tuple):
+            value = tuple(value)
+        attrs[name] = value
+    return type(rule_cls.__name__, (rule_cls,), attrs)
+
+
+def compile_engine(profile) -> Engine:
+    """
+    The engine for a config profile (core.config.Profile): only enabled
+    analyzers are registered, with their configured settings. Built once
+    per distinct profile and process.
+    """
+    engine = _ENGINES.get(profile.fingerprint)
+    if engine is None:
+        rules = []
+        for rule_cls in DEFAULT_RULES:
+            if not profile.enabled(rule_cls.name):
+                continue
+            values = profile.settings.get(rule_cls.name)
+            rules.append(_tuned(rule_cls, values) if values else rule_cls)
+        engine = _ENGINES[profile.fingerprint] = Engine(rules)
+    return engine
+
+
+def run_analyzers(parsed, engine: Engine = ENGINE) -> List[Issue]:
+    """
+    Run every registered rule over the module scope and each parsed
+    function, in a single walk per unit.
+    """
+    issues: List[Issue] = list(engine.run(parsed["module"]))
+
+    for fn in parsed["functions"]:
+        issues.extend(engine.run(fn))
+
+    return issues
+
+
+def measure(function) -> Dict[str, Any]:
+    """
+    Complexity metrics of one function. Functions analyzed by the full
+    engine already carry them; others get a complexity-only walk.
+    """
+    if function.metrics is None:
+        METRICS_ENGINE.run(function)
+    return function.metrics
+
+
+def function_metrics(parsed) -> List[Dict[str, Any]]:
+    """
+    Complexity metrics for each parsed function, in source order.
+    """
+    return [measure(fn) for fn in parsed["functions"]]
@@ -1,77 +1,343 @@
 import ast
-from typing import List
+from typing import Any, Dict, List, Set
+from core.engine import Engine, Rule
+from core.taint import dotted_name
 from core.types import Issue
 
-class ComplexityVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.current_depth = 0
+# Above these a function is reported as hard to follow / test.
+CYCLOMATIC_LIMIT = 10
+COGNITIVE_LIMIT = 15
+
+# Structural nesting at which `deep_nesting` is reported
+NESTING_LIMIT = 4
+
+# Decorators that turn tree recursion into one call per distinct input
+MEMOIZERS = {"lru_cache", "cache", "functools.lru_cache", "functools.cache"}
+
+
+def big_o(loop_depth: int, recursion: int) -> str:
+    """
+    Upper-bound estimate of a function's running time in its input
+    size, from loop nesting and the number of self-recursive calls.
+    """
+    if recursion >= 2:
+        # Tree recursion: exponential unless the input shrinks
+        # geometrically or the results are memoized.
+        return "O(2^n)"
+    power = loop_depth + recursion
+    if power == 0:
+        return "O(1)"
+    if power == 1:
+        return "O(n)"
+    return f"O(n^{power})"
+
+
+class ComplexityRule(Rule):
+    """
+    Per-function complexity metrics, computed in the engine's walk:
+
+    - cyclomatic: McCabe's count of independent paths (1 + decisions)
+    - cognitive: SonarSource-style cognitive complexity, where nested
+      structures cost more than flat ones
+    - nesting: deepest structural block nesting (if/loop/try/with/match;
+      an `elif` chain counts once)
+    - loop_depth: deepest loop nest, comprehension generators included
+      and loop headers (the iterable of a `for`) counted outside the loop
+    - recursion: calls the function makes to itself
+
+    The metrics are left on the unit as `function.metrics`; the usual
+    issues are reported from them.
+    """
+
+    name = "complexity"
+    settings = ("cyclomatic_limit", "cognitive_limit", "nesting_limit")
+
+    cyclomatic_limit = CYCLOMATIC_LIMIT
+    cognitive_limit = COGNITIVE_LIMIT
+    nesting_limit = NESTING_LIMIT
+
+    def __init__(self, function):
+        super().__init__(function)
+        self.cyclomatic = 1
+        self.cognitive = 0
+        self.recursion = 0
+
+        # Cognitive nesting: what each structure's increment is scaled by
+        self._nesting = 0
+        # Structural block nesting
+        self._depth = 0
         self.max_depth = 0
-        self.loop_count = 0
+        # Loop depth of the code being walked, innermost last
+        self._loops: List[int] = [0]
+        self.loop_depth = 0
+        # Loop header nodes -> loop depth they run at
+        self._headers: Dict[ast.AST, int] = {}
+        self._elifs: Set[ast.If] = set()
+
+    # ---------- Nesting ----------
+
+    def _block(self):
+        self._depth += 1
+        self.max_depth = max(self.max_depth, self._depth)
 
-    # ---------- Loop tracking ----------
+    def _unblock(self, node=None):
+        self._depth -= 1
+
+    def _nest(self, node=None):
+        self._nesting += 1
+
+    def _unnest(self, node=None):
+        self._nesting -= 1
+
+    def _structure(self):
+        # A flow break costs 1, plus 1 for each structure it sits in.
+        self.cyclomatic += 1
+        self.cognitive += 1 + self._nesting
+
+    # ---------- Loops ----------
+
+    def _enter_loop(self, node: ast.AST, levels: int, header):
+        base = self._headers.get(node, self._loops[-1])
+        self._loops.append(base + levels)
+        self.loop_depth = max(self.loop_depth, base + levels)
+        if header is not None:
+            for child in ast.walk(header):
+                self._headers[child] = base
+
+    def _leave_loop(self, node=None):
+        self._loops.pop()
 
     def visit_For(self, node: ast.For):
-        self._enter_loop(node)
+        self._structure()
+        self._enter_loop(node, 1, node.iter)
+        self._block()
+        self._nest()
 
     def visit_While(self, node: ast.While):
-        self._enter_loop(node)
+        self._structure()
+        self._enter_loop(node, 1, None)
+        self._block()
+        self._nest()
+
+    visit_AsyncFor = visit_For
+
+    def leave_For(self, node):
+        self._leave_loop()
+        self._unblock()
+        self._unnest()
+
+    leave_AsyncFor = leave_For
+    leave_While = leave_For
 
-    def _enter_loop(self, node):
-        self.loop_count += 1
-        self.current_depth += 1
-        self.max_depth = max(self.max_depth, self.current_depth)
-        self.generic_visit(node)
-        self.current_depth -= 1
+    def _visit_comprehension(self, node):
+        # Each `for` clause is a loop level; the first clause's iterable
+        # is evaluated once.
+        self.cognitive += 1
+        self._enter_loop(node, len(node.generators), node.generators[0].iter)
 
-    # ---------- Conditionals (affect complexity but not big-O) ----------
+    visit_ListComp = _visit_comprehension
+    visit_SetComp = _visit_comprehension
+    visit_DictComp = _visit_comprehension
+    visit_GeneratorExp = _visit_comprehension
+
+    leave_ListComp = _leave_loop
+    leave_SetComp = _leave_loop
+    leave_DictComp = _leave_loop
+    leave_GeneratorExp = _leave_loop
+
+    def visit_comprehension(self, node: ast.comprehension):
+        self.cyclomatic += 1 + len(node.ifs)
+
+    # ---------- Branches ----------
 
     def visit_If(self, node: ast.If):
-        self.current_depth += 1
-        self.max_depth = max(self.max_depth, self.current_depth)
-        self.generic_visit(node)
-        self.current_depth -= 1
+        orelse = node.orelse
+        if len(orelse) == 1 and isinstance(orelse[0], ast.If):
+            self._elifs.add(orelse[0])
+        elif orelse:
+            # else
+            self.cognitive += 1
 
+        if node in self._elifs:
+            # Part of the chain above: no extra nesting
+            self.cyclomatic += 1
+            self.cognitive += 1
+            return
+        self._structure()
+        self._block()
+        self._nest()
 
-def analyze(function) -> List[Issue]:
-    """
-    Analyze a ParsedFunction for complexity issues.
-    """
-    visitor = ComplexityVisitor()
-    visitor.visit(function.body)
-
-    issues: List[Issue] = []
-
-    # Heuristic: nested loops → likely O(n^2) or worse
-    if visitor.max_depth >= 2 and visitor.loop_count >= 2:
-        issues.append(
-            Issue(
-                line=function.line_no,
-                category="complexity",
-                rule="nested_loops",
-                message=(
+    def leave_If(self, node: ast.If):
+        if node in self._elifs:
+            return
+        self._unblock()
+        self._unnest()
+
+    def visit_IfExp(self, node: ast.IfExp):
+        self._structure()
+        self._nest()
+
+    leave_IfExp = _unnest
+
+    def visit_BoolOp(self, node: ast.BoolOp):
+        # Each extra operand is a short-circuit branch; a run of the
+        # same operator is one cognitive increment.
+        self.cyclomatic += len(node.values) - 1
+        self.cognitive += 1
+
+    def visit_Match(self, node: ast.Match):
+        self.cognitive += 1 + self._nesting
+        self._block()
+        self._nest()
+
+    def leave_Match(self, node: ast.Match):
+        self._unblock()
+        self._unnest()
+
+    def visit_match_case(self, node: ast.match_case):
+        wildcard = isinstance(node.pattern, ast.MatchAs) and node.pattern.pattern is None
+        if not wildcard or node.guard is not None:
+            self.cyclomatic += 1
+
+    # ---------- Exceptions and context managers ----------
+
+    def visit_Try(self, node: ast.Try):
+        self._block()
+
+    visit_TryStar = visit_Try
+    leave_Try = _unblock
+    leave_TryStar = _unblock
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):
+        self._structure()
+        self._nest()
+
+    leave_ExceptHandler = _unnest
+
+    def visit_With(self, node: ast.With):
+        self._block()
+
+    visit_AsyncWith = visit_With
+    leave_With = _unblock
+    leave_AsyncWith = _unblock
+
+    # ---------- Lambdas and recursion ----------
+
+    visit_Lambda = _nest
+    leave_Lambda = _unnest
+
+    def visit_Call(self, node: ast.Call):
+        name = self.function.name
+        func = node.func
+        if (
+            isinstance(func, ast.Name) and func.id == name
+            or isinstance(func, ast.Attribute) and func.attr == name
+            and isinstance(func.value, ast.Name) and func.value.id in ("self", "cls")
+        ):
+            self.recursion += 1
+            self.cognitive += 1
+
+    # ---------- Results ----------
+
+    def _memoized(self) -> bool:
+        for decorator in getattr(self.function.body, "decorator_list", []):
+            if isinstance(decorator, ast.Call):
+                decorator = decorator.func
+            if dotted_name(decorator) in MEMOIZERS:
+                return True
+        return False
+
+    def metrics(self) -> Dict[str, Any]:
+        function = self.function
+        recursion = self.recursion
+        if recursion > 1 and self._memoized():
+            recursion = 1
+        names = []
+        unit = function
+        while unit is not None:
+            names.append(unit.name)
+            unit = unit.parent
+        return {
+            # Nested functions are named after the functions around them.
+            "name": ".".join(reversed(names)),
+            "line": function.line_no,
+            "end_line": function.end_line_no,
+            "cyclomatic": self.cyclomatic,
+            "cognitive": self.cognitive,
+            "nesting": self.max_depth,
+            "loop_depth": self.loop_depth,
+            "recursion": self.recursion,
+            "big_o": big_o(self.loop_depth, recursion),
+        }
+
+    def _issue(self, rule: str, message: str, severity: int) -> Issue:
+        function = self.function
+        return Issue(
+            line=function.line_no,
+            category="complexity",
+            rule=rule,
+            message=message,
+            snippet=function.snippet,
+            severity=severity,
+            col=function.col,
+            end_line=function.line_no,
+            end_col=function.name_end,
+        )
+
+    def finalize(self) -> List[Issue]:
+        function = self.function
+        metrics = function.metrics = self.metrics()
+
+        # Loops nested in loops (not merely following each other)
+        if self.loop_depth >= 2:
+            self.issues.append(
+                self._issue(
+                    "nested_loops",
                     f"Function '{function.name}' contains nested loops "
-                    f"(max depth = {visitor.max_depth}). "
-                    "This may lead to quadratic or worse time complexity."
-                ),
-                code_snippet=function.source,
-                severity=min(visitor.max_depth, 5),
+                    f"(max depth = {self.loop_depth}). "
+                    f"This may lead to {metrics['big_o']} or worse time complexity.",
+                    min(self.loop_depth, 5),
+                )
             )
-        )
 
-    # Heuristic: very deep nesting hurts readability
-    if visitor.max_depth >= 4:
-        issues.append(
-            Issue(
-                line=function.line_no,
-                category="complexity",
-                rule="deep_nesting",
-                message=(
+        # Very deep nesting hurts readability
+        if self.max_depth >= self.nesting_limit:
+            self.issues.append(
+                self._issue(
+                    "deep_nesting",
                     f"Function '{function.name}' has deep control-flow nesting "
-                    f"(depth = {visitor.max_depth}). Consider refactoring."
-                ),
-                code_snippet=function.source,
-                severity=3,
+                    f"(depth = {self.max_depth}). Consider refactoring.",
+                    3,
+                )
+            )
+
+        if self.cyclomatic > self.cyclomatic_limit:
+            self.issues.append(
+                self._issue(
+                    "high_cyclomatic_complexity",
+                    f"Function '{function.name}' has cyclomatic complexity "
+                    f"{self.cyclomatic} (limit {self.cyclomatic_limit}). "
+                    "It has too many independent paths to test thoroughly.",
+                    4 if self.cyclomatic > 2 * self.cyclomatic_limit else 3,
+                )
             )
-        )
 
-    return issues
+        if self.cognitive > self.cognitive_limit:
+            self.issues.append(
+                self._issue(
+                    "high_cognitive_complexity",
+                    f"Function '{function.name}' has cognitive complexity "
+                    f"{self.cognitive} (limit {self.cognitive_limit}). "
+                    "Consider splitting it up.",
+                    4 if self.cognitive > 2 * self.cognitive_limit else 3,
+                )
+            )
+
+        return self.issues
+
+
+def analyze(function) -> List[Issue]:
+    """
+    Analyze a ParsedFunction for complexity issues.
+    """
+    return Engine([ComplexityRule]).run(function)
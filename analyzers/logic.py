@@ -1,10 +1,11 @@
 import ast
 from typing import List
+from core.engine import Engine, Rule
 from core.types import Issue
 
-class LogicVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.issues: List[Issue] = []
+class LogicRule(Rule):
+    kinds = ("function", "module")
+    name = "logic"
 
     def visit_Compare(self, node):
         for op, comparator in zip(node.ops, node.comparators):
@@ -16,11 +17,13 @@ class LogicVisitor(ast.NodeVisitor):
                             category="bug",
                             rule="compare_none",
                             message="Use 'is None' instead of '== None'.",
-                            code_snippet=ast.unparse(node),
+                            snippet=self.snippet(node),
                             severity=3,
+                            col=node.col_offset,
+                            end_line=node.end_lineno,
+                            end_col=node.end_col_offset,
                         )
                     )
-        self.generic_visit(node)
 
     def visit_FunctionDef(self, node):
         for default in node.args.defaults:
@@ -31,13 +34,13 @@ class LogicVisitor(ast.NodeVisitor):
                         category="bug",
                         rule="mutable_default",
                         message="Mutable default argument can cause shared state bugs.",
-                        code_snippet=ast.unparse(node),
+                        snippet=self.function.snippet,
                         severity=4,
+                        col=self.function.col,
+                        end_line=self.function.line_no,
+                        end_col=self.function.name_end,
                     )
                 )
-        self.generic_visit(node)
 
 def analyze(function) -> List[Issue]:
-    visitor = LogicVisitor()
-    visitor.visit(function.body)
-    return visitor.issues
+    return Engine([LogicRule]).run(function)
@@ -1,6 +1,8 @@
 import ast
 from typing import List, Set
-from core.types import Issue
+from core.engine import Engine, Rule
+from core.symbols import ASSIGNMENTS
+from core.types import Issue, Snippet
 
 BUILTINS: Set[str] = {
     "list", "dict", "set", "tuple", "str", "int", "float",
@@ -8,11 +10,13 @@ BUILTINS: Set[str] = {
     "open", "range", "print"
 }
 
-class PatternVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.issues: List[Issue] = []
-        self.assigned_names: Set[str] = set()
-        self.used_names: Set[str] = set()
+class PatternRule(Rule):
+    kinds = ("function", "module")
+    name = "patterns"
+    settings = ("builtins",)
+
+    # Names whose reassignment is reported as shadowing
+    builtins = BUILTINS
 
     # ---------- Function-level patterns ----------
 
@@ -32,13 +36,14 @@ class PatternVisitor(ast.NodeVisitor):
                             f"Mutable default argument '{arg.arg}' in function "
                             f"'{node.name}'. This can cause shared state bugs."
                         ),
-                        code_snippet=ast.unparse(default),
+                        snippet=self.snippet(default),
                         severity=4,
+                        col=default.col_offset,
+                        end_line=default.end_lineno,
+                        end_col=default.end_col_offset,
                     )
                 )
 
-        self.generic_visit(node)
-
     # ---------- Exception handling ----------
 
     def visit_ExceptHandler(self, node: ast.ExceptHandler):
@@ -49,21 +54,24 @@ class PatternVisitor(ast.NodeVisitor):
                     category="patterns",
                     rule="bare_except",
                     message="Bare except detected. This can hide critical errors.",
-                    code_snippet="except:",
+                    # Just the `except` keyword
+                    snippet=Snippet("except:", (
+                        node.lineno, node.col_offset,
+                        node.lineno, node.col_offset + len("except"),
+                    )),
                     severity=3,
+                    col=node.col_offset,
+                    end_line=node.lineno,
+                    end_col=node.col_offset + len("except"),
                 )
             )
-        self.generic_visit(node)
 
-    # ---------- Name tracking ----------
+    # ---------- Shadowing built-ins ----------
 
     def visit_Assign(self, node: ast.Assign):
         for target in node.targets:
             if isinstance(target, ast.Name):
-                self.assigned_names.add(target.id)
-
-                # Shadowing built-ins
-                if target.id in BUILTINS:
+                if target.id in self.builtins:
                     self.issues.append(
                         Issue(
                             line=target.lineno,
@@ -72,37 +80,39 @@ class PatternVisitor(ast.NodeVisitor):
                             message=(
                                 f"Variable '{target.id}' shadows a Python built-in."
                             ),
-                            code_snippet=ast.unparse(node),
+                            snippet=self.snippet(node),
                             severity=2,
+                            col=target.col_offset,
+                            end_line=target.end_lineno,
+                            end_col=target.end_col_offset,
                         )
                     )
 
-        self.generic_visit(node)
-
-    def visit_Name(self, node: ast.Name):
-        if isinstance(node.ctx, ast.Load):
-            self.used_names.add(node.id)
-
     # ---------- Final pass ----------
 
-    def finalize(self):
+    def finalize(self) -> List[Issue]:
+        # Module-level names are the module's interface, not locals
+        if self.function.kind == "module":
+            return self.issues
+
         # Unused variables
-        unused = self.assigned_names - self.used_names
-        for name in unused:
+        for symbol in self.function.scope.unused(ASSIGNMENTS):
+            binding = symbol.bindings[0]
             self.issues.append(
                 Issue(
-                    line=0,
+                    line=binding.line,
                     category="patterns",
                     rule="unused_variable",
-                    message=f"Variable '{name}' is assigned but never used.",
-                    code_snippet=name,
+                    message=f"Variable '{symbol.name}' is assigned but never used.",
+                    snippet=Snippet(symbol.name, binding.span),
                     severity=1,
+                    col=binding.col,
+                    end_line=binding.end_line,
+                    end_col=binding.end_col,
                 )
             )
+        return self.issues
 
 
 def analyze(function) -> List[Issue]:
-    visitor = PatternVisitor()
-    visitor.visit(function.body)
-    visitor.finalize()
-    return visitor.issues
+    return Engine([PatternRule]).run(function)
@@ -1,38 +1,490 @@
 import ast
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
+from core.engine import Engine, Rule
+from core.symbols import GLOBALS, Scope
+from core.taint import dotted_name
 from core.types import Issue
 
-class PerformanceVisitor(ast.NodeVisitor):
-    def __init__(self):
+# Highest severity any rule here reports
+MAX_SEVERITY = 5
+
+REGEX_COMPILE = {"re.compile", "regex.compile"}
+
+DB_CONNECT = {
+    "sqlite3.connect", "psycopg2.connect", "pymysql.connect",
+    "MySQLdb.connect", "mysql.connector.connect",
+}
+
+DB_QUERY_METHODS = {"execute", "query"}
+
+APPEND_METHODS = {"append", "add"}
+
+
+class PerformanceRule(Rule):
+    """
+    Throughput smells inside loops. Every finding's severity grows with
+    the loop depth it sits at, since that is how often it runs.
+    """
+
+    kinds = ("function", "module")
+    name = "performance"
+
+    def __init__(self, function):
+        super().__init__(function)
         self.loop_depth = 0
-        self.issues: List[Issue] = []
+        # Innermost loop first
+        self._loops: List[ast.AST] = []
+        # Nodes in a loop's header (the iterable of a `for`, or of a
+        # comprehension's first `for`): evaluated once per loop, not
+        # per iteration
+        self._headers: Set[ast.AST] = set()
+        # Names last bound to a str / list literal (or list builder)
+        self._strings: Set[str] = set()
+        self._lists: Set[str] = set()
+        # (loop, dotted name) already reported by the lookup rules
+        self._lookups: Set[Tuple[ast.AST, str]] = set()
+        # loop -> names it rebinds, filled on demand
+        self._variant: Dict[ast.AST, Set[str]] = {}
+        # node -> scope it opens, for the scopes in this unit; built on
+        # the first name lookup
+        self._scopes: Optional[Dict[ast.AST, Scope]] = None
 
-    def visit_For(self, node):
-        self.loop_depth += 1
-        self.generic_visit(node)
-        self.loop_depth -= 1
+    # ---------- Loop tracking ----------
+    # Comprehensions are loops too: their element runs once per item.
 
-    def visit_While(self, node):
+    def _enter(self, node: ast.AST, header: Optional[ast.AST]):
         self.loop_depth += 1
-        self.generic_visit(node)
+        self._loops.append(node)
+        if header is not None:
+            self._headers.update(ast.walk(header))
+
+    def _leave(self, node: ast.AST):
         self.loop_depth -= 1
+        self._loops.pop()
+
+    def visit_For(self, node: ast.For):
+        self._enter(node, node.iter)
+        self._append_loop(node)
+
+    def visit_AsyncFor(self, node: ast.AsyncFor):
+        self._enter(node, node.iter)
+        self._append_loop(node)
+
+    def visit_While(self, node: ast.While):
+        self._enter(node, None)
+
+    def _visit_comprehension(self, node):
+        self._enter(node, node.generators[0].iter)
+
+    visit_ListComp = _visit_comprehension
+    visit_SetComp = _visit_comprehension
+    visit_DictComp = _visit_comprehension
+    visit_GeneratorExp = _visit_comprehension
+
+    leave_For = _leave
+    leave_AsyncFor = _leave
+    leave_While = _leave
+    leave_ListComp = _leave
+    leave_SetComp = _leave
+    leave_DictComp = _leave
+    leave_GeneratorExp = _leave
+
+    def _depth(self, node: ast.AST) -> int:
+        """
+        How many loops run `node` once per iteration.
+        """
+        if node in self._headers:
+            return self.loop_depth - 1
+        return self.loop_depth
+
+    def _invariant(self, node: ast.AST, *parts: Optional[ast.AST]) -> bool:
+        """
+        True if none of `parts` reads a name rebound by the innermost
+        loop running `node`: the work is the same on every iteration.
+        """
+        loops = self._loops[:-1] if node in self._headers else self._loops
+        if not loops:
+            return True
+        loop = loops[-1]
+        variant = self._variant.get(loop)
+        if variant is None:
+            variant = self._variant[loop] = {
+                n.id for n in ast.walk(loop)
+                if isinstance(n, ast.Name) and not isinstance(n.ctx, ast.Load)
+            }
+        return not any(
+            isinstance(n, ast.Name) and n.id in variant
+            for part in parts if part is not None
+            for n in ast.walk(part)
+        )
+
+    def _report(
+        self,
+        node: ast.AST,
+        rule: str,
+        message: str,
+        severity: int,
+        depth: int,
+    ):
+        # `severity` is for a single loop; each extra level adds one.
+        self.issues.append(
+            Issue(
+                line=node.lineno,
+                category="performance",
+                rule=rule,
+                message=message,
+                snippet=self.snippet(node),
+                severity=min(severity + depth - 1, MAX_SEVERITY),
+                col=node.col_offset,
+                end_line=node.end_lineno,
+                end_col=node.end_col_offset,
+            )
+        )
+
+    # ---------- Types of local names ----------
+
+    def visit_Assign(self, node: ast.Assign):
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                self._self_concat(node, target.id)
+                self._track(target.id, node.value)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        if isinstance(node.target, ast.Name) and node.value is not None:
+            self._track(node.target.id, node.value)
+
+    def _track(self, name: str, value: ast.AST):
+        self._strings.discard(name)
+        self._lists.discard(name)
+        if _is_str(value):
+            self._strings.add(name)
+        elif _is_list(value):
+            self._lists.add(name)
+
+    # ---------- String building ----------
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        if not isinstance(node.op, ast.Add) or not isinstance(node.target, ast.Name):
+            return
+        name = node.target.id
+        if name in self._strings or _is_str(node.value):
+            self._string_concat(node, name)
+
+    def _self_concat(self, node: ast.Assign, name: str):
+        # s = s + x
+        value = node.value
+        if (
+            isinstance(value, ast.BinOp)
+            and isinstance(value.op, ast.Add)
+            and isinstance(value.left, ast.Name)
+            and value.left.id == name
+            and (name in self._strings or _is_str(value.right))
+        ):
+            self._string_concat(node, name)
+
+    def _string_concat(self, node: ast.AST, name: str):
+        depth = self._depth(node)
+        if depth == 0:
+            return
+        self._report(
+            node,
+            rule="string_concat_in_loop",
+            message=(
+                f"String '{name}' is built with '+' inside a loop, copying it "
+                "every iteration. Collect the parts in a list and ''.join() them."
+            ),
+            severity=2,
+            depth=depth,
+        )
+
+    # ---------- Loops that should be comprehensions ----------
+
+    def _append_loop(self, node: ast.AST):
+        # for x in xs: [if cond:] out.append(expr)
+        body = node.body
+        if len(body) != 1 or node.orelse:
+            return
+        statement = body[0]
+        if isinstance(statement, ast.If) and not statement.orelse and len(statement.body) == 1:
+            statement = statement.body[0]
+        if not isinstance(statement, ast.Expr) or not isinstance(statement.value, ast.Call):
+            return
+        call = statement.value
+        if not (
+            isinstance(call.func, ast.Attribute)
+            and call.func.attr in APPEND_METHODS
+            and isinstance(call.func.value, ast.Name)
+            and len(call.args) == 1
+            and not call.keywords
+        ):
+            return
+
+        kind = "list" if call.func.attr == "append" else "set"
+        self._report(
+            node,
+            rule="append_in_loop",
+            message=(
+                f"Loop only adds to '{call.func.value.id}'; a {kind} "
+                "comprehension builds it faster."
+            ),
+            severity=1,
+            depth=self.loop_depth,
+        )
+
+    # ---------- Membership tests ----------
+
+    def visit_Compare(self, node: ast.Compare):
+        depth = self._depth(node)
+        if depth == 0:
+            return
+        for op, comparator in zip(node.ops, node.comparators):
+            if not isinstance(op, (ast.In, ast.NotIn)):
+                continue
+            if isinstance(comparator, ast.Name) and comparator.id in self._lists:
+                container = comparator.id
+            elif _is_list(comparator) and not isinstance(comparator, ast.List):
+                container = self.snippet(comparator).text
+            else:
+                continue
+            self._report(
+                node,
+                rule="list_membership_in_loop",
+                message=(
+                    f"'in {container}' scans a list on every iteration. "
+                    "Build a set once before the loop."
+                ),
+                severity=2,
+                depth=depth,
+            )
+
+    # ---------- Calls ----------
+
+    def visit_Call(self, node: ast.Call):
+        depth = self._depth(node)
+        if depth == 0:
+            return
+
+        func = node.func
+        name = dotted_name(func)
+
+        if isinstance(func, ast.Name) and func.id == "len":
+            self._report(
+                node,
+                rule="len_in_loop",
+                message="Calling len() inside a loop may be inefficient.",
+                severity=2,
+                depth=depth,
+            )
+
+        elif (
+            name == "sorted"
+            or isinstance(func, ast.Attribute) and func.attr == "sort" and not node.args
+        ) and self._invariant(node, node):
+            self._report(
+                node,
+                rule="sort_in_loop",
+                message=(
+                    "Sorting inside a loop costs O(n log n) per iteration. "
+                    "Sort once outside it, or keep the data ordered (heapq, bisect)."
+                ),
+                severity=3,
+                depth=depth,
+            )
+
+        elif isinstance(func, ast.Attribute) and self._front_of_list(node):
+            self._report(
+                node,
+                rule="list_front_in_loop",
+                message=(
+                    f"'{func.attr}(0, ...)' shifts every element of the list, "
+                    "once per iteration. Use collections.deque."
+                    if func.attr == "insert" else
+                    "'pop(0)' shifts every element of the list, once per "
+                    "iteration. Use collections.deque and popleft()."
+                ),
+                severity=3,
+                depth=depth,
+            )
+
+        elif name in REGEX_COMPILE and self._invariant(node, node):
+            self._report(
+                node,
+                rule="regex_compile_in_loop",
+                message=(
+                    f"'{name}()' inside a loop rebuilds the pattern every "
+                    "iteration. Compile it once, e.g. at module level."
+                ),
+                severity=2,
+                depth=depth,
+            )
+
+        elif name == "open" and self._invariant(node, node):
+            self._report(
+                node,
+                rule="open_in_loop",
+                message=(
+                    "File opened on every iteration. Open it once outside "
+                    "the loop, or batch the work per file."
+                ),
+                severity=2,
+                depth=depth,
+            )
+
+        elif name in DB_CONNECT and self._invariant(node, node):
+            self._report(
+                node,
+                rule="db_connect_in_loop",
+                message=(
+                    "Database connection opened on every iteration. "
+                    "Connect once and reuse it."
+                ),
+                severity=3,
+                depth=depth,
+            )
+
+        elif (
+            isinstance(func, ast.Attribute)
+            and func.attr in DB_QUERY_METHODS
+            and node.args
+            and self._invariant(node, node.args[0])
+        ):
+            # The same statement every time, only its parameters change
+            self._report(
+                node,
+                rule="db_query_in_loop",
+                message=(
+                    f"'{func.attr}()' runs one query per iteration. Use "
+                    "executemany() or a single set-based query."
+                ),
+                severity=2,
+                depth=depth,
+            )
+
+        elif isinstance(func, ast.Attribute) and self.loop_depth >= 2:
+            self._hot_lookup(node, func, depth)
+
+    def _front_of_list(self, node: ast.Call) -> bool:
+        func = node.func
+        if func.attr not in ("pop", "insert") or node.keywords:
+            return False
+        expected = 1 if func.attr == "pop" else 2
+        if len(node.args) != expected:
+            return False
+        first = node.args[0]
+        return isinstance(first, ast.Constant) and first.value == 0
+
+    # ---------- Lookups in hot loops ----------
+
+    def _hot_lookup(self, node: ast.Call, func: ast.Attribute, depth: int):
+        # `os.path.join(...)` / `self.items.append(...)` in a nested loop
+        # re-resolves every attribute on each call.
+        name = dotted_name(func)
+        if name is None or name.count(".") < 2:
+            return
+        root = func
+        while isinstance(root, ast.Attribute):
+            root = root.value
+        if not self._invariant(node, root):
+            # Looked up on a different object every time
+            return
+        key = (self._loops[-1], name)
+        if key in self._lookups:
+            return
+        self._lookups.add(key)
+        self._report(
+            node,
+            rule="attribute_lookup_in_loop",
+            message=(
+                f"'{name}' is looked up on every iteration of a nested loop. "
+                f"Bind it to a local name before the loop."
+            ),
+            severity=1,
+            depth=depth,
+        )
+
+    def visit_Name(self, node: ast.Name):
+        # Module-level variables read in a nested loop of a function
+        if (
+            self.loop_depth < 2
+            or self.function.kind != "function"
+            or not isinstance(node.ctx, ast.Load)
+            or not self._is_global(node)
+        ):
+            return
+        key = (self._loops[-1], node.id)
+        if key in self._lookups:
+            return
+        self._lookups.add(key)
+        self._report(
+            node,
+            rule="global_lookup_in_loop",
+            message=(
+                f"Global '{node.id}' is looked up on every iteration of a "
+                "nested loop. Bind it to a local name before the loop."
+            ),
+            severity=1,
+            depth=self._depth(node),
+        )
+
+    def _scope(self, node: ast.Name) -> Optional[Scope]:
+        # Comprehensions among the loops around `node` open scopes of
+        # their own; the first iterable of one is evaluated outside it.
+        if self.function.scope is None:
+            return None
+        if self._scopes is None:
+            self._scopes = {}
+            pending = [self.function.scope]
+            while pending:
+                scope = pending.pop()
+                self._scopes[scope.node] = scope
+                pending.extend(scope.children)
+        loops = self._loops[:-1] if node in self._headers else self._loops
+        for loop in reversed(loops):
+            scope = self._scopes.get(loop)
+            if scope is not None:
+                return scope
+        return self.function.scope
+
+    def _is_global(self, node: ast.Name) -> bool:
+        name = node.id
+        scope = self._scope(node)
+        if scope is None:
+            return False
+        # Resolve as Python does: the innermost scope, then the ones
+        # around it (class bodies are not visible), then the module.
+        while scope.parent is not None:
+            if name in scope.globals:
+                break
+            if name in scope.nonlocals:
+                return False
+            local = scope.symbols.get(name)
+            if scope.kind != "class" and local is not None and local.bindings:
+                return False
+            scope = scope.parent
+        while scope.parent is not None:
+            scope = scope.parent
+        symbol = scope.symbols.get(name)
+        # Variables only: calling a module-level function is the norm.
+        return symbol is not None and any(
+            b.kind in GLOBALS for b in symbol.bindings
+        )
+
+
+def _is_str(node: ast.AST) -> bool:
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, str)
+    if isinstance(node, ast.JoinedStr):
+        return True
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mod)):
+        return _is_str(node.left) or _is_str(node.right)
+    return isinstance(node, ast.Call) and dotted_name(node.func) == "str"
+
+
+def _is_list(node: ast.AST) -> bool:
+    if isinstance(node, (ast.List, ast.ListComp)):
+        return True
+    return isinstance(node, ast.Call) and dotted_name(node.func) == "list"
 
-    def visit_Call(self, node):
-        if self.loop_depth > 0:
-            if isinstance(node.func, ast.Name) and node.func.id == "len":
-                self.issues.append(
-                    Issue(
-                        line=node.lineno,
-                        category="performance",
-                        rule="len_in_loop",
-                        message="Calling len() inside a loop may be inefficient.",
-                        code_snippet=ast.unparse(node),
-                        severity=2,
-                    )
-                )
-        self.generic_visit(node)
 
 def analyze(function) -> List[Issue]:
-    visitor = PerformanceVisitor()
-    visitor.visit(function.body)
-    return visitor.issues
+    return Engine([PerformanceRule]).run(function)
@@ -1,6 +1,8 @@
 import ast
-from typing import List
-from core.types import Issue
+from typing import List, Optional
+from core.engine import Engine, Rule
+from core.taint import TaintAnalysis, dotted_name, is_constant
+from core.types import Issue, Snippet, node_span
 
 DANGEROUS_CALLS = {
     "eval": 5,
@@ -8,24 +10,47 @@ DANGEROUS_CALLS = {
     "compile": 4,
 }
 
+# "module.attr" -> severity
 DANGEROUS_ATTR_CALLS = {
-    ("os", "system"): 5,
-    ("subprocess", "Popen"): 4,
-    ("subprocess", "call"): 4,
-    ("subprocess", "run"): 4,
+    "os.system": 5,
+    "subprocess.Popen": 4,
+    "subprocess.call": 4,
+    "subprocess.run": 4,
 }
 
 INSECURE_HASHES = {"md5", "sha1"}
 
 DESERIALIZATION_CALLS = {
-    ("pickle", "loads"),
-    ("pickle", "load"),
-    ("yaml", "load"),
+    "pickle.loads": 5,
+    "pickle.load": 5,
+    "yaml.load": 5,
 }
 
-class SecurityVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.issues: List[Issue] = []
+# Sinks reached only by values of unknown origin (neither literals nor
+# untrusted input) keep a low severity; the tables above apply when
+# taint analysis finds input flowing in.
+UNTAINTED_SEVERITY = 2
+
+SAFE_YAML_LOADERS = {"SafeLoader", "CSafeLoader", "BaseLoader"}
+
+class SecurityRule(Rule):
+    kinds = ("function", "module")
+    name = "security"
+    settings = (
+        "dangerous_calls", "command_calls", "deserialization_calls",
+        "insecure_hashes", "untainted_severity",
+    )
+
+    dangerous_calls = DANGEROUS_CALLS
+    command_calls = DANGEROUS_ATTR_CALLS
+    deserialization_calls = DESERIALIZATION_CALLS
+    insecure_hashes = INSECURE_HASHES
+    untainted_severity = UNTAINTED_SEVERITY
+
+    def __init__(self, function):
+        super().__init__(function)
+        # Built on the first sink; most units have none.
+        self._taint: Optional[TaintAnalysis] = None
 
     # ---------- Dangerous built-ins ----------
 
@@ -33,42 +58,47 @@ class SecurityVisitor(ast.NodeVisitor):
         # eval(), exec(), compile()
         if isinstance(node.func, ast.Name):
             name = node.func.id
-            if name in DANGEROUS_CALLS:
-                self.issues.append(
-                    Issue(
-                        line=node.lineno,
-                        category="security",
-                        rule=f"use_of_{name}",
-                        message=f"Use of '{name}()' can lead to code injection.",
-                        code_snippet=ast.unparse(node),
-                        severity=DANGEROUS_CALLS[name],
-                    )
+            if name in self.dangerous_calls:
+                self._sink(
+                    node,
+                    rule=f"use_of_{name}",
+                    message=f"Use of '{name}()'{{origin}} can lead to code injection.",
+                    severity=self.dangerous_calls[name],
                 )
 
         # os.system(), subprocess.*
         if isinstance(node.func, ast.Attribute):
             module = self._get_root_name(node.func.value)
             attr = node.func.attr
+            called = f"{module}.{attr}"
+
+            if called in self.command_calls:
+                self._sink(
+                    node,
+                    rule=f"{module}_{attr}",
+                    message=(
+                        f"Call to '{module}.{attr}()'{{origin}} may allow command "
+                        "injection if input is not sanitized."
+                    ),
+                    severity=self.command_calls[called],
+                )
 
-            if (module, attr) in DANGEROUS_ATTR_CALLS:
-                self.issues.append(
-                    Issue(
-                        line=node.lineno,
-                        category="security",
-                        rule=f"{module}_{attr}",
-                        message=(
-                            f"Call to '{module}.{attr}()' may allow command injection "
-                            "if input is not sanitized."
-                        ),
-                        code_snippet=ast.unparse(node),
-                        severity=DANGEROUS_ATTR_CALLS[(module, attr)],
-                    )
+            # pickle.loads(), yaml.load()
+            if called in self.deserialization_calls and not self._safe_yaml(node):
+                self._sink(
+                    node,
+                    rule="unsafe_deserialization",
+                    message=(
+                        f"Call to '{module}.{attr}()'{{origin}} can execute "
+                        "arbitrary code if the data is untrusted."
+                    ),
+                    severity=self.deserialization_calls[called],
                 )
 
         # Insecure hashing
         if isinstance(node.func, ast.Attribute):
             attr = node.func.attr
-            if attr in INSECURE_HASHES:
+            if attr in self.insecure_hashes:
                 self.issues.append(
                     Issue(
                         line=node.lineno,
@@ -78,12 +108,64 @@ class SecurityVisitor(ast.NodeVisitor):
                             f"Use of insecure hash function '{attr}'. "
                             "Prefer SHA-256 or stronger."
                         ),
-                        code_snippet=ast.unparse(node),
+                        snippet=self.snippet(node),
                         severity=3,
+                        col=node.col_offset,
+                        end_line=node.end_lineno,
+                        end_col=node.end_col_offset,
                     )
                 )
 
-        self.generic_visit(node)
+    # ---------- Taint ----------
+
+    def _sink(
+        self,
+        node: ast.Call,
+        rule: str,
+        message: str,
+        severity: int,
+    ):
+        """
+        Report a call to a dangerous sink. Literal arguments cannot be
+        attacker-controlled and are not reported; arguments carrying
+        untrusted input keep the sink's full severity and name where the
+        input came from (`{origin}` in `message`). Other calls are
+        reported at `untainted_severity`.
+        """
+        arguments = list(node.args) + [k.value for k in node.keywords]
+        if all(is_constant(arg) for arg in arguments):
+            return
+
+        if self._taint is None:
+            self._taint = TaintAnalysis(self.function)
+        origin = self._taint.call_source(node)
+
+        if origin is None:
+            severity = self.untainted_severity
+            message = message.format(origin="")
+        else:
+            message = message.format(origin=f" with input from {origin}")
+
+        self.issues.append(
+            Issue(
+                line=node.lineno,
+                category="security",
+                rule=rule,
+                message=message,
+                snippet=self.snippet(node),
+                severity=severity,
+                col=node.col_offset,
+                end_line=node.end_lineno,
+                end_col=node.end_col_offset,
+            )
+        )
+
+    def _safe_yaml(self, node: ast.Call) -> bool:
+        for keyword in node.keywords:
+            if keyword.arg == "Loader":
+                loader = dotted_name(keyword.value) or ""
+                return loader.split(".")[-1] in SAFE_YAML_LOADERS
+        return False
 
     # ---------- Deserialization ----------
 
@@ -106,8 +188,11 @@ class SecurityVisitor(ast.NodeVisitor):
                     f"Importing '{module}' can be unsafe when loading "
                     "untrusted data."
                 ),
-                code_snippet=module,
+                snippet=Snippet(module, node_span(node)),
                 severity=3,
+                col=node.col_offset,
+                end_line=node.end_lineno,
+                end_col=node.end_col_offset,
             )
         )
 
@@ -122,6 +207,4 @@ class SecurityVisitor(ast.NodeVisitor):
 
 
 def analyze(function) -> List[Issue]:
-    visitor = SecurityVisitor()
-    visitor.visit(function.body)
-    return visitor.issues
+    return Engine([SecurityRule]).run(function)
@@ -1,32 +1,52 @@
 import ast
 from typing import List
+from core.engine import Engine, Rule
 from core.types import Issue
 
-def analyze(function) -> List[Issue]:
-    issues: List[Issue] = []
-
-    if function.source.count("\n") > 50:
-        issues.append(
-            Issue(
-                line=function.line_no,
-                category="maintainability",
-                rule="long_function",
-                message="Function is very long; consider refactoring.",
-                code_snippet=function.source,
-                severity=2,
+class StyleRule(Rule):
+    # Works from the function's metadata only; registers no node handlers.
+
+    name = "style"
+    settings = ("max_function_lines", "max_args")
+
+    max_function_lines = 50
+    max_args = 5
+
+    def finalize(self) -> List[Issue]:
+        function = self.function
+
+        if function.end_line_no - function.line_no > self.max_function_lines:
+            self.issues.append(
+                Issue(
+                    line=function.line_no,
+                    category="maintainability",
+                    rule="long_function",
+                    message="Function is very long; consider refactoring.",
+                    snippet=function.snippet,
+                    severity=2,
+                    col=function.col,
+                    end_line=function.line_no,
+                    end_col=function.name_end,
+                )
             )
-        )
-
-    if len(function.args) > 5:
-        issues.append(
-            Issue(
-                line=function.line_no,
-                category="maintainability",
-                rule="many_parameters",
-                message="Function has many parameters; consider grouping them.",
-                code_snippet=function.source,
-                severity=2,
+
+        if len(function.args) > self.max_args:
+            self.issues.append(
+                Issue(
+                    line=function.line_no,
+                    category="maintainability",
+                    rule="many_parameters",
+                    message="Function has many parameters; consider grouping them.",
+                    snippet=function.snippet,
+                    severity=2,
+                    col=function.col,
+                    end_line=function.line_no,
+                    end_col=function.name_end,
+                )
             )
-        )
 
-    return issues
+        return self.issues
+
+
+def analyze(function) -> List[Issue]:
+    return Engine([StyleRule]).run(function)
@@ -1,59 +1,53 @@
-import ast
-from typing import List, Set
+from typing import List
+from core.engine import Engine, Rule
+from core.symbols import ASSIGNMENTS
 from core.types import Issue
 
-class UnusedVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.assigned: Set[str] = set()
-        self.used: Set[str] = set()
-        self.imports: Set[str] = set()
-
-    def visit_Assign(self, node):
-        for target in node.targets:
-            if isinstance(target, ast.Name):
-                self.assigned.add(target.id)
-        self.generic_visit(node)
+class UnusedRule(Rule):
+    # Queries the module's symbol table; registers no node handlers.
+    # Uses from nested functions resolve to this scope, so closure
+    # variables count as used.
+
+    name = "unused"
+
+    def finalize(self) -> List[Issue]:
+        function = self.function
+        scope = function.scope
+
+        for symbol in scope.unused(ASSIGNMENTS):
+            binding = symbol.bindings[0]
+            self.issues.append(
+                Issue(
+                    line=binding.line,
+                    category="maintainability",
+                    rule="unused_variable",
+                    message=f"Variable '{symbol.name}' is assigned but never used.",
+                    snippet=function.snippet,
+                    severity=2,
+                    col=binding.col,
+                    end_line=binding.end_line,
+                    end_col=binding.end_col,
+                )
+            )
 
-    def visit_Name(self, node):
-        if isinstance(node.ctx, ast.Load):
-            self.used.add(node.id)
+        for symbol in scope.unused(("import",)):
+            binding = symbol.bindings[0]
+            self.issues.append(
+                Issue(
+                    line=binding.line,
+                    category="maintainability",
+                    rule="unused_import",
+                    message=f"Imported name '{symbol.name}' is never used.",
+                    snippet=function.snippet,
+                    severity=1,
+                    col=binding.col,
+                    end_line=binding.end_line,
+                    end_col=binding.end_col,
+                )
+            )
 
-    def visit_Import(self, node):
-        for alias in node.names:
-            self.imports.add(alias.asname or alias.name.split(".")[0])
+        return self.issues
 
-    def visit_ImportFrom(self, node):
-        for alias in node.names:
-            self.imports.add(alias.asname or alias.name)
 
 def analyze(function) -> List[Issue]:
-    visitor = UnusedVisitor()
-    visitor.visit(function.body)
-
-    issues: List[Issue] = []
-
-    for name in visitor.assigned - visitor.used:
-        issues.append(
-            Issue(
-                line=function.line_no,
-                category="maintainability",
-                rule="unused_variable",
-                message=f"Variable '{name}' is assigned but never used.",
-                code_snippet=function.source,
-                severity=2,
-            )
-        )
-
-    for imp in visitor.imports - visitor.used:
-        issues.append(
-            Issue(
-                line=function.line_no,
-                category="maintainability",
-                rule="unused_import",
-                message=f"Imported name '{imp}' is never used.",
-                code_snippet=function.source,
-                severity=1,
-            )
-        )
-
-    return issues
\ No newline at end of file
+    return Engine([UnusedRule]).run(function)
@@ -0,0 +1,226 @@
+"""
+Deterministic synthetic Python modules for benchmarking.
+
+Each kind stresses a different part of the pipeline:
+
+    small     many short functions (per-unit overhead, cache lookups)
+    giant     a few very long functions (walk cost per node)
+    nested    deeply nested control flow and closures (loop tracking,
+              complexity metrics)
+    imports   large import blocks and cross-module uses (symbol table,
+              project summaries)
+
+The same (kind, lines, seed) always yields the same source. Modules
+contain the usual findings (`== None`, string building in loops, eval on
+parameters, bare excepts) so every analyzer has work to do.
+
+    python -m benchmarks.corpus OUT_DIR [--files 200] [--lines 300]
+"""
+import argparse
+import os
+import random
+from typing import Iterator, List, Sequence, Tuple
+
+KINDS = ("small", "giant", "nested", "imports")
+
+STDLIB = (
+    "os", "sys", "re", "json", "time", "math", "random", "hashlib",
+    "itertools", "functools", "collections", "subprocess", "pickle",
+    "sqlite3", "pathlib", "typing", "dataclasses", "logging", "shutil",
+)
+
+
+class _Writer:
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.lines: List[str] = []
+        self.names = 0
+
+    def emit(self, depth: int, text: str):
+        self.lines.append("    " * depth + text)
+
+    def name(self, prefix: str = "v") -> str:
+        self.names += 1
+        return f"{prefix}_{self.names}"
+
+    def statement(self, depth: int, local: Sequence[str]):
+        rng = self.rng
+        a = rng.choice(local)
+        b = rng.choice(local)
+        choice = rng.randrange(10)
+        if choice == 0:
+            self.emit(depth, f"if {a} == None:")
+            self.emit(depth + 1, f"{a} = {rng.randrange(100)}")
+        elif choice == 1:
+            self.emit(depth, "text = ''")
+            self.emit(depth, f"for item in {b}:")
+            self.emit(depth + 1, "text += str(item)")
+        elif choice == 2:
+            self.emit(depth, f"result = [x * {rng.randrange(1, 9)} for x in {a} if x]")
+        elif choice == 3:
+            self.emit(depth, "try:")
+            self.emit(depth + 1, f"{a} = int({b})")
+            self.emit(depth, "except:")
+            self.emit(depth + 1, "pass")
+        elif choice == 4:
+            self.emit(depth, f"{a} = eval({b})")
+        elif choice == 5:
+            self.emit(depth, f"for i in range(len({a})):")
+            self.emit(depth + 1, f"{b} = {a}[i] + i")
+        elif choice == 6:
+            self.emit(depth, f"with open({a}) as handle:")
+            self.emit(depth + 1, f"{b} = handle.read().split()")
+        elif choice == 7:
+            self.emit(depth, f"{a} = {{k: v for k, v in zip({a}, {b})}}")
+        elif choice == 8:
+            self.emit(depth, f"while {a} > {rng.randrange(10)}:")
+            self.emit(depth + 1, f"{a} -= 1")
+        else:
+            self.emit(depth, f"{a} = {b} + {rng.randrange(1000)}")
+
+    def function(self, depth: int, name: str, body_lines: int, params: int = 3):
+        args = [f"a{n}" for n in range(params)]
+        self.emit(depth, f"def {name}({', '.join(args)}):")
+        start = len(self.lines)
+        while len(self.lines) - start < body_lines:
+            self.statement(depth + 1, args)
+        self.emit(depth + 1, f"return {args[0]}")
+
+
+def _small(w: _Writer, lines: int):
+    w.emit(0, "import os")
+    w.emit(0, "")
+    while len(w.lines) < lines:
+        w.function(0, w.name("func"), w.rng.randrange(3, 8), w.rng.randrange(1, 7))
+        w.emit(0, "")
+
+
+def _giant(w: _Writer, lines: int):
+    w.emit(0, "import os")
+    w.emit(0, "")
+    # Two or three functions share the whole budget.
+    parts = w.rng.randrange(2, 4)
+    for _ in range(parts):
+        w.function(0, w.name("giant"), max(lines // parts - 3, 5))
+        w.emit(0, "")
+
+
+def _nested(w: _Writer, lines: int):
+    rng = w.rng
+    while len(w.lines) < lines:
+        w.emit(0, f"def {w.name('outer')}(a0, a1, a2):")
+        depth = 1
+        for _ in range(rng.randrange(4, 9)):
+            kind = rng.randrange(5)
+            if kind == 0:
+                w.emit(depth, f"for {w.name('x')} in a{rng.randrange(3)}:")
+            elif kind == 1:
+                w.emit(depth, f"if a{rng.randrange(3)} > {rng.randrange(10)}:")
+            elif kind == 2:
+                w.emit(depth, f"while a{rng.randrange(3)}:")
+            elif kind == 3:
+                w.emit(depth, "try:")
+            else:
+                w.emit(depth, f"def {w.name('inner')}(a0, a1=a1, a2=a2):")
+            depth += 1
+            w.statement(depth, ("a0", "a1", "a2"))
+            if kind == 3:
+                # Close the try at the next level out.
+                w.emit(depth - 1, "except ValueError:")
+                w.emit(depth, "pass")
+                w.emit(depth - 1, "else:")
+        w.statement(depth, ("a0", "a1", "a2"))
+        w.emit(1, "return a0")
+        w.emit(0, "")
+
+
+def _imports(w: _Writer, lines: int):
+    rng = w.rng
+    header = max(lines // 3, 1)
+    used = []
+    for n in range(header):
+        module = rng.choice(STDLIB)
+        if n % 3 == 0:
+            w.emit(0, f"import {module}")
+            used.append(module)
+        else:
+            alias = w.name("imp")
+            w.emit(0, f"from {module} import {alias} as {alias}_")
+            used.append(f"{alias}_")
+    w.emit(0, "")
+    while len(w.lines) < lines:
+        w.emit(0, f"def {w.name('user')}(a0, a1):")
+        for _ in range(rng.randrange(2, 6)):
+            w.emit(1, f"a0 = {rng.choice(used)}.attr(a0, a1)")
+        w.emit(1, "return a0")
+        w.emit(0, "")
+
+
+_GENERATORS = {
+    "small": _small,
+    "giant": _giant,
+    "nested": _nested,
+    "imports": _imports,
+}
+
+
+def module(kind: str, lines: int = 300, seed: int = 0) -> str:
+    """
+    One synthetic module of roughly `lines` lines.
+    """
+    writer = _Writer(random.Random(f"{kind}:{lines}:{seed}"))
+    _GENERATORS[kind](writer, lines)
+    return "\n".join(writer.lines) + "\n"
+
+
+def modules(
+    files: int,
+    lines: int = 300,
+    kinds: Sequence[str] = KINDS,
+    seed: int = 0,
+) -> Iterator[Tuple[str, str]]:
+    """
+    (relative path, source) for a corpus of `files` modules, cycling
+    through `kinds`, in packages of at most 50 files.
+    """
+    for n in range(files):
+        kind = kinds[n % len(kinds)]
+        path = os.path.join(f"pkg_{n // 50}", f"{kind}_{n}.py")
+        yield path, module(kind, lines, seed + n)
+
+
+def write_corpus(
+    directory: str,
+    files: int,
+    lines: int = 300,
+    kinds: Sequence[str] = KINDS,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Write a corpus under `directory`; returns the file paths.
+    """
+    paths = []
+    for rel, source in modules(files, lines, kinds, seed):
+        path = os.path.join(directory, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_corpus(args.directory, args.files, args.lines, args.kinds, args.seed)
+    print(f"wrote {len(paths)} modules to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Work growth on deeply nested decorator/closure code.
+
+Generates modules with one chain of nested, decorated closures and
+reports how many AST nodes the engine walks. Each node is owned by its
+innermost function, so walked nodes track module size linearly; the
+"per-function subtree" column is what re-walking every nested body
+would cost.
+
+    python -m benchmarks.nested_scopes [--depths 8 16 32 64]
+"""
+import argparse
+import ast
+import time
+from typing import List
+from core.parser import CodeParser
+from analyzers import DEFAULT_RULES
+from core.engine import Engine
+
+
+def nested_closures(depth: int, width: int = 4) -> str:
+    lines: List[str] = [
+        "def deco(fn):",
+        "    return fn",
+        "",
+    ]
+
+    for level in range(depth):
+        pad = "    " * level
+        if level:
+            lines.append(f"{pad}@deco")
+        lines.append(f"{pad}def level_{level}(items, opts={{}}):")
+        for i in range(width):
+            lines.append(f"{pad}    v_{i} = len(items) + {i}")
+        lines.append(f"{pad}    for item in items:")
+        lines.append(f"{pad}        if item == None:")
+        lines.append(f"{pad}            v_0 = eval(item)")
+
+    for level in reversed(range(depth)):
+        pad = "    " * level
+        nxt = f"level_{level + 1}" if level + 1 < depth else "v_0"
+        lines.append(f"{pad}    return {nxt}")
+
+    return "\n".join(lines) + "\n"
+
+
+def measure(depth: int):
+    source = nested_closures(depth)
+    parsed = CodeParser(source).parse()
+    engine = Engine(DEFAULT_RULES)
+
+    start = time.perf_counter()
+    issues = list(engine.run(parsed["module"]))
+    for fn in parsed["functions"]:
+        issues.extend(engine.run(fn))
+    elapsed = time.perf_counter() - start
+
+    subtree = sum(
+        sum(1 for _ in ast.walk(fn.body)) for fn in parsed["functions"]
+    )
+    return source.count("\n"), engine.nodes_walked, subtree, len(issues), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--depths", type=int, nargs="+", default=[8, 16, 32, 64])
+    args = parser.parse_args()
+
+    print(
+        f"{'depth':>6} {'lines':>7} {'walked':>9} {'walked/line':>12} "
+        f"{'per-function subtree':>21} {'issues':>7} {'ms':>8}"
+    )
+    for depth in args.depths:
+        lines, walked, subtree, issues, elapsed = measure(depth)
+        print(
+            f"{depth:>6} {lines:>7} {walked:>9} {walked / lines:>12.2f} "
+            f"{subtree:>21} {issues:>7} {elapsed * 1000:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
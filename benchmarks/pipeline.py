@@ -0,0 +1,335 @@
+"""
+End-to-end benchmark of the review pipeline on a synthetic corpus.
+
+Times, per file, parsing (`parse_file`), loading the same parse from a
+warm parse cache, each analyzer on its own, the fused `run_analyzers`
+walk and report serialization, then LLM
+enrichment of the findings against a fake model with fixed latency.
+Reports throughput (files/s, LOC/s), tail latency (p50/p95/p99/max per
+file) and peak RSS.
+
+    python -m benchmarks.pipeline [--files 200] [--lines 300] [--repeat 3]
+    python -m benchmarks.pipeline --save-baseline bench.json
+    python -m benchmarks.pipeline --baseline bench.json   # exit 1 on regression
+
+A baseline only compares against a run over the same corpus settings.
+Each file is timed `--repeat` times and its fastest run kept, which
+filters out most scheduler noise.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+from analyzers import DEFAULT_RULES, run_analyzers
+from benchmarks.corpus import KINDS, write_corpus
+from core.batch import collect_files
+from core.engine import Engine
+from core.parse_cache import ParseCache
+from core.parser import parse_file
+from core.types import Issue
+from llm.client import LLMClient
+from llm.enrich import DEFAULT_CONCURRENCY, enrich
+from output.json_report import write_report
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# A stage regresses when it gets this much slower than the baseline...
+DEFAULT_TOLERANCE = 0.2
+# ...and the difference is above the noise floor of its unit.
+FLOORS = {"total_s": 0.005, "p95_ms": 0.5, "peak_rss_mb": 5.0}
+
+
+class FakeModel:
+    """
+    Stands in for `model_call(prompt, system)`: sleeps for `latency`
+    seconds, then answers in the shape the prompt asks for.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, prompt: str, system: Optional[str] = None) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        review = {
+            "explanation": "Synthetic explanation.",
+            "suggestion": "Synthetic suggestion.",
+            "confidence": 0.5,
+        }
+        if "\nIssues:\n" in prompt:
+            ids = re.findall(r"^(\d+)\. \[", prompt, re.M)
+            return json.dumps([
+                {"id": int(n), **review, "fixed_expression": None} for n in ids
+            ])
+        if "fixed_expression" in prompt:
+            return json.dumps({"fixed_expression": "value is None"})
+        return json.dumps(review)
+
+
+# ---------- Measurement ----------
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _stats(latencies: List[float], files: int, lines: int) -> Dict[str, float]:
+    total = sum(latencies)
+    return {
+        "total_s": round(total, 4),
+        "files_per_s": round(files / total, 1) if total else 0.0,
+        "loc_per_s": round(lines / total) if total else 0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def _best(fn: Callable[[], Any], repeat: int):
+    # (fastest wall time, result of the last call)
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _run_engine(engine: Engine, parsed) -> List[Issue]:
+    issues = list(engine.run(parsed["module"]))
+    for fn in parsed["functions"]:
+        issues.extend(engine.run(fn))
+    return issues
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(peak * scale / (1024 * 1024), 1)
+
+
+def run(
+    paths: List[str],
+    repeat: int = 3,
+    llm_issues: int = 200,
+    llm_latency: float = 0.05,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> Dict[str, Any]:
+    """
+    Benchmark the pipeline over `paths`; returns the results as a
+    JSON-ready dict.
+    """
+    analyzers = [(rule_cls.name, Engine([rule_cls])) for rule_cls in DEFAULT_RULES]
+    timings: Dict[str, List[float]] = {"parse": [], "parse_cached": []}
+    timings.update({f"analyzer:{name}": [] for name, _ in analyzers})
+    timings["run_analyzers"] = []
+    timings["serialize"] = []
+
+    lines = 0
+    findings = []
+    scratch = tempfile.TemporaryDirectory()
+    parse_cache = ParseCache(scratch.name)
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        lines += source.count("\n")
+
+        elapsed, parsed = _best(lambda: parse_file(path), repeat)
+        timings["parse"].append(elapsed)
+
+        parse_cache.parse(source)
+        elapsed, _ = _best(lambda: parse_cache.parse(source), repeat)
+        timings["parse_cached"].append(elapsed)
+
+        for name, engine in analyzers:
+            elapsed, _ = _best(lambda: _run_engine(engine, parsed), repeat)
+            timings[f"analyzer:{name}"].append(elapsed)
+
+        elapsed, issues = _best(lambda: run_analyzers(parsed), repeat)
+        timings["run_analyzers"].append(elapsed)
+
+        entries = [(path, issue, {}) for issue in issues]
+        elapsed, _ = _best(lambda: write_report(entries, os.devnull), repeat)
+        timings["serialize"].append(elapsed)
+
+        findings.extend(issues)
+
+    parse_cache.close()
+    scratch.cleanup()
+
+    stages = {
+        stage: _stats(latencies, len(paths), lines)
+        for stage, latencies in timings.items()
+    }
+
+    # Enrichment is bound by model latency and concurrency, not by
+    # file size: report it per issue.
+    sample = findings[:llm_issues]
+    model = FakeModel(llm_latency)
+    start = time.perf_counter()
+    enrich(
+        [{} for _ in sample],
+        sample,
+        LLMClient(model_call=model),
+        "benchmark",
+        concurrency=concurrency,
+    )
+    elapsed = time.perf_counter() - start
+    stages["enrich"] = {
+        "total_s": round(elapsed, 4),
+        "issues_per_s": round(len(sample) / elapsed, 1) if elapsed else 0.0,
+        "model_calls": model.calls,
+    }
+
+    return {
+        "corpus": {"files": len(paths), "lines": lines},
+        "settings": {
+            "repeat": repeat,
+            "llm_issues": len(sample),
+            "llm_latency": llm_latency,
+            "concurrency": concurrency,
+        },
+        "issues": len(findings),
+        "stages": stages,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+# ---------- Reporting ----------
+
+def print_table(results: Dict[str, Any], out=sys.stdout):
+    corpus = results["corpus"]
+    print(
+        f"{corpus['files']} files, {corpus['lines']} lines, "
+        f"{results['issues']} issues, peak RSS {results['peak_rss_mb']} MB",
+        file=out,
+    )
+    print(
+        f"{'stage':<22} {'files/s':>9} {'LOC/s':>10} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'total s':>9}",
+        file=out,
+    )
+    for stage, s in results["stages"].items():
+        if "files_per_s" not in s:
+            continue
+        print(
+            f"{stage:<22} {s['files_per_s']:>9} {s['loc_per_s']:>10} "
+            f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} "
+            f"{s['max_ms']:>9} {s['total_s']:>9}",
+            file=out,
+        )
+    enrich_stats = results["stages"]["enrich"]
+    print(
+        f"enrich: {results['settings']['llm_issues']} issues in "
+        f"{enrich_stats['total_s']} s ({enrich_stats['issues_per_s']} issues/s, "
+        f"{enrich_stats['model_calls']} model calls)",
+        file=out,
+    )
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """
+    Regressions of `results` against `baseline`, one line each.
+    """
+    if results["corpus"] != baseline["corpus"] or results["settings"] != baseline["settings"]:
+        return ["baseline was recorded with a different corpus or settings"]
+
+    found = []
+
+    def check(label: str, metric: str, new, old):
+        if new is None or old is None:
+            return
+        if new > old * (1 + tolerance) and new - old > FLOORS[metric]:
+            found.append(
+                f"{label}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)"
+            )
+
+    for stage, old in baseline["stages"].items():
+        new = results["stages"].get(stage)
+        if new is None:
+            continue
+        check(stage, "total_s", new["total_s"], old["total_s"])
+        if "p95_ms" in old:
+            check(stage, "p95_ms", new["p95_ms"], old["p95_ms"])
+    check("process", "peak_rss_mb", results["peak_rss_mb"], baseline["peak_rss_mb"])
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", metavar="DIR",
+                        help="Benchmark the .py files under DIR instead of a synthetic corpus")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-issues", type=int, default=200,
+                        help="Findings to enrich against the fake model")
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="Seconds the fake model takes per request")
+    parser.add_argument("--ai-concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to PATH")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="Compare against a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before a stage counts as regressed")
+    args = parser.parse_args()
+
+    def bench(paths: List[str]) -> Dict[str, Any]:
+        return run(
+            paths,
+            repeat=args.repeat,
+            llm_issues=args.llm_issues,
+            llm_latency=args.llm_latency,
+            concurrency=args.ai_concurrency,
+        )
+
+    if args.corpus:
+        results = bench(collect_files([args.corpus]))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = write_corpus(directory, args.files, args.lines, args.kinds, args.seed)
+            results = bench(paths)
+        results["corpus"].update(kinds=args.kinds, seed=args.seed)
+
+    print_table(results)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nREGRESSIONS against {args.baseline}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nno regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from analyzers import compile_engine, function_metrics, measure, run_analyzers
+from core import profiling
+from core.cache import IssueCache, content_hash
+from core.config import DEFAULT_PROFILE, Config, Profile
+from core.diff import Hunks, overlaps, touched
+from core.incremental import first_line, run_incremental, run_metrics
+from core.parse_cache import ParseCache
+from core.parser import CodeParser
+from core.project import summarize
+from core.types import Issue
+
+SKIP_DIRS = {
+    "__pycache__", ".git", ".hg", ".svn", ".tox", ".nox",
+    ".venv", "venv", "node_modules", ".mypy_cache", ".pytest_cache",
+}
+
+
+@dataclass
+class FileResult:
+    """
+    Static analysis outcome for one file in a batch run.
+    """
+
+    path: str
+    issues: List[Issue] = field(default_factory=list)
+    error: Optional[str] = None
+    # Newly analyzed functions: fingerprint -> issues relative to the function
+    functions: Dict[str, List[Issue]] = field(default_factory=dict)
+    # Content hash of what was analyzed
+    digest: Optional[str] = None
+    # Imports and top-level names, for project analysis (core.project)
+    summary: Optional[Dict[str, Any]] = None
+    # Complexity metrics per function (analyzers.complexity)
+    metrics: Optional[List[Dict[str, Any]]] = None
+    # Newly measured functions: fingerprint -> metrics relative to the function
+    function_metrics: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Answered from the cache: nothing new to store
+    cached: bool = False
+    # Stage timings from a pool worker under --profile (core.profiling)
+    timings: Optional[Dict[str, Any]] = None
+    # Changed lines the analysis was limited to (core.diff); such
+    # partial results are not stored for the whole file.
+    hunks: Optional[List[Tuple[int, int]]] = None
+
+
+# ---------- File discovery ----------
+
+def _walk_dir(root: str, config: Optional[Config] = None) -> Iterable[str]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if d not in SKIP_DIRS
+            and not (config and config.excluded(os.path.join(dirpath, d), True))
+        )
+        for name in filenames:
+            if name.endswith(".py"):
+                yield os.path.join(dirpath, name)
+
+
+def _read_file_list(path: str) -> List[str]:
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def collect_files(
+    targets: Iterable[str],
+    files_from: Optional[str] = None,
+    config: Optional[Config] = None,
+) -> List[str]:
+    """
+    Expand files, directories and glob patterns into a sorted,
+    de-duplicated list of Python files. Paths excluded by `config` are
+    dropped here, and excluded directories are not even walked.
+    """
+    targets = list(targets)
+    if files_from:
+        targets.extend(_read_file_list(files_from))
+
+    found = set()
+    for target in targets:
+        if os.path.isdir(target):
+            found.update(_walk_dir(target, config))
+        elif glob.has_magic(target):
+            for match in glob.glob(target, recursive=True):
+                if os.path.isdir(match):
+                    found.update(_walk_dir(match, config))
+                elif match.endswith(".py"):
+                    found.add(match)
+        else:
+            found.add(target)
+
+    found = {os.path.normpath(p) for p in found}
+    if config is not None:
+        found = {p for p in found if not config.excluded(p)}
+    return sorted(found)
+
+
+# ---------- Analysis ----------
+
+_worker_cache: Optional[IssueCache] = None
+_worker_parse_cache: Optional[ParseCache] = None
+_worker_profiling = False
+
+
+def _init_worker(
+    cache_dir: Optional[str],
+    ruleset: str,
+    trace: Optional[bool],
+    parse_cache_dir: Optional[str] = None,
+):
+    # `trace` is None when the run is not profiled.
+    global _worker_cache, _worker_parse_cache, _worker_profiling
+    if cache_dir is not None:
+        _worker_cache = IssueCache(cache_dir, ruleset=ruleset)
+    if parse_cache_dir is not None:
+        _worker_parse_cache = ParseCache(parse_cache_dir)
+    if trace is not None:
+        profiling.start(trace)
+        _worker_profiling = True
+
+
+def _parse(source: str, parse_cache: Optional[ParseCache] = None) -> Dict[str, Any]:
+    if parse_cache is None:
+        return CodeParser(source).parse()
+    return parse_cache.parse(source)
+
+
+def analyze_source(
+    path: str,
+    source: str,
+    cache: Optional[IssueCache] = None,
+    profile: Profile = DEFAULT_PROFILE,
+    parse_cache: Optional[ParseCache] = None,
+    hunks: Optional[List[Tuple[int, int]]] = None,
+    metrics: bool = False,
+    project: bool = False,
+) -> FileResult:
+    """
+    Parse and analyze one file's contents. Runs inside pool workers, so
+    it never raises: failures are reported on the result instead.
+
+    With a cache, functions whose fingerprint is already known are not
+    re-analyzed; only new per-function results are returned for storing,
+    keyed for `profile`. With a parse cache, unchanged sources are not
+    re-parsed either.
+
+    Complexity metrics (`metrics`, for --metrics) and the import summary
+    (`project`, for --project) are only computed when asked for; metrics
+    of unchanged functions come from the cache too.
+
+    With `hunks` (changed line ranges), only the functions overlapping
+    them are analyzed, only issues on changed lines are kept, and no
+    summary or metrics are computed.
+    """
+    try:
+        return _analyze_source(
+            path, source, cache, profile, parse_cache, hunks, metrics, project
+        )
+    except (RecursionError, MemoryError) as e:
+        # Nested too deeply for the parser or a recursive walk, or too
+        # big: only this file fails.
+        return FileResult(path=path, error=f"{type(e).__name__}: {e}")
+
+
+def _analyze_source(
+    path: str,
+    source: str,
+    cache: Optional[IssueCache],
+    profile: Profile,
+    parse_cache: Optional[ParseCache],
+    hunks: Optional[List[Tuple[int, int]]],
+    metrics: bool,
+    project: bool,
+) -> FileResult:
+    cache = cache or _worker_cache
+    parse_cache = parse_cache or _worker_parse_cache
+    engine = compile_engine(profile)
+
+    try:
+        with profiling.stage("parse", path) as counters:
+            parsed = _parse(source, parse_cache)
+            counters["chars"] = len(source)
+    except (SyntaxError, ValueError) as e:
+        return FileResult(path=path, error=f"{type(e).__name__}: {e}")
+
+    if hunks is not None:
+        functions = [
+            fn for fn in parsed["functions"]
+            if overlaps(hunks, first_line(fn), fn.end_line_no)
+        ]
+        parsed = {**parsed, "functions": functions}
+
+    with profiling.stage("analyze", path) as counters:
+        if cache is None:
+            issues, fresh = run_analyzers(parsed, engine), {}
+        else:
+            issues, fresh = run_incremental(
+                parsed,
+                engine.run,
+                lambda key: cache.get_function(profile.key(key)),
+            )
+            counters["functions_reused"] = len(parsed["functions"]) - len(fresh)
+            fresh = {profile.key(key): found for key, found in fresh.items()}
+            # Keep the worker's write transaction (access-time updates) short.
+            cache.commit()
+        issues = profile.apply(issues)
+        if hunks is not None:
+            issues = touched(issues, hunks, parsed["functions"])
+        counters["issues"] = len(issues)
+
+    if hunks is not None:
+        return FileResult(path=path, issues=issues, functions=fresh, hunks=hunks)
+
+    result = FileResult(path=path, issues=issues, functions=fresh)
+
+    if project:
+        with profiling.stage("summarize", path):
+            result.summary = summarize(parsed)
+
+    if metrics:
+        with profiling.stage("metrics", path):
+            if cache is None:
+                result.metrics = function_metrics(parsed)
+            else:
+                result.metrics, result.function_metrics = run_metrics(
+                    parsed, measure, cache.get_function_metrics
+                )
+                cache.commit()
+
+    return result
+
+
+def review_source(
+    path: str,
+    source: str,
+    cache: Optional[IssueCache] = None,
+    profile: Profile = DEFAULT_PROFILE,
+) -> FileResult:
+    """
+    Review one file's contents in-process, answering from and storing
+    into `cache` when given. Used for editor buffers, where the text may
+    differ from what is on disk.
+    """
+    digest = None
+    if cache is not None:
+        digest = content_hash(source.encode("utf-8"))
+        issues = cache.get(profile.key(digest))
+        if issues is not None:
+            return FileResult(path=path, issues=issues, digest=digest, cached=True)
+
+    result = analyze_source(path, source, cache, profile)
+    result.digest = digest
+
+    if cache is not None and result.error is None:
+        _put(cache, result, profile)
+
+    return result
+
+
+def _read(path: str):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        return data, data.decode("utf-8")
+    except (OSError, UnicodeDecodeError) as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def analyze_path(
+    path: str,
+    cache: Optional[IssueCache] = None,
+    profile: Profile = DEFAULT_PROFILE,
+    parse_cache: Optional[ParseCache] = None,
+    hunks: Optional[List[Tuple[int, int]]] = None,
+    metrics: bool = False,
+    project: bool = False,
+) -> FileResult:
+    """
+    Read and analyze one file from disk. The content hash is taken from
+    the bytes actually analyzed, so a file edited mid-run is stored
+    under its new contents.
+    """
+    with profiling.stage("read", path):
+        data, source = _read(path)
+    if data is None:
+        return FileResult(path=path, error=source)
+
+    result = analyze_source(
+        path, source, cache, profile, parse_cache, hunks, metrics, project
+    )
+    result.digest = content_hash(data)
+    if _worker_profiling:
+        result.timings = profiling.active.drain()
+    return result
+
+
+def measure_path(
+    path: str,
+    parse_cache: Optional[ParseCache] = None,
+    cache: Optional[IssueCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Complexity metrics of a file on disk, for files whose metrics are
+    not cached. Unchanged functions are answered from `cache`, which
+    keeps the rest. Empty if it cannot be read or parsed.
+    """
+    data, source = _read(path)
+    if data is None:
+        return []
+    try:
+        parsed = _parse(source, parse_cache)
+        if cache is None:
+            return function_metrics(parsed)
+        found, fresh = run_metrics(parsed, measure, cache.get_function_metrics)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return []
+    for key, metrics in fresh.items():
+        cache.put_function_metrics(key, metrics)
+    cache.put_metrics(content_hash(data), found)
+    cache.commit()
+    return found
+
+
+def _put(cache: IssueCache, result: FileResult, profile: Profile):
+    # Issues depend on the profile; summaries and metrics do not.
+    if result.hunks is None:
+        cache.put(profile.key(result.digest), result.issues)
+        if result.summary is not None:
+            cache.put_summary(result.digest, result.summary)
+        if result.metrics is not None:
+            cache.put_metrics(result.digest, result.metrics)
+    for key, issues in result.functions.items():
+        cache.put_function(key, issues)
+    for key, metrics in result.function_metrics.items():
+        cache.put_function_metrics(key, metrics)
+
+
+def _store(cache: Optional[IssueCache], result: FileResult, profile: Profile):
+    if cache is None or result.error is not None or result.cached:
+        return
+    _put(cache, result, profile)
+    # Commit straight away so pool workers are never kept waiting on
+    # our write lock.
+    cache.commit()
+
+
+def iter_reviews(
+    paths: List[str],
+    jobs: Optional[int] = None,
+    cache: Optional[IssueCache] = None,
+    config: Optional[Config] = None,
+    parse_cache: Optional[ParseCache] = None,
+    hunks: Optional[Hunks] = None,
+    metrics: bool = False,
+    project: bool = False,
+) -> Iterator[FileResult]:
+    """
+    Analyze many files in a process pool, yielding each result as soon
+    as it is ready.
+
+    Files whose contents are already in `cache` are answered first,
+    without parsing; unchanged functions in the others are not
+    re-analyzed. Only paths are queued for the workers, which read the
+    files themselves, so memory does not grow with the size of the run.
+    Misses are submitted largest first so a single big module does not
+    end up as the last task holding back the run. Results come in
+    completion order.
+
+    Each file is analyzed under its `config` profile (core.config).
+    Misses are parsed through `parse_cache` when given
+    (core.parse_cache); workers open their own connection to it.
+
+    With `hunks` ({path: changed line ranges}, core.diff), each file is
+    analyzed only where it changed. Whole-file results are then neither
+    looked up nor stored; per-function ones still are.
+
+    `metrics` and `project` ask analyzed files for their complexity
+    metrics and import summary (see `analyze_source`); answers from the
+    cache carry neither.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    ordered = sorted(paths, key=lambda p: (-_size(p), p))
+    profiles: Dict[str, Profile] = {
+        path: config.profile(path) if config is not None else DEFAULT_PROFILE
+        for path in ordered
+    }
+
+    # Changed lines per path, or None to analyze the whole file
+    ranges: Dict[str, Optional[List[Tuple[int, int]]]] = {
+        path: hunks.get(path, []) if hunks is not None else None
+        for path in ordered
+    }
+
+    misses: List[str] = []
+    for path in ordered:
+        if cache is None or hunks is not None:
+            misses.append(path)
+            continue
+
+        with profiling.stage("cache_lookup", path):
+            data, source = _read(path)
+            if data is not None:
+                digest = content_hash(data)
+                issues = cache.get(profiles[path].key(digest))
+        if data is None:
+            yield FileResult(path=path, error=source)
+        elif issues is None:
+            misses.append(path)
+        else:
+            profiling.count("cache:file_hit")
+            yield FileResult(path=path, issues=issues, digest=digest, cached=True)
+
+    if jobs == 1 or len(misses) <= 1:
+        for path in misses:
+            result = analyze_path(
+                path, cache, profiles[path], parse_cache, ranges[path], metrics, project
+            )
+            _store(cache, result, profiles[path])
+            yield result
+        return
+
+    profiler = profiling.active
+    trace = None if profiler is None else profiler.events is not None
+    cache_dir, ruleset = None, ""
+    if cache is not None:
+        # Workers open their own connections; release our write lock.
+        cache.commit()
+        cache_dir, ruleset = cache.directory, cache.ruleset
+
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(misses)),
+        initializer=_init_worker,
+        initargs=(
+            cache_dir,
+            ruleset,
+            trace,
+            parse_cache.directory if parse_cache is not None else None,
+        ),
+    ) as pool:
+        futures = {
+            pool.submit(
+                analyze_path,
+                path, None, profiles[path], None, ranges[path], metrics, project,
+            ): path
+            for path in misses
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # A worker died or its result could not be sent back;
+                # the other files still complete.
+                result = FileResult(path=futures[future], error=f"{type(e).__name__}: {e}")
+            if result.timings is not None and profiler is not None:
+                profiler.merge(result.timings)
+                result.timings = None
+            _store(cache, result, profiles[result.path])
+            yield result
+
+
+def review_files(
+    paths: List[str],
+    jobs: Optional[int] = None,
+    cache: Optional[IssueCache] = None,
+    config: Optional[Config] = None,
+    parse_cache: Optional[ParseCache] = None,
+    hunks: Optional[Hunks] = None,
+    metrics: bool = False,
+    project: bool = False,
+) -> List[FileResult]:
+    """
+    Like `iter_reviews`, but collects the results in path order
+    regardless of completion order.
+    """
+    return sorted(
+        iter_reviews(paths, jobs, cache, config, parse_cache, hunks, metrics, project),
+        key=lambda r: r.path,
+    )
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from core.snippets import pack_issues, unpack_issues
+from core.types import Issue
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "AI_REVIEW_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ai-review"),
+)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# How long an AI enrichment is reused; like the model responses behind
+# it (llm.cache), it should not outlive `--llm-cache-ttl`.
+DEFAULT_ENRICHMENT_TTL = 7 * 24 * 3600
+
+PYTHON_VERSION = "{}.{}.{}".format(*sys.version_info[:3])
+
+# files:       whole-file issue lists, by content hash
+# functions:   per-function issue lists (lines relative to the function), by fingerprint
+# summaries:   a file's imports and top-level names for project analysis, by content hash
+# metrics:     a file's per-function complexity metrics, by content hash
+# function_metrics: one function's metrics (lines relative to the function), by fingerprint
+# enrichments: AI review / fix for an issue, by issue content and model
+TABLES = (
+    "files", "functions", "summaries", "metrics", "function_metrics", "enrichments",
+)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _key(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _dump(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class IssueCache:
+    """
+    Persistent store for analysis results.
+
+    Static results are keyed by content hash (or function fingerprint),
+    ruleset version and Python version; AI enrichments by the issue
+    content and model. Backed by a single SQLite database in the cache
+    directory. Reads bump an access timestamp; once the stored payloads
+    exceed `max_bytes`, the least recently used entries are evicted on
+    close. Enrichments also expire `enrichment_ttl` seconds after they
+    were stored.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        ruleset: str = "",
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enrichment_ttl: float = DEFAULT_ENRICHMENT_TTL,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, "cache.sqlite3")
+        self.ruleset = ruleset
+        self.max_bytes = max_bytes
+        self.enrichment_ttl = enrichment_ttl
+        self.hits = 0
+        self.misses = 0
+
+        # Not thread-safe by itself: callers sharing one instance across
+        # threads must serialize access (see core.server).
+        self._db = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for table in TABLES:
+            self._db.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    key TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+        self._db.commit()
+
+    # ---------- Storage ----------
+
+    def _get(self, table: str, key: str) -> Optional[Any]:
+        row = self._db.execute(
+            f"SELECT payload FROM {table} WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._db.execute(
+            f"UPDATE {table} SET accessed = ? WHERE key = ?",
+            (time.time(), key),
+        )
+        return json.loads(row[0])
+
+    def _put(self, table: str, key: str, value: Any):
+        payload = _dump(value)
+        self._db.execute(
+            f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)",
+            (key, payload, len(payload), time.time()),
+        )
+
+    # ---------- Whole files ----------
+
+    def get(self, digest: str) -> Optional[List[Issue]]:
+        data = self._get("files", _key(digest, self.ruleset, PYTHON_VERSION))
+        if data is None:
+            return None
+        return unpack_issues(data)
+
+    def put(self, digest: str, issues: List[Issue]):
+        self._put(
+            "files",
+            _key(digest, self.ruleset, PYTHON_VERSION),
+            pack_issues(issues),
+        )
+
+    # ---------- Functions ----------
+
+    def get_function(self, fingerprint: str) -> Optional[List[Issue]]:
+        data = self._get(
+            "functions", _key(fingerprint, self.ruleset, PYTHON_VERSION)
+        )
+        if data is None:
+            return None
+        return unpack_issues(data)
+
+    def put_function(self, fingerprint: str, issues: List[Issue]):
+        self._put(
+            "functions",
+            _key(fingerprint, self.ruleset, PYTHON_VERSION),
+            pack_issues(issues),
+        )
+
+    # ---------- Project summaries ----------
+
+    def get_summary(self, digest: str) -> Optional[Dict[str, Any]]:
+        return self._get("summaries", _key(digest, self.ruleset, PYTHON_VERSION))
+
+    def put_summary(self, digest: str, summary: Dict[str, Any]):
+        self._put("summaries", _key(digest, self.ruleset, PYTHON_VERSION), summary)
+
+    # ---------- Function metrics ----------
+
+    def get_metrics(self, digest: str) -> Optional[List[Dict[str, Any]]]:
+        return self._get("metrics", _key(digest, self.ruleset, PYTHON_VERSION))
+
+    def put_metrics(self, digest: str, metrics: List[Dict[str, Any]]):
+        self._put("metrics", _key(digest, self.ruleset, PYTHON_VERSION), metrics)
+
+    def get_function_metrics(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        return self._get(
+            "function_metrics", _key(fingerprint, self.ruleset, PYTHON_VERSION)
+        )
+
+    def put_function_metrics(self, fingerprint: str, metrics: Dict[str, Any]):
+        self._put(
+            "function_metrics",
+            _key(fingerprint, self.ruleset, PYTHON_VERSION),
+            metrics,
+        )
+
+    # ---------- AI enrichment ----------
+
+    def _enrichment_key(self, issue: Issue, model: str) -> str:
+        # The prompts only see these fields, so the line is left out:
+        # moving an unchanged function does not invalidate its enrichment.
+        return _key(
+            model, issue.category, issue.rule, issue.message,
+            issue.code_snippet, str(issue.severity),
+        )
+
+    def get_enrichment(self, issue: Issue, model: str) -> Optional[Dict[str, Any]]:
+        key = self._enrichment_key(issue, model)
+        row = self._db.execute(
+            "SELECT payload FROM enrichments WHERE key = ?", (key,)
+        ).fetchone()
+        data = json.loads(row[0]) if row is not None else None
+        # Entries from before expiry was tracked have no "created".
+        if data is not None and time.time() - data.pop("created", 0) > self.enrichment_ttl:
+            self._db.execute("DELETE FROM enrichments WHERE key = ?", (key,))
+            data = None
+
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute(
+            "UPDATE enrichments SET accessed = ? WHERE key = ?", (time.time(), key)
+        )
+        return data
+
+    def put_enrichment(self, issue: Issue, model: str, data: Dict[str, Any]):
+        self._put(
+            "enrichments",
+            self._enrichment_key(issue, model),
+            {**data, "created": time.time()},
+        )
+
+    # ---------- Maintenance ----------
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits its budget.
+        """
+        total = sum(
+            self._db.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM {table}"
+            ).fetchone()[0]
+            for table in TABLES
+        )
+        if total <= self.max_bytes:
+            return
+
+        union = " UNION ALL ".join(
+            f"SELECT accessed, '{table}', key, size FROM {table}"
+            for table in TABLES
+        )
+        rows = self._db.execute(f"{union} ORDER BY accessed").fetchall()
+        for _, table, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+            total -= size
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self.evict()
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
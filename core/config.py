@@ -0,0 +1,292 @@
+"""
+`.ai-review.yml` configuration.
+
+A config file applies to its directory and everything below it. Files
+in subdirectories refine their parents' settings rather than replacing
+them, unless they set `root: true`:
+
+    root: false                 # stop inheriting from parent directories
+    exclude:                    # never read or analyzed
+      - build/                  # trailing slash: directories only
+      - "*_pb2.py"              # no slash: matched against the name
+      - tests/fixtures/*.py     # otherwise: relative to this file
+    disable: [style, len_in_loop]   # analyzers or individual rules
+    enable: [len_in_loop]           # undo a parent's `disable`
+    severity:
+      os_system: 3              # rule -> severity (1-5)
+    settings:                   # per-analyzer thresholds and tables
+      style: {max_function_lines: 80, max_args: 7}
+      complexity: {cyclomatic_limit: 15}
+
+Each distinct set of effective settings is a Profile; the engine is
+compiled once per profile (analyzers.compile_engine), so disabled
+analyzers are not registered at all.
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Set, Tuple
+import yaml
+from core.types import Issue
+
+CONFIG_NAME = ".ai-review.yml"
+
+KEYS = {"root", "exclude", "disable", "enable", "severity", "settings"}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+@dataclass
+class Profile:
+    """
+    Effective settings for the files in one directory.
+    """
+
+    # Analyzer names and rule ids
+    disabled: Set[str] = field(default_factory=set)
+    # Rule id -> severity
+    severity: Dict[str, int] = field(default_factory=dict)
+    # Analyzer name -> {setting: value}
+    settings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Empty for the defaults, so unconfigured runs share cache entries
+    # with earlier versions.
+    fingerprint: str = ""
+
+    def enabled(self, name: str) -> bool:
+        return name not in self.disabled
+
+    def key(self, digest: str) -> str:
+        """
+        Cache key for a file or function analyzed under this profile.
+        """
+        if not self.fingerprint:
+            return digest
+        return f"{digest}:{self.fingerprint}"
+
+    def apply(self, issues: List[Issue]) -> List[Issue]:
+        """
+        Drop disabled rules and apply severity overrides.
+        """
+        if not self.fingerprint:
+            return issues
+        found = []
+        for issue in issues:
+            if issue.rule in self.disabled:
+                continue
+            severity = self.severity.get(issue.rule)
+            if severity is not None and severity != issue.severity:
+                issue = replace(issue, severity=severity)
+            found.append(issue)
+        return found
+
+
+DEFAULT_PROFILE = Profile()
+
+
+def _fingerprint(disabled, severity, settings) -> str:
+    if not (disabled or severity or settings):
+        return ""
+    data = json.dumps(
+        {"disabled": sorted(disabled), "severity": severity, "settings": settings},
+        sort_keys=True,
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------- Loading ----------
+
+def _names(data: Dict[str, Any], key: str, path: str) -> List[str]:
+    value = data.get(key) or []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ConfigError(f"{path}: '{key}' must be a list of strings")
+    return value
+
+
+def _setting(rule_cls, name: str, value: Any, path: str) -> Any:
+    if name not in rule_cls.settings:
+        known = ", ".join(rule_cls.settings) or "none"
+        raise ConfigError(
+            f"{path}: unknown setting '{rule_cls.name}.{name}' (known: {known})"
+        )
+    default = getattr(rule_cls, name)
+    # Stored in a JSON-friendly form; the engine converts it back.
+    if isinstance(default, int):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif isinstance(default, (set, frozenset, list, tuple)):
+        if isinstance(value, list):
+            return sorted(set(value)) if isinstance(default, (set, frozenset)) else value
+    elif isinstance(default, dict):
+        if isinstance(value, dict):
+            return value
+    elif isinstance(value, type(default)):
+        return value
+    raise ConfigError(
+        f"{path}: '{rule_cls.name}.{name}' must be of the same kind as its "
+        f"default ({type(default).__name__})"
+    )
+
+
+def load(path: str) -> Dict[str, Any]:
+    """
+    Read and validate one config file.
+    """
+    # Imported here: the analyzers import core modules themselves.
+    from analyzers import DEFAULT_RULES
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        raise ConfigError(f"{path}: {e}") from e
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise ConfigError(f"{path}: expected a mapping")
+
+    unknown = set(data) - KEYS
+    if unknown:
+        raise ConfigError(f"{path}: unknown keys: {', '.join(sorted(unknown))}")
+
+    severity = data.get("severity") or {}
+    if not isinstance(severity, dict):
+        raise ConfigError(f"{path}: 'severity' must map rules to 1-5")
+    for rule, value in severity.items():
+        if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 5:
+            raise ConfigError(f"{path}: severity of '{rule}' must be 1-5")
+
+    analyzers = {rule_cls.name: rule_cls for rule_cls in DEFAULT_RULES}
+    settings: Dict[str, Dict[str, Any]] = {}
+    for name, values in (data.get("settings") or {}).items():
+        if name not in analyzers:
+            raise ConfigError(f"{path}: unknown analyzer '{name}' in 'settings'")
+        if not isinstance(values, dict):
+            raise ConfigError(f"{path}: 'settings.{name}' must be a mapping")
+        settings[name] = {
+            key: _setting(analyzers[name], key, value, path)
+            for key, value in values.items()
+        }
+
+    return {
+        "root": bool(data.get("root", False)),
+        "exclude": _names(data, "exclude", path),
+        "disable": _names(data, "disable", path),
+        "enable": _names(data, "enable", path),
+        "severity": {str(rule): value for rule, value in severity.items()},
+        "settings": settings,
+    }
+
+
+# ---------- Directory layers ----------
+
+class _Layer:
+    # The merged settings of one directory and the ones above it.
+
+    def __init__(self, parent: Optional["_Layer"] = None):
+        # (directory of the config file, pattern)
+        self.exclude: List[Tuple[str, str]] = list(parent.exclude) if parent else []
+        self.disabled: Set[str] = set(parent.disabled) if parent else set()
+        self.severity: Dict[str, int] = dict(parent.severity) if parent else {}
+        self.settings: Dict[str, Dict[str, Any]] = {
+            name: dict(values) for name, values in parent.settings.items()
+        } if parent else {}
+        self.profile: Optional[Profile] = parent.profile if parent else DEFAULT_PROFILE
+
+    def merge(self, data: Dict[str, Any], directory: str):
+        self.exclude.extend((directory, pattern) for pattern in data["exclude"])
+        self.disabled.update(data["disable"])
+        self.disabled.difference_update(data["enable"])
+        self.severity.update(data["severity"])
+        for name, values in data["settings"].items():
+            self.settings.setdefault(name, {}).update(values)
+        self.profile = None
+
+    def get_profile(self) -> Profile:
+        if self.profile is None:
+            self.profile = Profile(
+                disabled=set(self.disabled),
+                severity=dict(self.severity),
+                settings={k: dict(v) for k, v in self.settings.items()},
+                fingerprint=_fingerprint(self.disabled, self.severity, self.settings),
+            )
+        return self.profile
+
+
+def _matches(pattern: str, rel: str, is_dir: bool) -> bool:
+    if pattern.endswith("/"):
+        if not is_dir:
+            return False
+        pattern = pattern.rstrip("/")
+    if "/" not in pattern:
+        return fnmatch.fnmatchcase(rel.rsplit("/", 1)[-1], pattern)
+    return fnmatch.fnmatchcase(rel, pattern.lstrip("/"))
+
+
+class Config:
+    """
+    Settings for any path, from the `.ai-review.yml` files in its
+    directory and the directories above it, over an optional base file
+    (`--config`). Each directory is looked up once per run.
+    """
+
+    def __init__(self, base: Optional[str] = None):
+        self._base = _Layer()
+        if base is not None:
+            self._base.merge(load(base), os.path.dirname(os.path.abspath(base)))
+        self._layers: Dict[str, _Layer] = {}
+
+    def _layer(self, directory: str) -> _Layer:
+        layer = self._layers.get(directory)
+        if layer is not None:
+            return layer
+
+        path = os.path.join(directory, CONFIG_NAME)
+        data = load(path) if os.path.isfile(path) else None
+
+        parent_dir = os.path.dirname(directory)
+        if data is not None and data["root"]:
+            parent = self._base
+        elif parent_dir == directory:
+            parent = self._base
+        else:
+            parent = self._layer(parent_dir)
+
+        if data is None:
+            layer = parent
+        else:
+            layer = _Layer(parent)
+            layer.merge(data, directory)
+        self._layers[directory] = layer
+        return layer
+
+    def profile(self, path: str) -> Profile:
+        """
+        Effective settings for a file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        return self._layer(directory).get_profile()
+
+    def excluded(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Whether a file (or directory) is excluded by a config above it.
+        """
+        path = os.path.abspath(path)
+        for base, pattern in self._layer(os.path.dirname(path)).exclude:
+            rel = os.path.relpath(path, base).replace(os.sep, "/")
+            if rel.startswith("../"):
+                continue
+            parts = rel.split("/")
+            # The path itself, or any directory between it and the config
+            if _matches(pattern, rel, is_dir):
+                return True
+            for n in range(1, len(parts)):
+                if _matches(pattern, "/".join(parts[:n]), True):
+                    return True
+        return False
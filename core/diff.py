@@ -0,0 +1,186 @@
+"""
+Changed lines from a unified diff, for reviewing only what a change
+touches (`review.py --diff-base` / `--diff`).
+
+Line numbers are those of the new side of the diff, i.e. of the files
+as they are on disk. A deletion marks the lines on either side of it,
+so a finding caused by removing code (a variable now unused, a guard
+gone) still counts as touched.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+from core.types import Issue
+
+# {path: sorted, non-overlapping (first line, last line) ranges}
+Hunks = Dict[str, List[Tuple[int, int]]]
+
+_HUNK = re.compile(r"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class DiffError(ValueError):
+    pass
+
+
+def _merge(lines: Iterable[int]) -> List[Tuple[int, int]]:
+    ranges: List[Tuple[int, int]] = []
+    for line in sorted(set(lines)):
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], line)
+        else:
+            ranges.append((line, line))
+    return ranges
+
+
+def _path(header: str, strip: bool) -> Optional[str]:
+    # "+++ b/pkg/mod.py", possibly followed by a tab and a timestamp
+    path = header[4:].split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    if strip and path.startswith("b/"):
+        path = path[2:]
+    return path
+
+
+def parse_diff(text: str) -> Hunks:
+    """
+    Changed lines per file of a unified diff, with any amount of
+    context. Paths are as the diff names them; for git diffs, without
+    the `b/` prefix. Deleted files are left out.
+    """
+    git = "\ndiff --git " in "\n" + text
+    changed: Dict[str, List[int]] = {}
+    lines: Optional[List[int]] = None
+    line_no = 0
+    # Lines of the current hunk still to come, old and new side; past
+    # them, lines are file headers again.
+    old_left = new_left = 0
+
+    for line in text.splitlines():
+        if old_left > 0 or new_left > 0:
+            marker = line[:1]
+            if marker == "+":
+                if lines is not None:
+                    lines.append(line_no)
+                line_no += 1
+                new_left -= 1
+            elif marker == "-":
+                if lines is not None:
+                    # Removed between line_no - 1 and line_no
+                    lines.extend((max(line_no - 1, 1), line_no))
+                old_left -= 1
+            elif marker in (" ", ""):
+                line_no += 1
+                old_left -= 1
+                new_left -= 1
+            # "\ No newline at end of file" counts for neither side.
+            continue
+
+        if line.startswith("+++ "):
+            path = _path(line, git)
+            lines = changed.setdefault(path, []) if path is not None else None
+        elif line.startswith("@@"):
+            match = _HUNK.match(line)
+            if match is None:
+                raise DiffError(f"malformed hunk header: {line}")
+            old_count, start, new_count = match.groups()
+            old_left = int(old_count) if old_count is not None else 1
+            new_left = int(new_count) if new_count is not None else 1
+            line_no = int(start)
+            if new_left == 0:
+                # Nothing on the new side: the header names the line
+                # before the change.
+                line_no += 1
+
+    return {path: _merge(found) for path, found in changed.items() if found}
+
+
+def _git(args: List[str], cwd: str) -> str:
+    try:
+        done = subprocess.run(
+            ["git", "-c", "core.quotePath=false", *args],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except OSError as e:
+        raise DiffError(f"cannot run git: {e}") from e
+    if done.returncode != 0:
+        raise DiffError(f"git {' '.join(args)}: {done.stderr.strip()}")
+    return done.stdout
+
+
+def git_hunks(base: str, cwd: str = ".") -> Hunks:
+    """
+    Lines changed since `base`: the working tree against the merge base
+    of `base` and HEAD, as a pull request against `base` would show it,
+    plus uncommitted edits. Paths are relative to `cwd`.
+    """
+    root = _git(["rev-parse", "--show-toplevel"], cwd).strip()
+    merge_base = _git(["merge-base", base, "HEAD"], cwd).strip()
+    text = _git(
+        ["diff", "--no-color", "--no-ext-diff", "-U0", merge_base, "--", "*.py"],
+        root,
+    )
+    return {
+        os.path.normpath(os.path.relpath(os.path.join(root, path), cwd)): ranges
+        for path, ranges in parse_diff(text).items()
+    }
+
+
+def read_hunks(path: str) -> Hunks:
+    """
+    Changed lines of a unified diff file ('-' for stdin). Paths are
+    taken relative to the current directory.
+    """
+    if path == "-":
+        text = sys.stdin.read()
+    else:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            raise DiffError(f"{path}: {e}") from e
+    return {
+        os.path.normpath(name): ranges
+        for name, ranges in parse_diff(text).items()
+    }
+
+
+# ---------- Matching ----------
+
+def overlaps(ranges: List[Tuple[int, int]], start: int, end: int) -> bool:
+    """
+    Whether lines `start` to `end` touch any of `ranges`.
+    """
+    # Last range starting at or before `end`; ranges are disjoint and
+    # sorted, so it is the only candidate.
+    n = bisect_right(ranges, (end, float("inf"))) - 1
+    return n >= 0 and ranges[n][1] >= start
+
+
+def touched(
+    issues: List[Issue],
+    ranges: List[Tuple[int, int]],
+    functions: Iterable = (),
+) -> List[Issue]:
+    """
+    The issues located on changed lines. Findings about a whole function
+    (its length, its complexity) sit on its `def` line and quote all of
+    it; for the changed `functions` given, those count too. Issues
+    without a location (line 0) are dropped.
+    """
+    whole = {(fn.line_no, fn.span) for fn in functions}
+    return [
+        issue for issue in issues
+        if issue.line > 0 and (
+            overlaps(ranges, issue.line, max(issue.end_line, issue.line))
+            or (issue.line, issue.span) in whole
+        )
+    ]
@@ -0,0 +1,192 @@
+import ast
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple, Type
+from core import profiling
+from core.snippets import unparse
+from core.types import Issue, Snippet
+
+
+class Rule:
+    """
+    Base class for analyzer rules run by the Engine.
+
+    A rule declares the node types it cares about through handler
+    methods named after the node class:
+
+        visit_<NodeType>(node)   called before the node's children
+        leave_<NodeType>(node)   called after the node's children
+
+    One rule instance is created per analyzed unit. Issues are appended
+    to `self.issues`; `finalize()` runs once the walk is done.
+
+    `kinds` lists the units a rule applies to: "function" bodies, and
+    "module" scope (top-level statements and class bodies outside any
+    def). `self.function` is the unit being analyzed either way.
+
+    `name` is what `.ai-review.yml` calls the analyzer; `settings` lists
+    the class attributes a config may override (core.config).
+    """
+
+    kinds: Tuple[str, ...] = ("function",)
+    name: str = ""
+    settings: Tuple[str, ...] = ()
+
+    def __init__(self, function):
+        self.function = function
+        self.issues: List[Issue] = []
+
+    def finalize(self) -> List[Issue]:
+        return self.issues
+
+    def snippet(self, node: ast.AST) -> Snippet:
+        """
+        Snippet quoting `node`, sliced from the file (core.snippets).
+        """
+        index = getattr(self.function, "index", None)
+        if index is None:
+            return Snippet(unparse(node))
+        return index.snippet(node)
+
+
+def _timer(handler: Callable, clock: List[float]) -> Callable:
+    # clock: [wall, cpu, calls], summed over the unit
+    def timed(node):
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        handler(node)
+        clock[0] += time.perf_counter() - start
+        clock[1] += time.thread_time() - cpu
+        clock[2] += 1
+    return timed
+
+
+def _handlers(rule_cls: Type[Rule], prefix: str) -> Dict[type, str]:
+    handlers: Dict[type, str] = {}
+    for attr in dir(rule_cls):
+        if not attr.startswith(prefix):
+            continue
+        node_cls = getattr(ast, attr[len(prefix):], None)
+        if isinstance(node_cls, type) and issubclass(node_cls, ast.AST):
+            handlers[node_cls] = attr
+    return handlers
+
+
+class Engine:
+    """
+    Single-pass rule dispatcher.
+
+    Walks each tree once and sends every node only to the rules that
+    registered a handler for its type. Issues are returned grouped by
+    rule, in registration order, so the output matches running each
+    analyzer on its own.
+
+    Every node is owned by its innermost enclosing function: a nested
+    def (decorators, defaults and body included) is skipped when walking
+    the function around it, because the parser records it as a unit of
+    its own. Likewise the module unit covers only what no def owns.
+    """
+
+    boundaries = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+    def __init__(self, rules: List[Type[Rule]] = ()):
+        self.rules: List[Type[Rule]] = []
+        self._enter: Dict[type, List[Tuple[int, str]]] = defaultdict(list)
+        self._leave: Dict[type, List[Tuple[int, str]]] = defaultdict(list)
+        self.nodes_walked = 0
+        for rule_cls in rules:
+            self.register(rule_cls)
+
+    def register(self, rule_cls: Type[Rule]) -> Type[Rule]:
+        index = len(self.rules)
+        self.rules.append(rule_cls)
+
+        for node_cls, attr in _handlers(rule_cls, "visit_").items():
+            self._enter[node_cls].append((index, attr))
+        for node_cls, attr in _handlers(rule_cls, "leave_").items():
+            self._leave[node_cls].append((index, attr))
+
+        return rule_cls
+
+    def _bind(self, table, instances) -> Dict[type, List[Callable]]:
+        bound = {}
+        for node_cls, entries in table.items():
+            handlers = [
+                getattr(instances[i], attr) for i, attr in entries
+                if instances[i] is not None
+            ]
+            if handlers:
+                bound[node_cls] = handlers
+        return bound
+
+    def run(self, function) -> List[Issue]:
+        instances = [
+            rule_cls(function) if function.kind in rule_cls.kinds else None
+            for rule_cls in self.rules
+        ]
+        enter = self._bind(self._enter, instances)
+        leave = self._bind(self._leave, instances)
+
+        profiler = profiling.active
+        if profiler is not None:
+            # Per-rule handler time; only paid for under --profile.
+            clocks = {id(rule): [0.0, 0.0, 0] for rule in instances}
+            enter, leave = (
+                {
+                    node_cls: [_timer(h, clocks[id(h.__self__)]) for h in handlers]
+                    for node_cls, handlers in table.items()
+                }
+                for table in (enter, leave)
+            )
+
+        # Iterative pre-order walk; a node is pushed a second time
+        # only when some rule wants to see it on the way out.
+        boundaries = self.boundaries
+        walked = 0
+
+        stack: List[Tuple[ast.AST, bool]] = [(function.body, False)]
+        while stack:
+            node, leaving = stack.pop()
+            node_cls = type(node)
+
+            if leaving:
+                for handler in leave[node_cls]:
+                    handler(node)
+                continue
+
+            walked += 1
+            for handler in enter.get(node_cls, ()):
+                handler(node)
+
+            if node_cls in leave:
+                stack.append((node, True))
+
+            children = [
+                child for child in ast.iter_child_nodes(node)
+                if not isinstance(child, boundaries)
+            ]
+            children.reverse()
+            stack.extend((child, False) for child in children)
+
+        self.nodes_walked += walked
+
+        issues: List[Issue] = []
+        for rule in instances:
+            if rule is None:
+                continue
+            if profiler is None:
+                issues.extend(rule.finalize())
+                continue
+            clock = clocks[id(rule)]
+            start = time.perf_counter()
+            cpu = time.thread_time()
+            issues.extend(rule.finalize())
+            clock[0] += time.perf_counter() - start
+            clock[1] += time.thread_time() - cpu
+            profiler.add(
+                f"rule:{rule.name or type(rule).__name__}",
+                clock[0],
+                clock[1],
+                calls=clock[2],
+            )
+        return issues
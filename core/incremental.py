@@ -0,0 +1,165 @@
+import ast
+import hashlib
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.symbols import GLOBALS
+from core.types import Issue, Snippet
+
+
+def first_line(function) -> int:
+    """
+    First line owned by the function: its earliest decorator, or the
+    `def` line when it has none.
+    """
+    decorators = getattr(function.body, "decorator_list", [])
+    return min([d.lineno for d in decorators] + [function.line_no])
+
+
+def fingerprint(function, module_names: str = "") -> str:
+    """
+    Position-independent identity of a function's analysis input.
+
+    Hashes the function's source text (nested functions included) with
+    trailing whitespace normalized, plus its decorators, which the
+    engine walks but `source` does not contain. A nested function also
+    depends on the functions around it, so their names and the names
+    they bind, by kind, are hashed too: a parameter of an enclosing
+    function is a taint source in a closure, a local of one is not a
+    global. `module_names` (see `module_variables`) stands for the
+    module scope around it. Two functions with the same fingerprint
+    produce the same issues up to a line shift.
+    """
+    digest = hashlib.sha256()
+    digest.update(module_names.encode("utf-8") + b"\n")
+    for decorator in getattr(function.body, "decorator_list", []):
+        offset = decorator.lineno - function.line_no
+        digest.update(f"{offset}:{ast.dump(decorator)}\n".encode("utf-8"))
+    for line in function.source.splitlines():
+        digest.update(line.rstrip().encode("utf-8") + b"\n")
+
+    parent = function.parent
+    while parent is not None:
+        digest.update(f"in {parent.name}:".encode("utf-8"))
+        if parent.scope is not None:
+            for name in sorted(parent.scope.symbols):
+                kinds = {b.kind for b in parent.scope.symbols[name].bindings}
+                if kinds:
+                    digest.update(f" {name}={','.join(sorted(kinds))}".encode("utf-8"))
+        digest.update(b"\n")
+        parent = parent.parent
+    return digest.hexdigest()
+
+
+def module_variables(module) -> str:
+    """
+    The variables a module binds, which functions read as globals (see
+    analyzers.performance): the names, not the values, so editing a
+    constant keeps cached results while adding or removing one does not.
+    """
+    if module.scope is None:
+        return ""
+    return " ".join(sorted(
+        name for name, symbol in module.scope.symbols.items()
+        if any(b.kind in GLOBALS for b in symbol.bindings)
+    ))
+
+
+def _shift_one(issue: Issue, delta: int, moved: Dict[int, Snippet]) -> Issue:
+    # Line 0 means "no location" and stays put.
+    changes = {}
+    if issue.line > 0:
+        changes["line"] = issue.line + delta
+    if issue.end_line > 0:
+        changes["end_line"] = issue.end_line + delta
+    if issue.span is not None:
+        # Issues sharing a snippet keep sharing the moved one.
+        snippet = moved.get(id(issue.snippet))
+        if snippet is None:
+            line, col, end_line, end_col = issue.span
+            snippet = moved[id(issue.snippet)] = Snippet(
+                issue.snippet.text, (line + delta, col, end_line + delta, end_col)
+            )
+        changes["snippet"] = snippet
+    return replace(issue, **changes) if changes else issue
+
+
+def shift(issues: List[Issue], delta: int) -> List[Issue]:
+    if not delta:
+        return list(issues)
+    moved: Dict[int, Snippet] = {}
+    return [_shift_one(issue, delta, moved) for issue in issues]
+
+
+def run_incremental(
+    parsed,
+    analyze: Callable[[object], List[Issue]],
+    lookup: Callable[[str], Optional[List[Issue]]],
+) -> Tuple[List[Issue], Dict[str, List[Issue]]]:
+    """
+    Analyze the module scope and the parsed functions, reusing earlier
+    results for unchanged functions.
+
+    `lookup(fingerprint)` returns a function's issues with lines counted
+    from just before `first_line` (so located issues stay >= 1 and line 0
+    keeps meaning "no location"), or None. Returns the file's issues plus
+    the newly computed relative results, keyed by fingerprint, for the
+    caller to store.
+    """
+    # Module scope is always re-analyzed: it excludes every def body,
+    # so walking it is cheap next to the functions.
+    issues: List[Issue] = list(analyze(parsed["module"]))
+    fresh: Dict[str, List[Issue]] = {}
+    module_names = module_variables(parsed["module"])
+
+    for fn in parsed["functions"]:
+        key = fingerprint(fn, module_names)
+        base = first_line(fn) - 1
+        relative = fresh.get(key)
+        if relative is None:
+            relative = lookup(key)
+        if relative is None:
+            relative = shift(analyze(fn), -base)
+            fresh[key] = relative
+        issues.extend(shift(relative, base))
+
+    return issues, fresh
+
+
+def _shift_metrics(metrics: Dict[str, Any], delta: int) -> Dict[str, Any]:
+    if not delta:
+        return metrics
+    return {
+        **metrics,
+        "line": metrics["line"] + delta,
+        "end_line": metrics["end_line"] + delta,
+    }
+
+
+def run_metrics(
+    parsed,
+    measure: Callable[[object], Dict[str, Any]],
+    lookup: Callable[[str], Optional[Dict[str, Any]]],
+) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Complexity metrics of the parsed functions, in source order, like
+    `run_incremental` for issues: functions the engine has just analyzed
+    already carry theirs, unchanged ones are looked up by fingerprint,
+    and only the rest are measured. Returns the metrics plus the ones
+    not found by `lookup`, relative to the function and keyed by
+    fingerprint, for the caller to store.
+    """
+    found: List[Dict[str, Any]] = []
+    fresh: Dict[str, Dict[str, Any]] = {}
+    module_names = module_variables(parsed["module"])
+
+    for fn in parsed["functions"]:
+        key = fingerprint(fn, module_names)
+        base = first_line(fn) - 1
+        relative = fresh.get(key)
+        if relative is None and fn.metrics is None:
+            relative = lookup(key)
+        if relative is None:
+            relative = fresh[key] = _shift_metrics(measure(fn), -base)
+        found.append(_shift_metrics(relative, base))
+
+    return found, fresh
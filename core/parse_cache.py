@@ -0,0 +1,176 @@
+"""
+On-disk cache of parsed modules: what `CodeParser.parse` returns (the
+tree, the function table, the symbol table, the line index and the
+imports), pickled, by content hash.
+
+It lives next to the issue cache but apart from it: entries depend only
+on the source, the interpreter and the parser, so editing a rule or a
+config re-analyzes files without re-parsing them. An entry is stale,
+and never read again, once any of these change:
+
+    the file's contents       (content hash)
+    the interpreter           (version and implementation: AST classes
+                               and pickles differ between them)
+    core/parser.py, symbols.py, snippets.py or types.py
+                              (the classes stored in an entry)
+
+Once the cache outgrows `max_bytes`, least recently used entries are
+evicted on close, stale ones first since nothing reads them; deleting
+`parses.sqlite3` clears it.
+
+Entries are pickles, so the cache directory must be as trusted as the
+code that reads it.
+"""
+
+import gc
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from core import profiling
+from core.cache import content_hash
+from core.parser import CodeParser
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Modules defining the objects stored in an entry
+_PARSER_MODULES = ("parser.py", "symbols.py", "snippets.py", "types.py")
+
+
+@lru_cache(maxsize=None)
+def parser_version() -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{sys.implementation.name}\0{sys.version}\0".encode("utf-8"))
+    for name in _PARSER_MODULES:
+        with open(os.path.join(_HERE, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class ParseCache:
+    """
+    Persistent store of parse results, in its own SQLite database. Each
+    process opens its own instance; pool workers store what they parse
+    themselves, committing after every file.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, "parses.sqlite3")
+        self.max_bytes = max_bytes
+        self.version = parser_version()
+        self.hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parses (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def _key(self, digest: str) -> str:
+        return f"{digest}:{self.version}"
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        key = self._key(digest)
+        row = self._db.execute(
+            "SELECT payload FROM parses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        # Unpickling allocates the whole tree at once; letting the
+        # cyclic GC scan it midway takes longer than the load itself.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            parsed = pickle.loads(row[0])
+        except Exception:
+            # Truncated or otherwise unreadable: parse afresh.
+            self._db.execute("DELETE FROM parses WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+        finally:
+            if enabled:
+                gc.enable()
+
+        self.hits += 1
+        self._db.execute(
+            "UPDATE parses SET accessed = ? WHERE key = ?", (time.time(), key)
+        )
+        return parsed
+
+    def put(self, digest: str, parsed: Dict[str, Any]):
+        try:
+            payload = pickle.dumps(parsed, protocol=pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            # Nested too deeply to pickle; it still parses.
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO parses VALUES (?, ?, ?, ?)",
+            (self._key(digest), payload, len(payload), time.time()),
+        )
+
+    def parse(self, source: str, digest: Optional[str] = None) -> Dict[str, Any]:
+        """
+        `CodeParser(source).parse()`, answered from the cache when the
+        same source was parsed before. Raises what the parser raises.
+        """
+        digest = digest or content_hash(source.encode("utf-8"))
+        parsed = self.get(digest)
+        if parsed is not None:
+            profiling.count("cache:parse_hit")
+        else:
+            parsed = CodeParser(source).parse()
+            # Stored before any analyzer sees it.
+            self.put(digest, parsed)
+        self._db.commit()
+        return parsed
+
+    # ---------- Maintenance ----------
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits its budget.
+        """
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM parses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._db.execute(
+            "SELECT key, size FROM parses ORDER BY accessed"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM parses WHERE key = ?", (key,))
+            total -= size
+
+    def close(self):
+        self.evict()
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
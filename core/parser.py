@@ -1,7 +1,13 @@
 import ast
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Optional, Tuple
+from core.snippets import SourceIndex
+from core.symbols import Scope, ScopeBuilder
+from core.types import Snippet, Span
 
 class ParsedFunction:
+    kind = "function"
+
     def __init__(
         self,
         name: str,
@@ -9,14 +15,48 @@ class ParsedFunction:
         end_line_no: int,
         args: List[str],
         body: ast.AST,
-        source: str,
+        source: Optional[str] = None,
+        span: Optional[Span] = None,
+        col: int = 0,
+        name_end: int = 0,
+        parent: Optional["ParsedFunction"] = None,
+        index: Optional[SourceIndex] = None,
     ):
         self.name = name
         self.line_no = line_no
         self.end_line_no = end_line_no
         self.args = args
         self.body = body
-        self.source = source
+        # Without `source`, it is sliced from `index` when first used.
+        self._source = source
+        self._snippet: Optional[Snippet] = None
+        # The file's shared line index, for snippets (core.snippets)
+        self.index = index
+        # Region covered by `source` (whole lines, def to last statement)
+        self.span = span
+        # Columns of `def name` (or `async def name`) on the def line,
+        # where function-level issues point
+        self.col = col
+        self.name_end = name_end
+        # Enclosing function, if this one is nested.
+        self.parent = parent
+        # Names bound in this unit and their uses, including uses from
+        # nested functions (see core.symbols)
+        self.scope: Optional[Scope] = None
+        # Complexity metrics, left here by analyzers.complexity
+        self.metrics: Optional[Dict[str, Any]] = None
+
+    @property
+    def snippet(self) -> Snippet:
+        # `source` as quoted by every issue about the whole function
+        if self._snippet is None:
+            self._snippet = Snippet(self._source, self.span, self.index)
+        return self._snippet
+
+    @property
+    def source(self) -> str:
+        # Whole lines, def to last statement
+        return self.snippet.text
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -28,17 +68,37 @@ class ParsedFunction:
         }
 
 
-class CodeParser(ast.NodeVisitor):
+class ParsedModule(ParsedFunction):
+    """
+    Module-scope analysis unit: top-level statements and class bodies.
+    Its body is the whole tree, but the engine does not descend into
+    defs, which are units of their own.
+    """
+
+    kind = "module"
+    # The module's SymbolTable
+    symbols = None
+
+
+class CodeParser(ScopeBuilder):
+    """
+    Finds the analysis units of a module and builds its symbol table in
+    the same walk.
+    """
+
     def __init__(self, source_code: str):
+        super().__init__()
         self.source_code = source_code
         self.tree = ast.parse(source_code)
-        self.lines = source_code.splitlines()
+        self.index = SourceIndex(source_code)
         self.functions: List[ParsedFunction] = []
         self.imports: List[str] = []
+        self._scopes: List[ParsedFunction] = []
 
     def parse(self):
         self.visit(self.tree)
         return {
+            "module": self._module(),
             "functions": self.functions,
             "imports": self.imports,
         }
@@ -47,21 +107,21 @@ class CodeParser(ast.NodeVisitor):
 
     def visit_FunctionDef(self, node: ast.FunctionDef):
         self._handle_function(node)
-        self.generic_visit(node)
 
     def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
         self._handle_function(node)
-        self.generic_visit(node)
 
     def visit_Import(self, node: ast.Import):
         for alias in node.names:
             self.imports.append(alias.name)
+        super().visit_Import(node)
 
     def visit_ImportFrom(self, node: ast.ImportFrom):
         module = node.module or ""
         for alias in node.names:
             full_name = f"{module}.{alias.name}" if module else alias.name
             self.imports.append(full_name)
+        super().visit_ImportFrom(node)
 
     # ---------- Helpers ----------
 
@@ -72,22 +132,70 @@ class CodeParser(ast.NodeVisitor):
 
         args = [arg.arg for arg in node.args.args]
 
-        source = self._extract_source(line_no, end_line_no)
-
         parsed_fn = ParsedFunction(
             name=name,
             line_no=line_no,
             end_line_no=end_line_no,
             args=args,
             body=node,
-            source=source,
+            span=(line_no, 0, end_line_no, self._line_bytes(end_line_no)),
+            col=node.col_offset,
+            name_end=self._name_end(node),
+            parent=self._scopes[-1] if self._scopes else None,
+            index=self.index,
         )
 
         self.functions.append(parsed_fn)
 
-    def _extract_source(self, start: int, end: int) -> str:
-        # AST line numbers are 1-based
-        return "\n".join(self.lines[start - 1 : end])
+        self._scopes.append(parsed_fn)
+        super().visit_FunctionDef(node)
+        self._scopes.pop()
+        parsed_fn.scope = self.table.scope_of(node)
+
+    def _module(self) -> ParsedModule:
+        index = self.index
+        end_line_no = max(index.line_count, 1)
+        last = index.line(index.line_count) if index.line_count else ""
+        module = ParsedModule(
+            name="<module>",
+            line_no=1,
+            end_line_no=end_line_no,
+            args=[],
+            body=self.tree,
+            source=self.source_code,
+            span=(1, 0, end_line_no, len(last.encode("utf-8"))),
+            index=index,
+        )
+        module.scope = self.table.module
+        module.symbols = self.table
+        return module
+
+    # Columns are UTF-8 byte offsets, like the ast module's.
+
+    def _line_bytes(self, line_no: int) -> int:
+        line = self.index.line(line_no)
+        return len(line) if line.isascii() else len(line.encode("utf-8"))
+
+    def _name_end(self, node: ast.AST) -> int:
+        return name_columns(self.index, node)[1]
+
+
+# `async def `, `def ` or `class ` up to the name
+_DEF_KEYWORDS = re.compile(rb"(?:async\s+)?(?:def|class)\s+")
+
+
+def name_columns(index: SourceIndex, node: ast.AST) -> Tuple[int, int]:
+    """
+    Byte columns of the name in a def or class statement, on its first
+    line. A name continued onto another line (after a backslash) spans
+    from the keyword to the end of the line.
+    """
+    line = index.line(node.lineno).encode("utf-8")
+    name = node.name.encode("utf-8")
+    match = _DEF_KEYWORDS.match(line, node.col_offset)
+    if match is None or not line.startswith(name, match.end()):
+        return node.col_offset, len(line)
+    return match.end(), match.end() + len(name)
 
 
 # ---------- Public API ----------
@@ -0,0 +1,210 @@
+"""
+Opt-in timing instrumentation (`--profile`).
+
+Stages are timed with `stage(name)`: wall and CPU time (of the calling
+thread) and a call count, plus any numeric counters the stage adds to
+the dict it yields. Analyzer rules are timed per handler call by the
+engine, and model calls by the LLM layer, which also count prompt and
+response sizes, cache hits and retries.
+
+`active` is this process's profiler, or None when profiling is off;
+every hook checks it first, so a normal run pays one global lookup per
+stage and per analysis unit. Pool workers profile into their own
+profiler and send each file's timings back with its result, where they
+are merged: with several workers, times are totals across processes.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+# The profiler of this process; None when profiling is off
+active: Optional["Profiler"] = None
+
+_COUNTS: Dict[str, Any] = {}
+
+
+class Profiler:
+    def __init__(self, trace: bool = False):
+        # name -> {"count", "wall_s", "cpu_s", counters...}
+        self.stats: Dict[str, Dict[str, float]] = {}
+        # Chrome trace events, when asked for
+        self.events: Optional[List[Dict[str, Any]]] = [] if trace else None
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        name: str,
+        wall: float,
+        cpu: float,
+        start: Optional[float] = None,
+        detail: Optional[str] = None,
+        count: int = 1,
+        **counters: float,
+    ):
+        """
+        Record `count` calls of `name` taking `wall` / `cpu` seconds in
+        all. With tracing on and a `start` (perf_counter) time, the call
+        is also written as a trace event, labelled with `detail`.
+        """
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = {"count": 0, "wall_s": 0.0, "cpu_s": 0.0}
+            stat["count"] += count
+            stat["wall_s"] += wall
+            stat["cpu_s"] += cpu
+            for key, value in counters.items():
+                stat[key] = stat.get(key, 0) + value
+
+            if self.events is not None and start is not None:
+                args: Dict[str, Any] = dict(counters)
+                if detail is not None:
+                    args["detail"] = detail
+                self.events.append({
+                    "name": name,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": wall * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                })
+
+    def count(self, name: str, n: int = 1):
+        """
+        Count an event that takes no time of its own (a cache hit, a
+        retry).
+        """
+        self.add(name, 0.0, 0.0, count=n)
+
+    @contextmanager
+    def stage(self, name: str, detail: Optional[str] = None) -> Iterator[Dict[str, float]]:
+        counters: Dict[str, float] = {}
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield counters
+        finally:
+            self.add(
+                name,
+                time.perf_counter() - start,
+                time.thread_time() - cpu,
+                start,
+                detail,
+                **counters,
+            )
+
+    # ---------- Across processes ----------
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Everything recorded so far, for merging elsewhere; starts over.
+        """
+        with self._lock:
+            data = {"stats": self.stats, "events": self.events}
+            self.stats = {}
+            if self.events is not None:
+                self.events = []
+        return data
+
+    def merge(self, data: Dict[str, Any]):
+        with self._lock:
+            for name, other in data["stats"].items():
+                stat = self.stats.setdefault(name, {"count": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                for key, value in other.items():
+                    stat[key] = stat.get(key, 0) + value
+            if self.events is not None and data.get("events"):
+                self.events.extend(data["events"])
+
+    # ---------- Output ----------
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        {name: {"count", "wall_s", "cpu_s", counters...}}, slowest first.
+        """
+        with self._lock:
+            ordered = sorted(self.stats.items(), key=lambda item: (-item[1]["wall_s"], item[0]))
+            return {
+                name: {
+                    key: round(value, 6) if isinstance(value, float) else value
+                    for key, value in stat.items()
+                }
+                for name, stat in ordered
+            }
+
+    def print_table(self, out: TextIO = sys.stderr):
+        stats = self.to_dict()
+        width = max([len(name) for name in stats] + [5])
+        print(
+            f"{'stage':<{width}} {'calls':>8} {'wall s':>10} {'cpu s':>10} "
+            f"{'avg ms':>9}  counters",
+            file=out,
+        )
+        for name, stat in stats.items():
+            calls = stat["count"]
+            extra = ", ".join(
+                f"{key}={value}" for key, value in stat.items()
+                if key not in ("count", "wall_s", "cpu_s")
+            )
+            avg = stat["wall_s"] * 1000 / calls if calls else 0.0
+            print(
+                f"{name:<{width}} {calls:>8} {stat['wall_s']:>10.4f} "
+                f"{stat['cpu_s']:>10.4f} {avg:>9.3f}  {extra}",
+                file=out,
+            )
+
+    def write_trace(self, path: str):
+        """
+        Write the recorded events in Chrome's trace event format, for
+        chrome://tracing or Perfetto.
+        """
+        events = self.events or []
+        origin = min((event["ts"] for event in events), default=0.0)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"displayTimeUnit": "ms", "traceEvents": [')
+            for n, event in enumerate(events):
+                f.write(",\n" if n else "\n")
+                f.write(json.dumps({**event, "ts": round(event["ts"] - origin, 3)}))
+            f.write("\n]}\n")
+
+
+# ---------- Module-level hooks ----------
+
+def start(trace: bool = False) -> Profiler:
+    global active
+    active = Profiler(trace)
+    return active
+
+
+def stop():
+    global active
+    active = None
+
+
+@contextmanager
+def _idle() -> Iterator[Dict[str, float]]:
+    # Counters written while profiling is off go nowhere.
+    _COUNTS.clear()
+    yield _COUNTS
+
+
+def stage(name: str, detail: Optional[str] = None):
+    """
+    Time a block as stage `name` when profiling is on:
+
+        with profiling.stage("parse") as counters:
+            counters["lines"] = ...
+    """
+    if active is None:
+        return _idle()
+    return active.stage(name, detail)
+
+
+def count(name: str, n: int = 1):
+    if active is not None:
+        active.count(name, n)
@@ -0,0 +1,634 @@
+"""
+Project-level import analysis for a batch run.
+
+Each file is reduced to a small JSON summary (its imports, top-level
+definitions and which of them it uses itself) while it is analyzed;
+summaries are cached by content hash next to the file's issues, so an
+unchanged file is never parsed again. The summaries are joined into an
+import graph to find modules nothing imports, public names no module
+uses, and import cycles.
+
+The graph's findings are kept in a per-project index. On the next run
+only modules that changed, and the modules they import or used to
+import, have their findings recomputed.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import sqlite3
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from core.cache import PYTHON_VERSION, content_hash
+from core.parser import CodeParser, name_columns
+from core.snippets import SourceIndex, pack_issues, unpack_issues
+from core.types import Issue, Snippet
+
+# Files run directly or by tools rather than imported
+ENTRY_FILES = {"__init__.py", "__main__.py", "setup.py", "conftest.py"}
+
+EXPORT_KINDS = ("def", "class", "assign", "annassign")
+
+
+# ---------- Summaries ----------
+
+def _is_type_checking(test: ast.AST) -> bool:
+    return (
+        isinstance(test, ast.Name) and test.id == "TYPE_CHECKING"
+        or isinstance(test, ast.Attribute) and test.attr == "TYPE_CHECKING"
+    )
+
+
+def _is_main_guard(stmt: ast.stmt) -> bool:
+    if not isinstance(stmt, ast.If) or not isinstance(stmt.test, ast.Compare):
+        return False
+    test = stmt.test
+    operands = [test.left] + test.comparators
+    return (
+        any(isinstance(o, ast.Name) and o.id == "__name__" for o in operands)
+        and any(isinstance(o, ast.Constant) and o.value == "__main__" for o in operands)
+    )
+
+
+def _imports(body: List[ast.stmt], runtime: bool, found: List[Tuple[ast.stmt, bool]]):
+    # Statements only; `runtime` is whether the import runs when the
+    # module itself is imported.
+    for stmt in body:
+        if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+            found.append((stmt, runtime))
+        elif isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            _imports(stmt.body, False, found)
+        elif isinstance(stmt, ast.If) and _is_type_checking(stmt.test):
+            _imports(stmt.body, False, found)
+            _imports(stmt.orelse, runtime, found)
+        elif isinstance(stmt, ast.Match):
+            for case in stmt.cases:
+                _imports(case.body, runtime, found)
+        else:
+            for field in ("body", "orelse", "finalbody"):
+                _imports(getattr(stmt, field, ()), runtime, found)
+            for handler in getattr(stmt, "handlers", ()):
+                _imports(handler.body, runtime, found)
+
+
+def _dunder_all(tree: ast.Module) -> Optional[List[str]]:
+    names = None
+    for stmt in tree.body:
+        if isinstance(stmt, ast.Assign):
+            targets = stmt.targets
+        elif isinstance(stmt, ast.AugAssign):
+            targets = [stmt.target]
+        else:
+            continue
+        if not any(isinstance(t, ast.Name) and t.id == "__all__" for t in targets):
+            continue
+        try:
+            value = ast.literal_eval(stmt.value)
+        except (ValueError, TypeError, SyntaxError, RecursionError):
+            continue
+        if isinstance(value, (list, tuple)):
+            names = (names or []) + [v for v in value if isinstance(v, str)]
+    return names
+
+
+def _name_location(index: SourceIndex, binding) -> List[int]:
+    # `def name` / `class name` rather than the whole definition
+    node = binding.node
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return [binding.line, binding.col, binding.end_line, binding.end_col]
+    return [node.lineno, node.col_offset, node.lineno, name_columns(index, node)[1]]
+
+
+def summarize(parsed) -> Dict[str, Any]:
+    """
+    What the project pass needs to know about one parsed file.
+    """
+    module = parsed["module"]
+    table = module.symbols
+    tree = module.body
+
+    by_alias = {}
+    for scope in table.scopes.values():
+        for symbol in scope.symbols.values():
+            for binding in symbol.bindings:
+                if binding.kind == "import":
+                    by_alias[binding.node] = (symbol, binding)
+    # Module-level imports nothing in the module uses; whether another
+    # module takes them from here is only known to the graph.
+    unused = set(table.module.unused(("import",)))
+
+    found: List[Tuple[ast.stmt, bool]] = []
+    _imports(tree.body, True, found)
+
+    imports = []
+    for stmt, runtime in found:
+        for alias in stmt.names:
+            symbol, binding = by_alias.get(alias, (None, None))
+            attrs = set()
+            if symbol is not None:
+                attrs = {table.attribute_chain(use) for use in symbol.uses}
+                attrs.discard(None)
+            is_unused = symbol in unused and not (
+                isinstance(stmt, ast.ImportFrom) and stmt.module == "__future__"
+            )
+            imports.append({
+                "from": isinstance(stmt, ast.ImportFrom),
+                "module": (stmt.module or "") if isinstance(stmt, ast.ImportFrom) else alias.name,
+                "level": getattr(stmt, "level", 0) or 0,
+                "name": alias.name if isinstance(stmt, ast.ImportFrom) else None,
+                "alias": alias.asname,
+                "runtime": runtime,
+                "location": [stmt.lineno, stmt.col_offset, stmt.end_lineno, stmt.end_col_offset],
+                "attrs": sorted(attrs),
+                # Where the unused name is bound, else None
+                "unused": (
+                    [binding.line, binding.col, binding.end_line, binding.end_col]
+                    if is_unused else None
+                ),
+                "bound": symbol.name if symbol is not None else None,
+            })
+
+    exports = []
+    for name, symbol in table.module.symbols.items():
+        if name.startswith("_") or not symbol.bindings:
+            continue
+        binding = symbol.bindings[0]
+        if binding.kind not in EXPORT_KINDS:
+            continue
+        exports.append({
+            "name": name,
+            "kind": binding.kind,
+            "used": symbol.used,
+            "decorated": bool(getattr(binding.node, "decorator_list", None)),
+            "location": _name_location(module.index, binding),
+        })
+    exports.sort(key=lambda e: (e["location"], e["name"]))
+
+    return {
+        "imports": imports,
+        "exports": exports,
+        "all": _dunder_all(tree),
+        "main": any(_is_main_guard(stmt) for stmt in tree.body),
+    }
+
+
+# ---------- Module names ----------
+
+@lru_cache(maxsize=None)
+def _package(directory: str) -> Tuple[str, ...]:
+    if not os.path.isfile(os.path.join(directory, "__init__.py")):
+        return ()
+    parent = os.path.dirname(directory)
+    if parent == directory:
+        return (os.path.basename(directory),)
+    return _package(parent) + (os.path.basename(directory),)
+
+
+def module_name(path: str, root: Optional[str] = None) -> str:
+    """
+    Dotted import name of a file, as if `root` were on `sys.path`:
+    directories below it are packages whether or not they have an
+    `__init__.py`. Above `root`, only directories with one count.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    parts = _package(directory)
+    if root is not None:
+        relative = os.path.relpath(directory, root)
+        if relative == ".":
+            parts = _package(root)
+        elif not relative.startswith(os.pardir):
+            parts = _package(root) + tuple(relative.split(os.sep))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if stem != "__init__":
+        parts += (stem,)
+    return ".".join(parts)
+
+
+def _is_entry(path: str, summary: Dict[str, Any]) -> bool:
+    base = os.path.basename(path)
+    return (
+        base in ENTRY_FILES
+        or base.startswith("test_")
+        or base.endswith("_test.py")
+        or summary["main"]
+    )
+
+
+# ---------- Graph ----------
+
+class _Graph:
+    """
+    Imports of every module resolved against the modules in the run.
+    """
+
+    def __init__(self, names: Dict[str, str], summaries: Dict[str, Dict[str, Any]]):
+        self.names = names
+        self.paths = {name: path for path, name in names.items()}
+        self.summaries = summaries
+        # path -> [(target path, import record)] for imports that run on load
+        self.edges: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        # path -> every module its imports resolve to or take names from
+        self.imports: Dict[str, Set[str]] = {}
+        # path -> number of other modules importing it
+        self.importers: Dict[str, int] = {path: 0 for path in names}
+        # path -> names other modules take from it; None means all (`*`)
+        self.used: Dict[str, Optional[Set[str]]] = {path: set() for path in names}
+
+        for path, summary in summaries.items():
+            self._add(path, summary)
+
+    def _base(self, path: str, record: Dict[str, Any]) -> str:
+        package = self.names[path].split(".")
+        if os.path.basename(path) != "__init__.py":
+            package = package[:-1]
+        if not record["level"]:
+            module = record["module"]
+            if package and self._longest(module)[0] is None:
+                # A script run directly can import its neighbours by
+                # their bare name.
+                first = module.split(".")[0]
+                if ".".join(package + [first]) in self.paths:
+                    return ".".join(package + [module])
+            return module
+        package = package[:len(package) - record["level"] + 1]
+        return ".".join(package + ([record["module"]] if record["module"] else []))
+
+    def _longest(self, dotted: str) -> Tuple[Optional[str], List[str]]:
+        # Longest prefix that is a module in the run, and the rest.
+        parts = dotted.split(".")
+        for cut in range(len(parts), 0, -1):
+            path = self.paths.get(".".join(parts[:cut]))
+            if path is not None:
+                return path, parts[cut:]
+        return None, parts
+
+    def _use(self, path: str, target: str, name: Optional[str]):
+        self.imports[path].add(target)
+        used = self.used[target]
+        if used is None:
+            return
+        if name == "*":
+            self.used[target] = None
+        elif name:
+            used.add(name)
+
+    def _add(self, path: str, summary: Dict[str, Any]):
+        edges = self.edges.setdefault(path, [])
+        self.imports[path] = set()
+        targets: Set[str] = set()
+
+        for record in summary["imports"]:
+            base = self._base(path, record)
+            if record["from"]:
+                submodule = self.paths.get(f"{base}.{record['name']}")
+                if submodule is not None:
+                    target, rest = submodule, []
+                    for attr in record["attrs"]:
+                        self._use(path, submodule, attr.split(".")[0])
+                else:
+                    target, rest = self._longest(base)
+                    if target is not None and not rest:
+                        self._use(path, target, record["name"])
+            else:
+                target, rest = self._longest(base)
+                # `import a.b` binds `a`; `import a.b as m` binds `a.b`
+                bound = base if record["alias"] else base.split(".")[0]
+                for attr in record["attrs"]:
+                    owner, names = self._longest(f"{bound}.{attr}")
+                    if owner is not None and names:
+                        self._use(path, owner, names[0])
+
+            if target is None or target == path:
+                continue
+            self.imports[path].add(target)
+            if target not in targets:
+                targets.add(target)
+                self.importers[target] += 1
+            if record["runtime"]:
+                edges.append((target, record))
+
+    def targets(self, path: str) -> Set[str]:
+        return {target for target, _ in self.edges.get(path, [])}
+
+    def cycles(self) -> List[List[str]]:
+        """
+        Strongly connected components with more than one module, over
+        imports that run at load time (Tarjan, iterative).
+        """
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        found: List[List[str]] = []
+        counter = 0
+
+        for root in sorted(self.edges):
+            if root in index:
+                continue
+            work = [(root, iter(sorted(self.targets(root))))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self.targets(child)))))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                if advanced:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        found.append(sorted(component))
+
+        return sorted(found)
+
+
+# ---------- Findings ----------
+
+def _location(location: List[int]) -> Dict[str, int]:
+    line, col, end_line, end_col = location
+    return {"line": line, "col": col, "end_line": end_line, "end_col": end_col}
+
+
+def _import_text(record: Dict[str, Any]) -> str:
+    if not record["from"]:
+        text = f"import {record['module']}"
+    else:
+        text = f"from {'.' * record['level']}{record['module']} import {record['name']}"
+    if record["alias"]:
+        text += f" as {record['alias']}"
+    return text
+
+
+def _module_findings(graph: _Graph, path: str) -> List[Issue]:
+    summary = graph.summaries[path]
+    name = graph.names[path]
+    issues: List[Issue] = []
+
+    used = graph.used[path]
+    exported = set(summary["all"] or ())
+
+    # A package's __init__ imports names for its importers; a module
+    # star-imported somewhere passes on everything it binds.
+    if os.path.basename(path) != "__init__.py" and used is not None:
+        for record in summary["imports"]:
+            bound = record["bound"]
+            if not record["unused"] or bound in used or bound in exported:
+                continue
+            issues.append(
+                Issue(
+                    category="maintainability",
+                    rule="unused_import",
+                    message=f"Imported name '{bound}' is never used.",
+                    snippet=Snippet(_import_text(record), tuple(record["location"])),
+                    severity=1,
+                    **_location(record["unused"]),
+                )
+            )
+
+    if _is_entry(path, summary):
+        return issues
+
+    if not graph.importers[path]:
+        issues.append(
+            Issue(
+                line=1,
+                category="maintainability",
+                rule="unused_module",
+                message=f"Module '{name}' is not imported by any other module in the project.",
+                snippet=Snippet(name),
+                severity=1,
+                end_line=1,
+            )
+        )
+
+    if used is None:
+        return issues
+
+    for export in summary["exports"]:
+        if (
+            export["used"]
+            or export["decorated"]
+            or export["name"] in used
+            or export["name"] in exported
+        ):
+            continue
+        issues.append(
+            Issue(
+                category="maintainability",
+                rule="unused_export",
+                message=(
+                    f"'{export['name']}' is never used in '{name}' "
+                    "or imported by any other module in the project."
+                ),
+                snippet=Snippet(export["name"], tuple(export["location"])),
+                severity=1,
+                **_location(export["location"]),
+            )
+        )
+
+    return issues
+
+
+def _cycle_findings(graph: _Graph) -> Dict[str, List[Issue]]:
+    found: Dict[str, List[Issue]] = {}
+    for component in graph.cycles():
+        members = set(component)
+        chain = " -> ".join(graph.names[p] for p in component)
+        for path in component:
+            for target, record in graph.edges[path]:
+                if target not in members:
+                    continue
+                found.setdefault(path, []).append(
+                    Issue(
+                        category="bug",
+                        rule="circular_import",
+                        message=(
+                            f"Import of '{graph.names[target]}' is part of an "
+                            f"import cycle ({chain})."
+                        ),
+                        snippet=Snippet(_import_text(record), tuple(record["location"])),
+                        severity=3,
+                        **_location(record["location"]),
+                    )
+                )
+    return found
+
+
+# ---------- Index ----------
+
+class ProjectIndex:
+    """
+    Persistent import-graph findings for the files under `root`.
+
+    Stores, per file, the content hash it was last analyzed with, the
+    modules its imports reach and its findings. `update` recomputes
+    findings only for modules whose import edges may have changed.
+    Without a directory the index lives in memory for one run.
+    """
+
+    def __init__(self, directory: Optional[str], root: str, ruleset: str = ""):
+        self.root = os.path.abspath(root)
+        self.ruleset = ruleset
+        self.recomputed = 0
+        if directory is None:
+            location = ":memory:"
+        else:
+            os.makedirs(directory, exist_ok=True)
+            location = os.path.join(directory, "project.sqlite3")
+        self._db = sqlite3.connect(location, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS modules (
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                stamp TEXT NOT NULL,
+                targets TEXT NOT NULL,
+                findings BLOB NOT NULL,
+                PRIMARY KEY (root, path)
+            )
+            """
+        )
+        self._db.commit()
+
+    def _stamp(self, digest: str) -> str:
+        # Findings also depend on the analysis code and on module names.
+        parts = (digest, self.ruleset, PYTHON_VERSION)
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _stored(self) -> Dict[str, Tuple[str, List[str], bytes]]:
+        rows = self._db.execute(
+            "SELECT path, stamp, targets, findings FROM modules WHERE root = ?",
+            (self.root,),
+        )
+        return {
+            path: (stamp, json.loads(targets), findings)
+            for path, stamp, targets, findings in rows
+        }
+
+    def update(
+        self,
+        digests: Dict[str, str],
+        summary: Callable[[str], Dict[str, Any]],
+    ) -> Dict[str, List[Issue]]:
+        """
+        Bring the index up to date with the run's files (path -> content
+        hash) and return every file's findings. `summary(path)` is only
+        called when something changed and the graph has to be rebuilt.
+        """
+        stamps = {path: self._stamp(digest) for path, digest in digests.items()}
+        stored = self._stored()
+        changed = {p for p, stamp in stamps.items() if p not in stored or stored[p][0] != stamp}
+        removed = set(stored) - set(stamps)
+
+        if not changed and not removed:
+            return {
+                path: unpack_issues(json.loads(row[2]))
+                for path, row in stored.items()
+            }
+
+        names = {path: module_name(path, self.root) for path in digests}
+        graph = _Graph(names, {path: summary(path) for path in digests})
+
+        if removed or not changed <= set(stored):
+            # Adding or removing a module can change how any import resolves.
+            dirty = set(digests)
+        else:
+            dirty = set(changed)
+            for path in changed:
+                dirty |= graph.imports[path]
+                dirty |= {p for p in stored[path][1] if p in digests}
+
+        # Cycles are cheap to find again and can pass through clean modules.
+        cycles = _cycle_findings(graph)
+        results: Dict[str, List[Issue]] = {}
+        for path in digests:
+            if path in dirty:
+                own = _module_findings(graph, path)
+                self.recomputed += 1
+            else:
+                own = [
+                    issue for issue in unpack_issues(json.loads(stored[path][2]))
+                    if issue.rule != "circular_import"
+                ]
+            results[path] = own + cycles.get(path, [])
+
+        self._db.executemany(
+            "DELETE FROM modules WHERE root = ? AND path = ?",
+            [(self.root, path) for path in removed],
+        )
+        self._db.executemany(
+            "INSERT OR REPLACE INTO modules VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    self.root, path, stamps[path],
+                    json.dumps(sorted(graph.imports[path])),
+                    json.dumps(pack_issues(results[path]), separators=(",", ":")),
+                )
+                for path in digests
+            ],
+        )
+        self._db.commit()
+        return results
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def summarize_path(path: str, cache=None, digest: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Summary of a file on disk, for files whose summary is not cached. A
+    file that no longer reads or parses contributes nothing to the graph.
+    With an IssueCache, the summary is stored for the next run under
+    `digest`, provided the file still has that content.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        summary = summarize(CodeParser(data.decode("utf-8")).parse())
+    except (OSError, UnicodeDecodeError, SyntaxError, ValueError, RecursionError):
+        return {"imports": [], "exports": [], "all": None, "main": False}
+    if cache is not None and digest == content_hash(data):
+        cache.put_summary(digest, summary)
+    return summary
+
+
+def project_root(paths: Iterable[str]) -> str:
+    """
+    Deepest directory containing every path.
+    """
+    paths = [os.path.abspath(p) for p in paths]
+    root = os.path.commonpath(paths) if paths else os.getcwd()
+    return root if os.path.isdir(root) else os.path.dirname(root)
@@ -0,0 +1,260 @@
+"""
+Long-lived review server speaking JSON-RPC 2.0 over stdio, one message
+per line. Analyzers, the cache connection and the LLM client stay warm
+between requests.
+
+Requests:
+    review   {"path": str, "text": str?, "ai": bool?}
+             -> {"path": str, "issues": [entry, ...]}
+             With "ai", a "review/static" notification carrying the
+             static entries is sent first, before any model call.
+    cancel   {"id": <request id>}
+    shutdown {}
+
+A newer `review` for the same path cancels the older one, which then
+fails with code -32800. Files that cannot be read or parsed, or whose
+`.ai-review.yml` is invalid, fail with -32001. Files the config
+excludes get no issues.
+"""
+import itertools
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, TextIO, Tuple
+from core.batch import review_source
+from core.config import DEFAULT_PROFILE, ConfigError
+from llm.enrich import DEFAULT_CONCURRENCY, enrich
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+REQUEST_CANCELLED = -32800
+REVIEW_FAILED = -32001
+
+
+class Cancelled(Exception):
+    pass
+
+
+class ReviewFailed(Exception):
+    pass
+
+
+class _LockedCache:
+    """
+    Serializes access to a cache shared by the request threads.
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._cache, name)
+        if not callable(attr):
+            return attr
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return locked
+
+
+class ReviewServer:
+    def __init__(
+        self,
+        cache=None,
+        config=None,
+        llm=None,
+        model: str = "",
+        workers: int = 4,
+        ai_concurrency: int = DEFAULT_CONCURRENCY,
+        ai_timeout: Optional[float] = None,
+        ai_batch: bool = True,
+        stdin: TextIO = sys.stdin,
+        stdout: TextIO = sys.stdout,
+    ):
+        self.cache = _LockedCache(cache) if cache is not None else None
+        self.config = config
+        self.llm = llm
+        self.model = model
+        self.ai_concurrency = ai_concurrency
+        self.ai_timeout = ai_timeout
+        self.ai_batch = ai_batch
+        self.stdin = stdin
+        self.stdout = stdout
+
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._write_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        # Reviews in flight are numbered here rather than by their
+        # request id, which clients may reuse or leave out (notifications).
+        self._serials = itertools.count()
+        self._tokens: Dict[int, threading.Event] = {}
+        # request id -> serial, for `cancel`
+        self._ids: Dict[Any, int] = {}
+        # path -> serial of its newest review
+        self._latest: Dict[str, int] = {}
+
+    # ---------- Transport ----------
+
+    def _send(self, message: Dict[str, Any]):
+        message["jsonrpc"] = "2.0"
+        line = json.dumps(message, separators=(",", ":"))
+        with self._write_lock:
+            self.stdout.write(line + "\n")
+            self.stdout.flush()
+
+    def _reply(self, req_id, result):
+        self._send({"id": req_id, "result": result})
+
+    def _error(self, req_id, code: int, message: str):
+        self._send({"id": req_id, "error": {"code": code, "message": message}})
+
+    def serve(self):
+        try:
+            for line in self.stdin:
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError as e:
+                    self._error(None, PARSE_ERROR, str(e))
+                    continue
+                if not self._dispatch(message):
+                    break
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            if self.cache is not None:
+                self.cache.close()
+
+    def _dispatch(self, message) -> bool:
+        if not isinstance(message, dict) or "method" not in message:
+            self._error(None, INVALID_REQUEST, "Invalid request")
+            return True
+
+        req_id = message.get("id")
+        method = message["method"]
+        params = message.get("params") or {}
+
+        if method == "shutdown":
+            for token in list(self._tokens.values()):
+                token.set()
+            self._reply(req_id, None)
+            return False
+
+        if method == "cancel":
+            with self._state_lock:
+                serial = self._ids.get(params.get("id"))
+                token = self._tokens.get(serial)
+            if token is not None:
+                token.set()
+            if req_id is not None:
+                self._reply(req_id, None)
+            return True
+
+        if method == "review":
+            path = params.get("path")
+            if not isinstance(path, str):
+                self._error(req_id, INVALID_PARAMS, "'path' is required")
+                return True
+            serial, token = self._track(req_id, path)
+            self._pool.submit(self._run_review, req_id, params, serial, token)
+            return True
+
+        self._error(req_id, METHOD_NOT_FOUND, f"Unknown method '{method}'")
+        return True
+
+    # ---------- Cancellation ----------
+
+    def _track(self, req_id, path: str) -> Tuple[int, threading.Event]:
+        token = threading.Event()
+        with self._state_lock:
+            serial = next(self._serials)
+            stale = self._latest.get(path)
+            if stale is not None and stale in self._tokens:
+                self._tokens[stale].set()
+            self._tokens[serial] = token
+            self._latest[path] = serial
+            if req_id is not None:
+                self._ids[req_id] = serial
+        return serial, token
+
+    def _untrack(self, req_id, serial: int, path: str):
+        with self._state_lock:
+            self._tokens.pop(serial, None)
+            if self._latest.get(path) == serial:
+                del self._latest[path]
+            if req_id is not None and self._ids.get(req_id) == serial:
+                del self._ids[req_id]
+
+    # ---------- Review ----------
+
+    def _run_review(self, req_id, params, serial: int, token: threading.Event):
+        path = params["path"]
+        try:
+            self._reply(req_id, self._review(req_id, params, token))
+        except Cancelled:
+            self._error(req_id, REQUEST_CANCELLED, "Request cancelled")
+        except (ReviewFailed, OSError, ConfigError) as e:
+            self._error(req_id, REVIEW_FAILED, str(e))
+        except Exception as e:
+            self._error(req_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        finally:
+            self._untrack(req_id, serial, path)
+            if self.cache is not None:
+                self.cache.commit()
+
+    def _review(self, req_id, params, token: threading.Event):
+        path = params["path"]
+        text: Optional[str] = params.get("text")
+        if text is None:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+
+        if token.is_set():
+            raise Cancelled()
+
+        if self.config is None:
+            profile = DEFAULT_PROFILE
+        elif self.config.excluded(path):
+            return {"path": path, "issues": []}
+        else:
+            profile = self.config.profile(path)
+
+        file_result = review_source(path, text, self.cache, profile)
+        if file_result.error:
+            raise ReviewFailed(file_result.error)
+
+        entries = [issue.to_dict() for issue in file_result.issues]
+        for entry in entries:
+            entry["file"] = path
+
+        want_ai = params.get("ai", True) and self.llm is not None
+        if not want_ai:
+            return {"path": path, "issues": entries}
+
+        self._send({
+            "method": "review/static",
+            "params": {"id": req_id, "path": path, "issues": entries},
+        })
+
+        done = enrich(
+            entries,
+            file_result.issues,
+            self.llm,
+            self.model,
+            self.cache,
+            cancelled=token.is_set,
+            concurrency=self.ai_concurrency,
+            timeout=self.ai_timeout,
+            batch=self.ai_batch,
+        )
+        if not done:
+            raise Cancelled()
+
+        return {"path": path, "issues": entries}
@@ -0,0 +1,191 @@
+"""
+Function-level rules quote the whole function, so a file's issues often
+repeat the same snippet many times. These helpers store each distinct
+snippet once and let issues refer to it, and slice snippet text out of
+the file's source only when it is needed.
+"""
+
+import ast
+from typing import Any, Dict, List
+from core import profiling
+from core.types import Issue, Snippet, Span, node_span
+
+
+class SnippetTable:
+    """
+    Assigns short ids to snippets. Ids stay unique for the table's
+    lifetime, even across `clear()`, so a streaming writer can forget
+    old snippets without ever reusing an id.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Snippet, str] = {}
+        self._snippets: Dict[str, Snippet] = {}
+        self._next = 0
+
+    def __contains__(self, snippet: Snippet) -> bool:
+        return snippet in self._ids
+
+    def __getitem__(self, snippet_id: str) -> Snippet:
+        return self._snippets[snippet_id]
+
+    def ref(self, snippet: Snippet) -> str:
+        snippet_id = self._ids.get(snippet)
+        if snippet_id is None:
+            snippet_id = f"s{self._next}"
+            self._next += 1
+            self._ids[snippet] = snippet_id
+            self._snippets[snippet_id] = snippet
+        return snippet_id
+
+    def clear(self):
+        self._ids.clear()
+        self._snippets.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            snippet_id: snippet.to_dict()
+            for snippet_id, snippet in self._snippets.items()
+        }
+
+
+# ---------- Snippet text ----------
+
+def unparse(node: ast.AST) -> str:
+    """
+    Regenerated source of an AST node, for nodes that have no position
+    in the file.
+    """
+    if profiling.active is None:
+        return ast.unparse(node)
+    with profiling.active.stage("unparse"):
+        return ast.unparse(node)
+
+
+class SourceIndex:
+    """
+    Line-offset index over one file's source, shared by all of its
+    analysis units. Function sources and node snippets are sliced out
+    of the one string when first asked for, using the node positions
+    the way `ast.get_source_segment` does.
+
+    Lines are split where the tokenizer splits them (\n, \r\n, \r), so
+    line numbers always agree with the tree's.
+    """
+
+    def __init__(self, source: str):
+        if "\r" in source:
+            # Columns within a line are unaffected.
+            source = source.replace("\r\n", "\n").replace("\r", "\n")
+        self.source = source
+
+        # Offset of each line's first character; line n starts at
+        # _starts[n - 1].
+        starts = [0]
+        find = source.find
+        pos = find("\n")
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = find("\n", pos + 1)
+        self._starts = starts
+        # A final newline does not start another line.
+        self.line_count = len(starts) - 1 if source.endswith("\n") or not source else len(starts)
+
+        self._snippets: Dict[Span, Snippet] = {}
+
+    def _end(self, line_no: int) -> int:
+        # Offset just past the line's text, newline excluded
+        if line_no < len(self._starts):
+            return self._starts[line_no] - 1
+        return len(self.source)
+
+    def line(self, line_no: int) -> str:
+        return self.source[self._starts[line_no - 1]:self._end(line_no)]
+
+    def lines(self, start: int, end: int) -> str:
+        """
+        Lines `start` to `end` (1-based, inclusive), without the final
+        newline.
+        """
+        end = min(end, self.line_count)
+        return self.source[self._starts[start - 1]:self._end(end)]
+
+    def offset(self, line_no: int, col: int) -> int:
+        """
+        String offset of an AST position (column in UTF-8 bytes).
+        """
+        start = self._starts[line_no - 1]
+        prefix = self.source[start:start + col]
+        if prefix.isascii():
+            return start + col
+        return start + len(self.line(line_no).encode("utf-8")[:col].decode("utf-8", "replace"))
+
+    def region(self, span: Span) -> str:
+        """
+        The exact source text of a (line, col, end_line, end_col) span.
+        """
+        line, col, end_line, end_col = span
+        return self.source[self.offset(line, col):self.offset(end_line, end_col)]
+
+    def snippet(self, node: ast.AST) -> Snippet:
+        """
+        Snippet quoting `node`: its region of the file, sliced when its
+        text is first used, or regenerated source if it has none.
+        Snippets are memoized per region.
+        """
+        span = node_span(node)
+        if span is None or span[3] is None:
+            return Snippet(unparse(node))
+        snippet = self._snippets.get(span)
+        if snippet is None:
+            snippet = self._snippets[span] = Snippet(span=span, index=self)
+        return snippet
+
+
+# ---------- Cache payloads ----------
+
+def pack_issues(issues: List[Issue]) -> Dict[str, Any]:
+    """
+    Compact form of an issue list: distinct snippets once, as
+    [text, span], issues as rows pointing into them.
+    """
+    snippets: List[List[Any]] = []
+    index: Dict[Snippet, int] = {}
+    rows = []
+
+    for issue in issues:
+        position = index.get(issue.snippet)
+        if position is None:
+            position = index[issue.snippet] = len(snippets)
+            snippets.append([issue.snippet.text, issue.snippet.span])
+        rows.append([
+            issue.line, issue.col, issue.end_line, issue.end_col,
+            issue.category, issue.rule, issue.message,
+            position, issue.severity,
+        ])
+
+    return {"snippets": snippets, "issues": rows}
+
+
+def unpack_issues(data: Dict[str, Any]) -> List[Issue]:
+    snippets = [
+        Snippet(text, tuple(span) if span is not None else None)
+        for text, span in data["snippets"]
+    ]
+    return [
+        Issue(
+            line=line,
+            category=category,
+            rule=rule,
+            message=message,
+            snippet=snippets[position],
+            severity=severity,
+            col=col,
+            end_line=end_line,
+            end_col=end_col,
+        )
+        for (
+            line, col, end_line, end_col,
+            category, rule, message, position, severity,
+        ) in data["issues"]
+    ]
@@ -0,0 +1,441 @@
+"""
+Scopes and def/use chains for one module, built in a single walk and
+shared by every analyzer.
+
+Scopes follow Python's rules: module, class, function, lambda and
+comprehension. Class bodies are not visible from the functions inside
+them, `global` and `nonlocal` names resolve to the scope they name,
+and the first iterable of a comprehension belongs to the enclosing
+scope. Uses are resolved once the whole module has been seen, so a
+closure may refer to a name its parent binds further down.
+"""
+
+import ast
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from core.types import Span, node_span
+
+# Binding kinds that make a name a "variable" for unused-variable checks.
+# Parameters, loop targets, `with`/`except` names and tuple unpacking are
+# bindings too, but conventionally allowed to go unused.
+ASSIGNMENTS = ("assign", "annassign", "augassign", "walrus")
+
+# Binding kinds that make a module-level name a global variable, as
+# opposed to a function, class or imported module.
+GLOBALS = ("assign", "annassign", "augassign")
+
+
+class Binding:
+    __slots__ = ("name", "kind", "node", "span")
+
+    def __init__(self, name: str, kind: str, node: ast.AST, span: Optional[Span]):
+        self.name = name
+        self.kind = kind
+        self.node = node
+        self.span = span
+
+    @property
+    def line(self) -> int:
+        return self.span[0] if self.span else 0
+
+    @property
+    def col(self) -> int:
+        return self.span[1] if self.span else 0
+
+    @property
+    def end_line(self) -> int:
+        return self.span[2] if self.span else 0
+
+    @property
+    def end_col(self) -> int:
+        return self.span[3] if self.span else 0
+
+
+class Symbol:
+    """
+    A name in one scope: where it is bound and every use that resolves
+    to it, from this scope or any nested one.
+    """
+
+    __slots__ = ("name", "scope", "bindings", "uses", "captured")
+
+    def __init__(self, name: str, scope: "Scope"):
+        self.name = name
+        self.scope = scope
+        self.bindings: List[Binding] = []
+        # Loads (and `del`s) resolving here; the target of `x += 1`
+        # is a binding, not a use.
+        self.uses: List[ast.AST] = []
+        # Named by a `global`/`nonlocal` somewhere, so written elsewhere
+        self.captured = False
+
+    @property
+    def used(self) -> bool:
+        return bool(self.uses) or self.captured
+
+
+class Scope:
+    def __init__(self, kind: str, node: ast.AST, parent: Optional["Scope"]):
+        self.kind = kind
+        self.node = node
+        self.parent = parent
+        self.children: List["Scope"] = []
+        self.symbols: Dict[str, Symbol] = {}
+        self.globals: Set[str] = set()
+        self.nonlocals: Set[str] = set()
+        # Unresolved loads: (name, node)
+        self._refs: List[Tuple[str, ast.AST]] = []
+        if parent is not None:
+            parent.children.append(self)
+
+    def symbol(self, name: str) -> Symbol:
+        found = self.symbols.get(name)
+        if found is None:
+            found = self.symbols[name] = Symbol(name, self)
+        return found
+
+    def unused(self, kinds: Iterable[str] = ASSIGNMENTS) -> List[Symbol]:
+        """
+        Names bound here by one of `kinds` and never used, in order of
+        first binding. Names starting with an underscore are taken to be
+        unused on purpose; `nonlocal` names belong to another scope.
+        """
+        kinds = set(kinds)
+        found = [
+            symbol for symbol in self.symbols.values()
+            if not symbol.used
+            and not symbol.name.startswith("_")
+            and symbol.name not in self.nonlocals
+            and any(b.kind in kinds for b in symbol.bindings)
+        ]
+        found.sort(key=lambda s: (s.bindings[0].line, s.name))
+        return found
+
+
+class SymbolTable:
+    def __init__(self, module: Scope):
+        self.module = module
+        self.scopes: Dict[ast.AST, Scope] = {}
+        # Name node -> outermost attribute read off it, e.g. for
+        # `os.path.join` the `os` node maps to the `.join` node
+        self.attributes: Dict[ast.Name, ast.Attribute] = {}
+
+    def scope_of(self, node: ast.AST) -> Optional[Scope]:
+        """
+        The scope a module, class, function, lambda or comprehension
+        node opens.
+        """
+        return self.scopes.get(node)
+
+    def attribute_chain(self, name: ast.Name) -> Optional[str]:
+        """
+        The dotted attributes read off a name, e.g. "path.join" for the
+        `os` in `os.path.join`; None if it is used bare.
+        """
+        node = self.attributes.get(name)
+        if node is None:
+            return None
+        chain = []
+        while isinstance(node, ast.Attribute):
+            chain.append(node.attr)
+            node = node.value
+        return ".".join(reversed(chain))
+
+
+def _arguments(args: ast.arguments) -> List[ast.arg]:
+    found = list(args.posonlyargs) + list(args.args) + list(args.kwonlyargs)
+    if args.vararg:
+        found.append(args.vararg)
+    if args.kwarg:
+        found.append(args.kwarg)
+    return found
+
+
+class ScopeBuilder(ast.NodeVisitor):
+    """
+    Builds a SymbolTable while visiting a module. Subclasses that
+    override a visit_ method must call the base implementation for the
+    table to stay complete.
+    """
+
+    def __init__(self):
+        self.table: Optional[SymbolTable] = None
+        self._scope: Optional[Scope] = None
+        self._kind: Optional[str] = None
+
+    # ---------- Scopes ----------
+
+    def _open(self, kind: str, node: ast.AST) -> Scope:
+        scope = Scope(kind, node, self._scope)
+        self.table.scopes[node] = scope
+        self._scope = scope
+        return scope
+
+    def _close(self, scope: Scope):
+        self._scope = scope.parent
+
+    def visit_Module(self, node: ast.Module):
+        self.table = SymbolTable(Scope("module", node, None))
+        self.table.scopes[node] = self.table.module
+        self._scope = self.table.module
+        self.generic_visit(node)
+        self._resolve()
+
+    # ---------- Bindings ----------
+
+    def _bind(self, name: str, kind: str, node: ast.AST, span: Optional[Span] = None):
+        scope = self._scope
+        if name in scope.globals:
+            scope = self.table.module
+        # `nonlocal` bindings are left on the declaring scope; the
+        # enclosing symbol is marked captured when resolving.
+        scope.symbol(name).bindings.append(
+            Binding(name, kind, node, span or node_span(node))
+        )
+
+    def _target(self, target: ast.AST, kind: str):
+        previous, self._kind = self._kind, kind
+        self.visit(target)
+        self._kind = previous
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Store):
+            self._bind(node.id, self._kind or "assign", node)
+        else:
+            self._scope._refs.append((node.id, node))
+
+    def visit_Attribute(self, node: ast.Attribute):
+        # Walk the whole chain here rather than once per link.
+        value = node.value
+        while isinstance(value, ast.Attribute):
+            value = value.value
+        if isinstance(value, ast.Name):
+            self.table.attributes[value] = node
+        self.visit(value)
+
+    def visit_Tuple(self, node: ast.Tuple):
+        self._unpack(node)
+
+    def visit_List(self, node: ast.List):
+        self._unpack(node)
+
+    def _unpack(self, node):
+        if isinstance(node.ctx, ast.Store) and self._kind in (None, "assign"):
+            self._target_each(node.elts, "unpack")
+        else:
+            self.generic_visit(node)
+
+    def _target_each(self, targets, kind: str):
+        for target in targets:
+            self._target(target, kind)
+
+    def visit_Assign(self, node: ast.Assign):
+        self.visit(node.value)
+        self._target_each(node.targets, "assign")
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        self.visit(node.value)
+        self._target(node.target, "augassign")
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        self.visit(node.annotation)
+        if node.value is not None:
+            self.visit(node.value)
+        self._target(node.target, "annassign")
+
+    def visit_NamedExpr(self, node: ast.NamedExpr):
+        self.visit(node.value)
+        # Binds in the nearest scope that is not a comprehension.
+        scope = self._scope
+        while scope.kind == "comprehension":
+            scope = scope.parent
+        previous, self._scope = self._scope, scope
+        self._target(node.target, "walrus")
+        self._scope = previous
+
+    def visit_For(self, node: ast.For):
+        self.visit(node.iter)
+        self._target(node.target, "for")
+        for stmt in node.body + node.orelse:
+            self.visit(stmt)
+
+    visit_AsyncFor = visit_For
+
+    def visit_withitem(self, node: ast.withitem):
+        self.visit(node.context_expr)
+        if node.optional_vars is not None:
+            self._target(node.optional_vars, "with")
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):
+        if node.type is not None:
+            self.visit(node.type)
+        if node.name:
+            self._bind(node.name, "except", node)
+        for stmt in node.body:
+            self.visit(stmt)
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            name = alias.asname or alias.name.split(".")[0]
+            self._bind(name, "import", alias, node_span(alias) or node_span(node))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            name = alias.asname or alias.name
+            self._bind(name, "import", alias, node_span(alias) or node_span(node))
+
+    def visit_Global(self, node: ast.Global):
+        self._scope.globals.update(node.names)
+        for name in node.names:
+            self.table.module.symbol(name).captured = True
+
+    def visit_Nonlocal(self, node: ast.Nonlocal):
+        self._scope.nonlocals.update(node.names)
+
+    def visit_MatchAs(self, node):
+        if node.pattern is not None:
+            self.visit(node.pattern)
+        if node.name:
+            self._bind(node.name, "match", node)
+
+    def visit_MatchStar(self, node):
+        if node.name:
+            self._bind(node.name, "match", node)
+
+    def visit_MatchMapping(self, node):
+        for key in node.keys:
+            self.visit(key)
+        for pattern in node.patterns:
+            self.visit(pattern)
+        if node.rest:
+            self._bind(node.rest, "match", node)
+
+    # ---------- Scoped definitions ----------
+
+    def _visit_signature(self, args: ast.arguments):
+        # Defaults and annotations are evaluated in the enclosing scope.
+        for default in args.defaults + [d for d in args.kw_defaults if d is not None]:
+            self.visit(default)
+        for arg in _arguments(args):
+            if arg.annotation is not None:
+                self.visit(arg.annotation)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self._visit_signature(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self._bind(node.name, "def", node)
+
+        scope = self._open("function", node)
+        for arg in _arguments(node.args):
+            self._bind(arg.arg, "param", arg)
+        for stmt in node.body:
+            self.visit(stmt)
+        self._close(scope)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node: ast.Lambda):
+        self._visit_signature(node.args)
+        scope = self._open("lambda", node)
+        for arg in _arguments(node.args):
+            self._bind(arg.arg, "param", arg)
+        self.visit(node.body)
+        self._close(scope)
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        for base in node.bases:
+            self.visit(base)
+        for keyword in node.keywords:
+            self.visit(keyword)
+        self._bind(node.name, "class", node)
+
+        scope = self._open("class", node)
+        for stmt in node.body:
+            self.visit(stmt)
+        self._close(scope)
+
+    def _visit_comprehension(self, node, elements: List[ast.AST]):
+        generators = node.generators
+        # The first iterable is evaluated in the enclosing scope.
+        self.visit(generators[0].iter)
+
+        scope = self._open("comprehension", node)
+        for index, generator in enumerate(generators):
+            if index:
+                self.visit(generator.iter)
+            self._target(generator.target, "for")
+            for condition in generator.ifs:
+                self.visit(condition)
+        for element in elements:
+            self.visit(element)
+        self._close(scope)
+
+    def visit_ListComp(self, node: ast.ListComp):
+        self._visit_comprehension(node, [node.elt])
+
+    visit_SetComp = visit_ListComp
+    visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node: ast.DictComp):
+        self._visit_comprehension(node, [node.key, node.value])
+
+    # ---------- Resolution ----------
+
+    def _resolve(self):
+        module = self.table.module
+        memo: Dict[Tuple[int, str], Optional[Symbol]] = {}
+
+        def enclosing(scope: Scope, name: str) -> Optional[Symbol]:
+            # Lookup from a scope nested in `scope`: class bodies are
+            # skipped, and the module is the last stop.
+            while scope is not None and scope.kind == "class":
+                scope = scope.parent
+            if scope is None:
+                return None
+            key = (id(scope), name)
+            if key not in memo:
+                memo[key] = lookup(scope, name)
+            return memo[key]
+
+        def lookup(scope: Scope, name: str) -> Optional[Symbol]:
+            if name in scope.globals:
+                return module.symbols.get(name)
+            if name in scope.nonlocals:
+                return enclosing(scope.parent, name)
+            local = scope.symbols.get(name)
+            if local is not None and local.bindings:
+                return local
+            if scope.parent is None:
+                return None
+            return enclosing(scope.parent, name)
+
+        for scope in self.table.scopes.values():
+            for name in scope.nonlocals:
+                target = enclosing(scope.parent, name)
+                if target is not None:
+                    target.captured = True
+            for name, node in scope._refs:
+                if scope.kind == "class":
+                    # Class bodies see their own names, then globals.
+                    local = scope.symbols.get(name)
+                    if local is not None and local.bindings:
+                        target = local
+                    else:
+                        target = enclosing(scope.parent, name)
+                else:
+                    target = lookup(scope, name)
+                if target is not None:
+                    target.uses.append(node)
+            scope._refs = []
+
+
+def build_symbols(tree: ast.Module) -> SymbolTable:
+    builder = ScopeBuilder()
+    builder.visit(tree)
+    return builder.table
@@ -0,0 +1,244 @@
+"""
+Intra-procedural taint tracking for the security rules.
+
+A value is tainted when it may come from outside the program: a
+parameter of the function (or of one it is nested in), `input()`,
+environment variables, `sys.argv`, stdin or a web framework `request`.
+Taint follows assignments, loop and `with` targets, augmented
+assignments and in-place container updates (`args.append(x)`) within
+one analysis unit, and flows through any expression built from a
+tainted value, except the few calls known to sanitize it.
+
+The analysis is flow-insensitive: a name is tainted if any assignment
+to it in the unit is, wherever the sink is. That errs towards
+reporting, which is the safe side for a security rule.
+"""
+
+import ast
+from typing import Dict, List, Optional, Set, Tuple
+
+# Calls returning untrusted input
+SOURCE_CALLS = {
+    "input", "raw_input",
+    "os.getenv", "os.environ.get",
+    "sys.stdin.read", "sys.stdin.readline", "sys.stdin.readlines",
+}
+
+# Values that are untrusted input themselves, along with anything read
+# off them (`request.args.get(...)`, `os.environ["HOME"]`)
+SOURCE_ROOTS = {"os.environ", "sys.argv", "sys.stdin", "request"}
+
+# Calls whose result is safe to pass on whatever their arguments
+SANITIZERS = {
+    "int", "float", "bool", "len",
+    "shlex.quote", "shlex.join", "pipes.quote",
+}
+
+# Methods that store their arguments in the object they are called on
+MUTATORS = {
+    "append", "extend", "insert", "add", "update",
+    "appendleft", "extendleft", "setdefault",
+}
+
+# Parameters that are the receiver, not caller-supplied data
+RECEIVERS = {"self", "cls"}
+
+
+def dotted_name(node: ast.AST) -> Optional[str]:
+    """
+    "os.path.join" for `os.path.join`; None for anything that is not a
+    plain chain of attributes on a name.
+    """
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _parameters(node: ast.AST) -> List[str]:
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        return []
+    args = node.args
+    found = list(args.posonlyargs) + list(args.args) + list(args.kwonlyargs)
+    if args.vararg:
+        found.append(args.vararg)
+    if args.kwarg:
+        found.append(args.kwarg)
+    return [arg.arg for arg in found if arg.arg not in RECEIVERS]
+
+
+def _targets(node: ast.AST) -> List[str]:
+    # Names a store target writes; `d[k] = v` writes into `d`.
+    if isinstance(node, ast.Name):
+        return [node.id]
+    if isinstance(node, ast.Starred):
+        return _targets(node.value)
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return [name for element in node.elts for name in _targets(element)]
+    if isinstance(node, ast.Subscript):
+        base = node.value
+        while isinstance(base, ast.Subscript):
+            base = base.value
+        if isinstance(base, ast.Name):
+            return [base.id]
+    return []
+
+
+def _flows(body: ast.AST) -> List[Tuple[List[str], ast.AST]]:
+    """
+    (names written, value written) for every assignment-like node in
+    the unit. Nested defs are skipped, as in the engine.
+    """
+    flows: List[Tuple[List[str], ast.AST]] = []
+    stack = [body]
+    while stack:
+        node = stack.pop()
+
+        if isinstance(node, ast.Assign):
+            flows.append(([n for t in node.targets for n in _targets(t)], node.value))
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign)) and node.value is not None:
+            flows.append((_targets(node.target), node.value))
+        elif isinstance(node, ast.NamedExpr):
+            flows.append((_targets(node.target), node.value))
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.comprehension)):
+            flows.append((_targets(node.target), node.iter))
+        elif isinstance(node, ast.withitem) and node.optional_vars is not None:
+            flows.append((_targets(node.optional_vars), node.context_expr))
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr in MUTATORS
+        ):
+            written = _targets(node.func.value)
+            if written:
+                flows.append((written, node))
+
+        for child in ast.iter_child_nodes(node):
+            if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                stack.append(child)
+
+    return flows
+
+
+class TaintAnalysis:
+    """
+    Which names in one analysis unit may hold untrusted input, and
+    where that input came from.
+    """
+
+    def __init__(self, function):
+        # name -> description of the source, e.g. "parameter 'cmd'"
+        self.tainted: Dict[str, str] = {}
+
+        for name in _parameters(function.body):
+            self.tainted[name] = f"parameter '{name}'"
+        self._closure(function)
+
+        flows = _flows(function.body)
+        changed = True
+        while changed:
+            changed = False
+            for names, value in flows:
+                pending = [name for name in names if name not in self.tainted]
+                if not pending:
+                    continue
+                origin = self.source(value)
+                if origin is None:
+                    continue
+                for name in pending:
+                    self.tainted[name] = origin
+                changed = True
+
+    def _closure(self, function):
+        # Parameters of enclosing functions that this unit can see.
+        scope = function.scope
+        if scope is None:
+            return
+        local: Set[str] = {
+            name for name, symbol in scope.symbols.items() if symbol.bindings
+        }
+        scope = scope.parent
+        while scope is not None:
+            if scope.kind == "function":
+                for name, symbol in scope.symbols.items():
+                    if name in local or name in self.tainted or name in RECEIVERS:
+                        continue
+                    if any(b.kind == "param" for b in symbol.bindings):
+                        self.tainted[name] = f"parameter '{name}'"
+                local.update(scope.symbols)
+            scope = scope.parent
+
+    def source(self, node: ast.AST) -> Optional[str]:
+        """
+        Where untrusted input reaching `node` comes from, or None if the
+        expression is built only from trusted values.
+        """
+        if isinstance(node, (ast.Constant, ast.Compare, ast.Lambda)):
+            return None
+
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            dotted = dotted_name(node)
+            if dotted is not None:
+                for root in SOURCE_ROOTS:
+                    if dotted == root or dotted.startswith(root + "."):
+                        return root
+            if isinstance(node, ast.Name):
+                if isinstance(node.ctx, ast.Load):
+                    return self.tainted.get(node.id)
+                return None
+
+        if isinstance(node, ast.Call):
+            dotted = dotted_name(node.func)
+            if dotted in SANITIZERS:
+                return None
+            if dotted in SOURCE_CALLS:
+                return f"{dotted}()"
+
+        for child in ast.iter_child_nodes(node):
+            origin = self.source(child)
+            if origin is not None:
+                return origin
+        return None
+
+    def call_source(self, node: ast.Call) -> Optional[str]:
+        """
+        Where untrusted input passed to a call comes from, looking at
+        its arguments only.
+        """
+        for arg in node.args:
+            origin = self.source(arg)
+            if origin is not None:
+                return origin
+        for keyword in node.keywords:
+            origin = self.source(keyword.value)
+            if origin is not None:
+                return origin
+        return None
+
+
+def is_constant(node: ast.AST) -> bool:
+    """
+    True for literals and containers/f-strings/operations built only
+    from literals: values fixed in the source.
+    """
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+        return all(is_constant(e) for e in node.elts)
+    if isinstance(node, ast.Dict):
+        return all(
+            k is not None and is_constant(k) for k in node.keys
+        ) and all(is_constant(v) for v in node.values)
+    if isinstance(node, ast.JoinedStr):
+        return all(is_constant(v) for v in node.values)
+    if isinstance(node, ast.FormattedValue):
+        return is_constant(node.value)
+    if isinstance(node, ast.BinOp):
+        return is_constant(node.left) and is_constant(node.right)
+    if isinstance(node, ast.UnaryOp):
+        return is_constant(node.operand)
+    return False
@@ -1,30 +1,135 @@
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
+# Source region as (line, col, end_line, end_col): lines are 1-based and
+# columns 0-based UTF-8 byte offsets, as in the ast module.
+Span = Tuple[int, int, int, int]
 
-@dataclass(frozen=True)
+
+def node_span(node) -> Optional[Span]:
+    if getattr(node, "end_lineno", None) is None:
+        return None
+    return (node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+
+
+class Snippet:
+    """
+    The code an issue quotes, shared by every issue quoting it. `span`
+    says where in the file the code lives (None when it is no source
+    region, e.g. a bare name or regenerated source). Without `text`, the
+    region is sliced from `index` (a core.snippets.SourceIndex) when
+    first asked for; pickling always carries the text.
+    """
+
+    __slots__ = ("span", "_text", "_index")
+
+    def __init__(self, text: Optional[str] = None, span: Optional[Span] = None, index=None):
+        self.span = span
+        self._text = text
+        self._index = index
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._index.region(self.span)
+            self._index = None
+        return self._text
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"text": self.text}
+        if self.span is not None:
+            data["span"] = list(self.span)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Snippet":
+        span = data.get("span")
+        return cls(data["text"], tuple(span) if span is not None else None)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Snippet):
+            return NotImplemented
+        return self.span == other.span and self.text == other.text
+
+    def __hash__(self) -> int:
+        return hash((self.text, self.span))
+
+    def __reduce__(self):
+        return (Snippet, (self.text, self.span))
+
+    def __repr__(self) -> str:
+        return f"Snippet({self.text!r}, {self.span!r})"
+
+
+@dataclass(frozen=True, slots=True)
 class Issue:
     """
     A deterministic issue produced by a static analyzer.
     LLMs may enhance this, but never redefine it.
+
+    `line`, `col`, `end_line` and `end_col` locate the issue itself,
+    with columns counted like the ast module's (UTF-8 byte offsets);
+    `line` 0 means no location. `snippet` is the code it quotes, a
+    Snippet shared with the other issues quoting the same code.
     """
 
     line: int
     category: str              # complexity | performance | patterns | security
     rule: str                  # specific rule identifier
     message: str               # human-readable explanation
-    code_snippet: str           # exact source snippet
+    snippet: Snippet            # exact source snippet
     severity: int               # 1 (low) → 5 (critical)
+    col: int = 0
+    end_line: int = 0
+    end_col: int = 0
 
-    def to_dict(self) -> Dict[str, Any]:
-        return {
+    @property
+    def code_snippet(self) -> str:
+        return self.snippet.text
+
+    @property
+    def span(self) -> Optional[Span]:
+        return self.snippet.span
+
+    def to_dict(self, snippets=None) -> Dict[str, Any]:
+        """
+        The issue's own location and its snippet's text. With a
+        SnippetTable, the snippet is replaced by a reference into it,
+        and the table carries each distinct snippet, with its span, once.
+        """
+        data: Dict[str, Any] = {
             "line": self.line,
+            "col": self.col,
+            "end_line": self.end_line,
+            "end_col": self.end_col,
             "category": self.category,
             "rule": self.rule,
             "message": self.message,
-            "code_snippet": self.code_snippet,
-            "severity": self.severity,
         }
+        if snippets is None:
+            data["code_snippet"] = self.snippet.text
+        else:
+            data["snippet"] = snippets.ref(self.snippet)
+        data["severity"] = self.severity
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], snippets=None) -> "Issue":
+        if "code_snippet" in data:
+            snippet = Snippet(data["code_snippet"])
+        else:
+            snippet = snippets[data["snippet"]]
+        return cls(
+            line=data["line"],
+            category=data["category"],
+            rule=data["rule"],
+            message=data["message"],
+            snippet=snippet,
+            severity=data["severity"],
+            col=data.get("col", 0),
+            end_line=data.get("end_line", 0),
+            end_col=data.get("end_col", 0),
+        )
 
 
 @dataclass
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from core import profiling
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def prompt_key(model: str, system: Optional[str], prompt: str, params: Dict[str, Any]) -> str:
+    material = json.dumps(
+        [model, system or "", prompt, params], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed store of raw model responses.
+
+    Entries older than `ttl` seconds are ignored and purged; beyond
+    `max_bytes`, least recently used entries are evicted on close. Safe
+    to share between threads.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "responses.sqlite3")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            return row[0]
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            self._db.commit()
+
+    def evict(self):
+        """
+        Purge expired entries, then least recently used ones until the
+        cache fits its budget.
+        """
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            )
+            total = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            rows = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed"
+            ).fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+
+    def close(self):
+        self.evict()
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+
+class CachedModelCall:
+    """
+    Wraps a `model_call(prompt, system)` so identical requests cost one
+    model call.
+
+    Requests are keyed on (model, system prompt, rendered prompt,
+    decoding params). A key found in `cache` is answered from disk; a
+    key already in flight waits for that call instead of issuing its
+    own. Failures are shared with the waiters but never cached.
+    """
+
+    def __init__(
+        self,
+        model_call: Callable[..., str],
+        model: str,
+        params: Optional[Dict[str, Any]] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.model_call = model_call
+        self.model = model
+        self.params = params or {}
+        self.cache = cache
+        self.calls = 0
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def __call__(self, prompt: str, system: Optional[str] = None) -> str:
+        key = prompt_key(self.model, system, prompt, self.params)
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                profiling.count("llm:cache_hit")
+                return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            profiling.count("llm:coalesced")
+            return future.result()
+
+        try:
+            with profiling.stage("llm:model") as counters:
+                counters["prompt_chars"] = len(prompt)
+                response = self.model_call(prompt=prompt, system=system)
+                counters["response_chars"] = len(response or "")
+        except BaseException as e:
+            profiling.count("llm:error")
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            if self.cache is not None and isinstance(response, str):
+                self.cache.put(key, response)
+            return response
+        finally:
+            with self._lock:
+                del self._inflight[key]
@@ -1,9 +1,15 @@
 import ast
 import json
 import re
-from typing import Optional
+from typing import List, Optional, Tuple
 from core.types import Issue, AIReview
-from llm.prompts import SYSTEM_PROMPT, REVIEW_PROMPT, FIX_PROMPT
+from llm.prompts import (
+    SYSTEM_PROMPT,
+    REVIEW_PROMPT,
+    FIX_PROMPT,
+    BATCH_PROMPT,
+    BATCH_ISSUE_LINE,
+)
 
 class LLMClient:
 
@@ -34,7 +40,115 @@ class LLMClient:
         except json.JSONDecodeError:
             return None
 
-        expr = data.get("fixed_expression")
+        return self._validate_fix(data.get("fixed_expression"))
+
+    def review_issue(self, issue):
+        prompt = REVIEW_PROMPT.format(
+            code=issue.code_snippet,
+            message=issue.message,
+            category=issue.category,
+            rule=issue.rule,
+            severity=issue.severity,
+        )
+
+        try:
+            raw = self.model_call(prompt=prompt, system=SYSTEM_PROMPT)
+            match = re.search(r"\{.*\}", raw, re.S)
+            if not match:
+                return None
+
+            data = json.loads(match.group())
+
+            return self._parse_review(data)
+
+        except Exception:
+            raise Exception
+
+    def review_batch(
+        self,
+        code: str,
+        issues: List[Issue],
+    ) -> Optional[List[Optional[Tuple[Optional[AIReview], Optional[str]]]]]:
+        """
+        Review several issues found in the same code with one request.
+
+        Returns one (review, fix) pair per issue, or None for an issue the
+        reply did not cover. Returns None altogether when the reply is
+        not a usable JSON array; callers fall back to per-issue calls.
+        """
+        listing = "\n".join(
+            BATCH_ISSUE_LINE.format(
+                id=n,
+                category=issue.category,
+                rule=issue.rule,
+                severity=issue.severity,
+                message=issue.message,
+            )
+            for n, issue in enumerate(issues, start=1)
+        )
+
+        raw = self.model_call(
+            prompt=BATCH_PROMPT.format(code=code, issues=listing),
+            system=SYSTEM_PROMPT,
+        )
+        if not raw:
+            return None
+
+        match = re.search(r"\[[\s\S]*\]", raw)
+        if not match:
+            return None
+
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return None
+
+        if not isinstance(data, list):
+            return None
+
+        results: List[Optional[Tuple[Optional[AIReview], Optional[str]]]] = [
+            None
+        ] * len(issues)
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            try:
+                n = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            if 1 <= n <= len(issues):
+                results[n - 1] = (
+                    self._parse_review(item),
+                    self._validate_fix(item.get("fixed_expression")),
+                )
+
+        return results
+
+    # ---------- Reply validation ----------
+
+    def _parse_review(self, data) -> Optional[AIReview]:
+        explanation = data.get("explanation")
+        suggestion = data.get("suggestion")
+        confidence = data.get("confidence")
+
+        if not isinstance(explanation, str) or not isinstance(suggestion, str):
+            return None
+        if not explanation.strip() or not suggestion.strip():
+            return None
+
+        try:
+            confidence = float(confidence)
+            confidence = max(0.0, min(confidence, 1.0))
+        except Exception:
+            confidence = 0.0
+
+        return AIReview(
+            explanation=explanation.strip(),
+            suggestion=suggestion.strip(),
+            confidence=confidence,
+        )
+
+    def _validate_fix(self, expr) -> Optional[str]:
         if not isinstance(expr, str):
             return None
 
@@ -60,44 +174,3 @@ class LLMClient:
             return None
 
         return expr
-
-
-
-    def review_issue(self, issue):
-        prompt = REVIEW_PROMPT.format(
-            code=issue.code_snippet,
-            message=issue.message,
-            category=issue.category,
-            rule=issue.rule,
-            severity=issue.severity,
-        )
-
-        try:
-            raw = self.model_call(prompt=prompt, system=SYSTEM_PROMPT)
-            match = re.search(r"\{.*\}", raw, re.S)
-            if not match:
-                return None
-
-            data = json.loads(match.group())
-
-            explanation = data.get("explanation")
-            suggestion = data.get("suggestion")
-            confidence = data.get("confidence")
-
-            if not explanation or not suggestion:
-                return None
-
-            try:
-                confidence = float(confidence)
-                confidence = max(0.0, min(confidence, 1.0))
-            except Exception:
-                confidence = 0.0
-
-            return AIReview(
-                explanation=explanation.strip(),
-                suggestion=suggestion.strip(),
-                confidence=confidence,
-            )
-
-        except Exception:
-            raise Exception
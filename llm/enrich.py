@@ -0,0 +1,212 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+from core import profiling
+from core.types import Issue
+from llm.client import LLMClient
+
+DEFAULT_CONCURRENCY = 4
+
+# Most issues sent to the model in one batched request.
+BATCH_SIZE = 8
+
+# How often the collector wakes up to check timeouts and cancellation.
+POLL_INTERVAL = 0.05
+
+
+class _Call:
+    """
+    One model request: a review or fix for one issue, or a batched
+    review of several issues sharing the same code. Records when it
+    actually started, so time spent queued behind the concurrency limit
+    does not count against its timeout.
+    """
+
+    def __init__(self, kind: str, indices: List[int], fn: Callable, *args):
+        self.kind = kind
+        self.indices = indices
+        self.fn = fn
+        self.args = args
+        self.started: Optional[float] = None
+
+    def __call__(self):
+        self.started = time.monotonic()
+        with profiling.stage(f"llm:{self.kind}"):
+            return self.fn(*self.args)
+
+
+def _apply(entry: dict, data: Dict[str, Any]):
+    if data.get("ai"):
+        entry["ai"] = data["ai"]
+    if data.get("fix"):
+        entry["fix"] = data["fix"]
+
+
+def _plan(todo: List[int], issues: List[Issue], batch: bool):
+    """
+    Split pending issues into batches and singles. Issues sharing a
+    snippet (the function-level rules all quote the whole function)
+    are reviewed together instead of sending the same code repeatedly.
+    """
+    if not batch:
+        return [], list(todo)
+
+    groups: Dict[str, List[int]] = {}
+    for index in todo:
+        groups.setdefault(issues[index].code_snippet, []).append(index)
+
+    batches: List[List[int]] = []
+    singles: List[int] = []
+    for indices in groups.values():
+        if len(indices) < 2:
+            singles.extend(indices)
+            continue
+        for start in range(0, len(indices), BATCH_SIZE):
+            chunk = indices[start:start + BATCH_SIZE]
+            if len(chunk) < 2:
+                singles.extend(chunk)
+            else:
+                batches.append(chunk)
+
+    return batches, sorted(singles)
+
+
+def enrich(
+    results: List[dict],
+    issues: List[Issue],
+    llm: LLMClient,
+    model: str,
+    cache=None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: Optional[float] = None,
+    batch: bool = True,
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+) -> bool:
+    """
+    Attach AI review and fix to each entry. Issues the cache has already
+    seen (e.g. from functions unchanged since the last run) are not sent
+    to the model again.
+
+    With `batch`, issues that share a snippet go out as one request; if
+    the reply cannot be parsed, or leaves an issue out, those issues are
+    retried with the per-issue review and fix prompts. All requests run
+    concurrently, at most `concurrency` at a time. A request that fails
+    or runs longer than `timeout` seconds leaves its part of the entry
+    empty and is not cached; neither is an issue that got no review and
+    no fix at all. Entries are updated in place, so output
+    order does not depend on completion order.
+
+    `on_result(index, data)` is called as soon as an entry is complete,
+    with the {"ai", "fix"} that was applied to it.
+
+    `cancelled()` is polled while requests are in flight; returns False
+    if enrichment was abandoned part way.
+    """
+    todo: List[int] = []
+    for index, issue in enumerate(issues):
+        cached = cache.get_enrichment(issue, model) if cache else None
+        if cached is None:
+            todo.append(index)
+            continue
+        profiling.count("cache:enrichment_hit")
+        _apply(results[index], cached)
+        if on_result is not None:
+            on_result(index, cached)
+
+    if not todo:
+        return True
+    if cancelled is not None and cancelled():
+        return False
+
+    outcome: Dict[int, Dict[str, Any]] = {index: {} for index in todo}
+    failed: Set[int] = set()
+    # Requests still outstanding per issue; at zero the issue is done.
+    refs: Dict[int, int] = {index: 0 for index in todo}
+    batches, singles = _plan(todo, issues, batch)
+
+    def finish(index: int):
+        data = {"ai": None, "fix": None}
+        data.update(outcome[index])
+        # Nothing usable came back (an empty or unparseable reply): ask
+        # again next time rather than remember the blank.
+        usable = data["ai"] is not None or data["fix"] is not None
+        if cache is not None and index not in failed and usable:
+            cache.put_enrichment(issues[index], model, data)
+        _apply(results[index], data)
+        if on_result is not None:
+            on_result(index, data)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        pending = {}
+
+        def submit(call: _Call):
+            for index in call.indices:
+                refs[index] += 1
+            pending[pool.submit(call)] = call
+
+        def settle(call: _Call):
+            for index in call.indices:
+                refs[index] -= 1
+                if refs[index] == 0:
+                    finish(index)
+
+        def submit_single(index: int):
+            submit(_Call("ai", [index], llm.review_issue, issues[index]))
+            submit(_Call("fix", [index], llm.generate_fix, issues[index]))
+
+        for indices in batches:
+            code = issues[indices[0]].code_snippet
+            group = [issues[i] for i in indices]
+            submit(_Call("batch", indices, llm.review_batch, code, group))
+        for index in singles:
+            submit_single(index)
+
+        while pending:
+            done, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                call = pending.pop(future)
+                try:
+                    value = future.result()
+                except Exception:
+                    value = None
+                    if call.kind != "batch":
+                        failed.update(call.indices)
+                        settle(call)
+                        continue
+
+                if call.kind == "batch":
+                    replies = value or [None] * len(call.indices)
+                    for index, reply in zip(call.indices, replies):
+                        if reply is None:
+                            profiling.count("llm:retry")
+                            submit_single(index)
+                            continue
+                        review, fix = reply
+                        outcome[index]["ai"] = review.to_dict() if review else None
+                        outcome[index]["fix"] = fix
+                elif call.kind == "ai":
+                    outcome[call.indices[0]]["ai"] = value.to_dict() if value else None
+                else:
+                    outcome[call.indices[0]]["fix"] = value
+                settle(call)
+
+            if cancelled is not None and cancelled():
+                return False
+
+            if timeout is not None:
+                now = time.monotonic()
+                for future, call in list(pending.items()):
+                    if call.started is not None and now - call.started > timeout:
+                        # The worker thread cannot be interrupted; stop
+                        # waiting for it and let it finish in the background.
+                        del pending[future]
+                        profiling.count("llm:timeout")
+                        failed.update(call.indices)
+                        settle(call)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return True
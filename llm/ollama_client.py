@@ -1,13 +1,35 @@
+import json
+import os
 import subprocess
+import threading
+from typing import Any, Callable, Dict, Optional
+from core import profiling
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # optional: only needed for the HTTP backend
+    requests = None
 
 """
 Add OLLAMA_PATH to your ollama.exe and also select the
 model you wanna work with.
+
+The HTTP backend talks to a running `ollama serve` instead and needs
+only OLLAMA_HOST (default http://localhost:11434).
 """
 
 OLLAMA_PATH = "PATH_TO_OLLAMA"
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
 
-def ollama_call(prompt: str, system: str, model: str = "MODEL") -> str:
+BACKENDS = ("auto", "http", "subprocess")
+
+def ollama_call(
+    prompt: str,
+    system: str,
+    model: str = "MODEL",
+    timeout: Optional[float] = None,
+) -> str:
     full_prompt = f"{system}\n\n{prompt}"
 
     completed = subprocess.run(
@@ -17,6 +39,7 @@ def ollama_call(prompt: str, system: str, model: str = "MODEL") -> str:
         encoding="utf-8",      
         errors="replace",      
         capture_output=True,
+        timeout=timeout,
     )
 
     if completed.returncode != 0:
@@ -25,3 +48,150 @@ def ollama_call(prompt: str, system: str, model: str = "MODEL") -> str:
         )
 
     return completed.stdout.strip()
+
+
+class OllamaHTTPClient:
+    """
+    Ollama `/api/generate` over a pooled keep-alive session.
+
+    `keep_alive` asks the server to keep the model loaded between calls.
+    With `stream=True` the reply is read token by token and `on_token`
+    (if given) sees every chunk as it arrives. Instances are callable
+    with the same signature as `ollama_call` and safe to share between
+    threads.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        host: str = OLLAMA_HOST,
+        keep_alive: Optional[str] = "30m",
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        on_token: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None,
+        pool_size: int = 8,
+    ):
+        if requests is None:
+            raise RuntimeError("The HTTP backend requires the 'requests' package")
+
+        self.model = model
+        self.url = host.rstrip("/") + "/api/generate"
+        self.keep_alive = keep_alive
+        self.options = options or {}
+        self.stream = stream
+        self.on_token = on_token
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __call__(self, prompt: str, system: Optional[str] = None) -> str:
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": self.stream,
+        }
+        if system:
+            payload["system"] = system
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if self.options:
+            payload["options"] = self.options
+
+        response = self.session.post(
+            self.url, json=payload, stream=self.stream, timeout=self.timeout
+        )
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"Ollama failed ({response.status_code}):\n{response.text}"
+                )
+
+            if not self.stream:
+                return response.json().get("response", "").strip()
+
+            parts = []
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama failed:\n{chunk['error']}")
+                token = chunk.get("response", "")
+                if token:
+                    parts.append(token)
+                    if self.on_token is not None:
+                        self.on_token(token)
+                if chunk.get("done"):
+                    break
+            return "".join(parts).strip()
+
+    def close(self):
+        self.session.close()
+
+
+class _FallbackCall:
+    """
+    Try the HTTP backend; once the server turns out to be unreachable
+    (connection refused, unknown host), use `ollama run` for this and
+    every later call. A connect that times out is raised like any other
+    timeout: the server may just be busy loading a model.
+    """
+
+    def __init__(self, http: OllamaHTTPClient, model: str, timeout: Optional[float]):
+        self.http = http
+        self.model = model
+        self.timeout = timeout
+        self._http_down = threading.Event()
+
+    def __call__(self, prompt: str, system: Optional[str] = None) -> str:
+        if not self._http_down.is_set():
+            try:
+                return self.http(prompt, system)
+            except requests.ConnectionError as e:
+                if isinstance(e, requests.Timeout):
+                    raise
+                self._http_down.set()
+                profiling.count("llm:http_fallback")
+        return ollama_call(prompt, system or "", model=self.model, timeout=self.timeout)
+
+
+def make_model_call(
+    model: str,
+    backend: str = "auto",
+    host: str = OLLAMA_HOST,
+    timeout: Optional[float] = None,
+    keep_alive: Optional[str] = "30m",
+    pool_size: int = 8,
+    **http_options,
+) -> Callable[..., str]:
+    """
+    Build a `model_call(prompt, system)` for LLMClient.
+
+    "http" uses OllamaHTTPClient, "subprocess" uses `ollama run`, and
+    "auto" prefers HTTP and falls back to the subprocess when `requests`
+    is missing or the server cannot be reached.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown Ollama backend '{backend}'")
+
+    def subprocess_call(prompt: str, system: Optional[str] = None) -> str:
+        return ollama_call(prompt, system or "", model=model, timeout=timeout)
+
+    if backend == "subprocess" or (backend == "auto" and requests is None):
+        return subprocess_call
+
+    http = OllamaHTTPClient(
+        model,
+        host=host,
+        keep_alive=keep_alive,
+        timeout=timeout,
+        pool_size=pool_size,
+        **http_options,
+    )
+    if backend == "http":
+        return http
+    return _FallbackCall(http, model, timeout)
@@ -56,3 +56,39 @@ Respond ONLY in valid JSON with the following format:
   "confidence": 0.0
 }}
 """
+
+BATCH_PROMPT = """
+You are given Python code and several issues a static analyzer found in it.
+
+Code:
+{code}
+
+Issues:
+{issues}
+
+For EACH issue:
+1. Explain clearly why this is a problem.
+2. Suggest a concrete fix or refactor.
+3. Rate your confidence in this suggestion from 0.0 to 1.0.
+4. If replacing a single expression fixes it, give that expression as
+   "fixed_expression"; otherwise use null.
+
+RULES for fixed_expression (STRICT):
+- It MUST be a single valid Python expression.
+- Do NOT add imports, statements or definitions.
+- Do NOT include markdown.
+
+Respond ONLY with a valid JSON array containing one object per issue, using
+the issue numbers as "id":
+[
+  {{
+    "id": 1,
+    "explanation": "...",
+    "suggestion": "...",
+    "confidence": 0.0,
+    "fixed_expression": null
+  }}
+]
+"""
+
+BATCH_ISSUE_LINE = "{id}. [{category} / {rule}, severity {severity}] {message}"
@@ -1,6 +1,9 @@
 import json
-from typing import List
-from core.types import ReviewResult
+import os
+import textwrap
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TextIO
+from core.snippets import SnippetTable
+from core.types import Issue, ReviewResult
 
 def write_json(results: List[ReviewResult], path="review.json"):
     payload = []
@@ -15,3 +18,74 @@ def write_json(results: List[ReviewResult], path="review.json"):
 
     with open(path, "w", encoding="utf-8") as f:
         json.dump(payload, f, indent=2)
+
+
+def _write_list(f: TextIO, entries: Iterable[Dict[str, Any]]):
+    # Same layout as json.dump(..., indent=2), one entry at a time.
+    f.write("[")
+    count = 0
+    for entry in entries:
+        f.write(",\n" if count else "\n")
+        f.write(textwrap.indent(json.dumps(entry, indent=2), "  "))
+        count += 1
+    f.write("\n]" if count else "]")
+
+
+def _profile_path(path: str) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.profile{ext or '.json'}"
+
+
+def write_report(
+    findings: Iterable[Tuple[str, Issue, Dict[str, Any]]],
+    path: str = "review.json",
+    snippet_table: bool = False,
+    profile: Optional[Dict[str, Any]] = None,
+):
+    """
+    Write (file, issue, ai/fix) findings as a JSON report. Entries are
+    built and written one at a time, never as a whole payload.
+
+    By default the report is the indented flat list of entries, each
+    located by its line and columns and carrying its own `code_snippet`.
+    With `snippet_table` it is {"issues": [...], "snippets": {id:
+    {"text", "span"}}}, one issue or snippet per line, each issue naming
+    its snippet by id so code quoted by several issues is stored once,
+    along with where in the file it lives.
+
+    `profile` (--profile timings) is a "profile" key of the snippet
+    table; next to a flat list, which has nowhere to put it, it is
+    written to `<name>.profile.json` instead.
+    """
+    if not snippet_table:
+        with open(path, "w", encoding="utf-8") as f:
+            _write_list(f, (
+                {**issue.to_dict(), "file": file, **extra}
+                for file, issue, extra in findings
+            ))
+        if profile is not None:
+            with open(_profile_path(path), "w", encoding="utf-8") as f:
+                json.dump(profile, f, indent=2)
+        return
+
+    snippets = SnippetTable()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"issues": [')
+        count = 0
+        for file, issue, extra in findings:
+            entry = issue.to_dict(snippets)
+            entry["file"] = file
+            entry.update(extra)
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(entry))
+            count += 1
+
+        f.write('\n], "snippets": {')
+        for n, (snippet_id, snippet) in enumerate(snippets.to_dict().items()):
+            f.write(",\n" if n else "\n")
+            f.write(f"{json.dumps(snippet_id)}: {json.dumps(snippet)}")
+        f.write("\n}")
+        if profile is not None:
+            f.write(',\n"profile": ')
+            f.write(json.dumps(profile))
+        f.write("}\n")
@@ -0,0 +1,43 @@
+"""
+Per-function complexity metrics export, for tracking hotspots across
+runs. `.csv` paths get one row per function; anything else gets
+{"functions": [...]} with one function per line, so successive exports
+diff cleanly.
+"""
+
+import csv
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+COLUMNS = (
+    "file", "name", "line", "end_line",
+    "cyclomatic", "cognitive", "nesting", "loop_depth", "recursion", "big_o",
+)
+
+
+def write_metrics(
+    files: Iterable[Tuple[str, List[Dict[str, Any]]]],
+    path: str = "metrics.json",
+):
+    """
+    Write (file, per-function metrics) pairs, in the order given.
+    """
+    rows = (
+        {"file": file, **metrics}
+        for file, functions in files
+        for metrics in functions
+    )
+
+    if path.endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"functions": [')
+        for n, row in enumerate(rows):
+            f.write(",\n" if n else "\n")
+            f.write(json.dumps(row))
+        f.write("\n]}\n")
@@ -0,0 +1,88 @@
+"""
+Newline-delimited JSON output, one record per line, written as results
+are produced:
+
+    {"type": "snippet", "id": "s0", "text": ..., "span": [...]}
+    {"type": "issue", "id": 0, "file": ..., "line": ..., "snippet": "s0", ...}
+    {"type": "enrichment", "id": 0, "ai": {...} | null, "fix": ... | null}
+    {"type": "error", "file": ..., "message": ...}
+    {"type": "metrics", "file": ..., "functions": [{...}, ...]}
+    {"type": "profile", "stages": {name: {"count", "wall_s", "cpu_s", ...}}}
+    {"type": "summary", "files": ..., "issues": ..., "errors": ...}
+
+A snippet record precedes the first issue quoting that code in each
+file; its span (absent when the code is no region of the file, e.g. a
+bare name) says where the code lives. Enrichment records refer back to their issue by id. Issues arrive
+in completion order; the summary is always the last line.
+"""
+
+import json
+import threading
+from typing import Any, Dict, List, Optional, TextIO
+from core.snippets import SnippetTable
+from core.types import Issue
+
+
+class NDJSONWriter:
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.issues = 0
+        self.errors = 0
+        self.snippets = SnippetTable()
+        self._file: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, separators=(",", ":"))
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def issue(self, issue: Issue, path: str) -> int:
+        """
+        Write a static finding; returns the id later enrichment records
+        use to refer to it. Called from one thread only.
+        """
+        if path != self._file:
+            # A file's issues arrive together; snippets are not shared
+            # across files, so only the current file's are remembered.
+            self._file = path
+            self.snippets.clear()
+
+        if issue.snippet not in self.snippets:
+            snippet_id = self.snippets.ref(issue.snippet)
+            self._write({"type": "snippet", "id": snippet_id, **issue.snippet.to_dict()})
+
+        issue_id = self.issues
+        self.issues += 1
+        entry = issue.to_dict(self.snippets)
+        entry["file"] = path
+        self._write({"type": "issue", "id": issue_id, **entry})
+        return issue_id
+
+    def enrichment(self, issue_id: int, data: Dict[str, Any]):
+        self._write({
+            "type": "enrichment",
+            "id": issue_id,
+            "ai": data.get("ai"),
+            "fix": data.get("fix"),
+        })
+
+    def metrics(self, path: str, functions: List[Dict[str, Any]]):
+        self._write({"type": "metrics", "file": path, "functions": functions})
+
+    def error(self, path: str, message: str):
+        with self._lock:
+            self.errors += 1
+        self._write({"type": "error", "file": path, "message": message})
+
+    def profile(self, stages: Dict[str, Dict[str, Any]]):
+        self._write({"type": "profile", "stages": stages})
+
+    def summary(self, files: int):
+        self._write({
+            "type": "summary",
+            "files": files,
+            "issues": self.issues,
+            "errors": self.errors,
+        })
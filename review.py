@@ -1,87 +1,465 @@
 import os
+import sys
 import argparse
-import json
-from typing import List
-from core.parser import parse_file
-from core.types import Issue, ReviewResult
-from analyzers import (
-    complexity,
-    patterns,
-    security,
-    unused,
-    performance,
-    logic,
-    style,
-)
+from typing import Any, Dict, List, Optional, Tuple
+from analyzers import ruleset_version
+from core import profiling
+from core.batch import collect_files, iter_reviews, measure_path, review_files
+from core.cache import DEFAULT_CACHE_DIR, IssueCache
+from core.config import CONFIG_NAME, Config, ConfigError
+from core.diff import DiffError, Hunks, git_hunks, read_hunks
+from core.parse_cache import ParseCache
+from core.project import ProjectIndex, project_root, summarize_path
+from core.server import ReviewServer
+from core.types import Issue
+from llm.cache import DEFAULT_TTL, CachedModelCall, ResponseCache
 from llm.client import LLMClient
-from llm.ollama_client import ollama_call
+from llm.enrich import DEFAULT_CONCURRENCY, enrich
+from llm.ollama_client import BACKENDS, OLLAMA_HOST, make_model_call
+from output.json_report import write_report
+from output.metrics import write_metrics
+from output.stream import NDJSONWriter
 
-def run_analyzers(parsed) -> List[Issue]:
-    issues: List[Issue] = []
+MODEL = "deepseek-coder:6.7b"
+DEFAULT_TIMEOUT = 120.0
 
-    for fn in parsed["functions"]:
-        issues.extend(complexity.analyze(fn))
-        issues.extend(patterns.analyze(fn))
-        issues.extend(security.analyze(fn))
-        issues.extend(unused.analyze(fn))
-        issues.extend(performance.analyze(fn))
-        issues.extend(logic.analyze(fn))
-        issues.extend(style.analyze(fn))
 
-    return issues
+def make_llm(args, responses: Optional[ResponseCache] = None) -> LLMClient:
+    model_call = make_model_call(
+        MODEL,
+        backend=args.llm_backend,
+        host=args.ollama_host,
+        timeout=args.ai_timeout,
+        keep_alive=args.keep_alive,
+        pool_size=args.ai_concurrency,
+    )
+    return LLMClient(
+        model_call=CachedModelCall(model_call, MODEL, cache=responses)
+    )
+
+
+def open_cache(args):
+    if args.no_cache:
+        return None
+    return IssueCache(
+        args.cache_dir,
+        ruleset=ruleset_version(),
+        enrichment_ttl=args.llm_cache_ttl,
+    )
+
+
+def open_parse_cache(args):
+    if not args.parse_cache:
+        return None
+    return ParseCache(args.cache_dir, max_bytes=args.parse_cache_size * 1024 * 1024)
+
+
+def open_response_cache(args):
+    if args.no_cache or args.no_ai:
+        return None
+    return ResponseCache(args.cache_dir, ttl=args.llm_cache_ttl)
+
+
+def collect_changes(args, config: Config) -> Tuple[List[str], Hunks]:
+    """
+    For --diff-base / --diff: the changed Python files (narrowed to the
+    given paths, if any) and their changed lines.
+    """
+    hunks = git_hunks(args.diff_base) if args.diff_base else read_hunks(args.diff)
+    paths = [
+        path for path in hunks
+        if path.endswith(".py") and os.path.isfile(path) and not config.excluded(path)
+    ]
+    if args.paths or args.files_from:
+        wanted = {
+            os.path.abspath(path)
+            for path in collect_files(args.paths, args.files_from, config)
+        }
+        paths = [path for path in paths if os.path.abspath(path) in wanted]
+    return sorted(paths), hunks
+
+
+def review_project(
+    args,
+    cache: Optional[IssueCache],
+    digests: Dict[str, str],
+    summaries: Dict[str, Dict[str, Any]],
+) -> List[Tuple[str, Issue]]:
+    """
+    Import-graph findings for the reviewed files, in path order.
+    """
+    def summary(path: str) -> Dict[str, Any]:
+        found = summaries.get(path)
+        if found is None and cache is not None:
+            found = cache.get_summary(digests[path])
+        if found is None:
+            found = summarize_path(path, cache, digests[path])
+        return found
+
+    index = ProjectIndex(
+        None if args.no_cache else args.cache_dir,
+        project_root(digests),
+        ruleset=ruleset_version(),
+    )
+    with index:
+        results = index.update(digests, summary)
+    return [(path, issue) for path in sorted(results) for issue in results[path]]
+
+
+def serve(args, config: Config):
+    responses = open_response_cache(args)
+    server = ReviewServer(
+        cache=open_cache(args),
+        config=config,
+        llm=None if args.no_ai else make_llm(args, responses),
+        model=MODEL,
+        ai_concurrency=args.ai_concurrency,
+        ai_timeout=args.ai_timeout,
+        ai_batch=not args.no_batch,
+    )
+    try:
+        server.serve()
+    finally:
+        if responses is not None:
+            responses.close()
+
 
 def main():
     parser = argparse.ArgumentParser(description="AI-powered code review")
-    parser.add_argument("file", help="Path to Python file to review")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="Python files, directories or glob patterns to review",
+    )
+    parser.add_argument(
+        "--files-from",
+        metavar="LIST",
+        help="Read additional paths from LIST, one per line ('-' for stdin)",
+    )
+    changes = parser.add_mutually_exclusive_group()
+    changes.add_argument(
+        "--diff-base",
+        metavar="REV",
+        help="Review only what changed since REV (e.g. origin/main): the "
+             "changed files, the functions touching changed lines, and the "
+             "findings on them",
+    )
+    changes.add_argument(
+        "--diff",
+        metavar="PATH",
+        help="Like --diff-base, with the changes read from a unified diff "
+             "('-' for stdin); paths are relative to the current directory",
+    )
+    parser.add_argument(
+        "--config",
+        metavar="PATH",
+        help=f"Base settings, refined by any {CONFIG_NAME} in the reviewed "
+             "directories and their parents",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes for static analysis (default: CPU count)",
+    )
     parser.add_argument(
         '--json',
         action="store_true",
         help="Emit JSON output"
     )
-    # parser.add_argument(
-    #     "--no-ai",
-    #     action="store_true",
-    #     help="Disable AI explanations",
-    # )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write newline-delimited JSON records as results are produced",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        metavar="PATH",
+        help="Where to write --json (default: review.json next to this "
+             "script) or --stream (default: stdout) output",
+    )
+    parser.add_argument(
+        "--snippet-table",
+        action="store_true",
+        help="With --json, write {\"issues\": [...], \"snippets\": {...}}, "
+             "naming each issue's code by id in a shared snippet table, "
+             "instead of a flat list with the code snippet on every entry",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="Also write complexity metrics for every function to PATH "
+             "(CSV if it ends in .csv, JSON otherwise)",
+    )
+    parser.add_argument(
+        "--project",
+        action="store_true",
+        help="Also check imports across the reviewed files: modules and "
+             "public names nothing uses, and circular imports",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time each pipeline stage, analyzer rule and model call; print "
+             "a summary to stderr and add it to --json / --stream output",
+    )
+    parser.add_argument(
+        "--profile-trace",
+        metavar="PATH",
+        help="Also write the profiled stages as a Chrome trace to PATH "
+             "(implies --profile)",
+    )
+    parser.add_argument(
+        "--no-ai",
+        action="store_true",
+        help="Disable AI explanations",
+    )
+    parser.add_argument(
+        "--ai-concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum model requests in flight at once",
+    )
+    parser.add_argument(
+        "--ai-timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Seconds before a single model request is abandoned",
+    )
+    parser.add_argument(
+        "--no-batch",
+        action="store_true",
+        help="Send one prompt per issue instead of batching issues that "
+             "share the same code",
+    )
+    parser.add_argument(
+        "--llm-backend",
+        choices=BACKENDS,
+        default="auto",
+        help="How to reach Ollama: HTTP API, 'ollama run' subprocess, "
+             "or HTTP with subprocess fallback (default)",
+    )
+    parser.add_argument(
+        "--ollama-host",
+        default=OLLAMA_HOST,
+        help="Ollama server URL for the HTTP backend",
+    )
+    parser.add_argument(
+        "--keep-alive",
+        default="30m",
+        help="How long Ollama keeps the model loaded after a request",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for the persistent analysis cache",
+    )
+    parser.add_argument(
+        "--llm-cache-ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help="Seconds a cached model response or AI enrichment stays valid "
+             "(default: 7 days)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the analysis cache",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        action="store_true",
+        help="Also keep parsed modules in the cache directory, so unchanged "
+             "files are not re-parsed when rules or settings change",
+    )
+    parser.add_argument(
+        "--parse-cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="Size bound of the parse cache (default: 256)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a long-lived JSON-RPC server on stdin/stdout",
+    )
 
     args = parser.parse_args()
 
-    parsed = parse_file(args.file)
-    issues = run_analyzers(parsed)
+    profiler = None
+    if args.profile or args.profile_trace:
+        profiler = profiling.start(trace=args.profile_trace is not None)
 
-    results: List[dict] = []
+    diff_mode = args.diff_base is not None or args.diff is not None
+    if diff_mode and args.project:
+        # The project index needs every file of the project in the run.
+        parser.error("--project cannot be combined with --diff-base / --diff")
 
-    llm = LLMClient(
-        model_call=lambda prompt, system=None: ollama_call(
-            prompt, system, model="deepseek-coder:6.7b"
-        )
-    )
+    hunks: Optional[Hunks] = None
+    try:
+        config = Config(args.config)
+        if args.serve:
+            serve(args, config)
+            return
+        # Loads every config file the run touches.
+        with profiling.stage("collect"):
+            if diff_mode:
+                paths, hunks = collect_changes(args, config)
+            else:
+                paths = collect_files(args.paths, args.files_from, config)
+    except (ConfigError, DiffError) as e:
+        parser.error(str(e))
+
+    # A change without Python files has nothing to review.
+    if not paths and not diff_mode:
+        parser.error("no Python files to review")
+
+    cache = open_cache(args)
+    parse_cache = open_parse_cache(args)
+    responses = open_response_cache(args)
+
+    writer = None
+    if args.stream:
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        writer = NDJSONWriter(out)
+
+    found: List[Tuple[str, Issue]] = []
+    # AI review / fix per finding, filled in by enrichment
+    extras: List[Dict[str, Any]] = []
+    # For --project: content hash and summary of every file analyzed
+    digests: Dict[str, str] = {}
+    summaries: Dict[str, Dict[str, Any]] = {}
+    # For --metrics: per-function metrics of every file analyzed
+    metrics: Dict[str, List[Dict[str, Any]]] = {}
+    failed = False
+
+    try:
+        if writer is None:
+            file_results = review_files(
+                paths, args.jobs, cache, config, parse_cache, hunks,
+                metrics=bool(args.metrics), project=args.project,
+            )
+        else:
+            file_results = iter_reviews(
+                paths, args.jobs, cache, config, parse_cache, hunks,
+                metrics=bool(args.metrics), project=args.project,
+            )
+
+        for file_result in file_results:
+            if file_result.error:
+                failed = True
+                print(f"{file_result.path}: {file_result.error}", file=sys.stderr)
+                if writer is not None:
+                    writer.error(file_result.path, file_result.error)
+                continue
+
+            if args.metrics:
+                functions = file_result.metrics
+                if functions is None and cache is not None:
+                    functions = cache.get_metrics(file_result.digest)
+                if functions is None:
+                    functions = measure_path(file_result.path, parse_cache, cache)
+                metrics[file_result.path] = functions
+                if writer is not None:
+                    writer.metrics(file_result.path, functions)
+
+            if args.project:
+                digests[file_result.path] = file_result.digest
+                if file_result.summary is not None:
+                    summaries[file_result.path] = file_result.summary
+
+            for issue in file_result.issues:
+                if writer is not None:
+                    writer.issue(issue, file_result.path)
+                    if args.no_ai:
+                        # Nothing left to do with it; keep memory flat.
+                        continue
+                # Streamed ids are assigned in this same order, so a
+                # finding's index doubles as its id.
+                found.append((file_result.path, issue))
+
+        if digests:
+            with profiling.stage("project"):
+                project = review_project(args, cache, digests, summaries)
+            if writer is not None:
+                for path, issue in project:
+                    writer.issue(issue, path)
+                    if not args.no_ai:
+                        found.append((path, issue))
+            else:
+                found.extend(project)
+                # Stable: each file's own findings stay ahead of its project ones.
+                found.sort(key=lambda entry: entry[0])
+
+        if not args.no_ai:
+            extras = [{} for _ in found]
+            with profiling.stage("enrich"):
+                enrich(
+                    extras,
+                    [issue for _, issue in found],
+                    make_llm(args, responses),
+                    MODEL,
+                    cache,
+                    concurrency=args.ai_concurrency,
+                    timeout=args.ai_timeout,
+                    batch=not args.no_batch,
+                    on_result=writer.enrichment if writer is not None else None,
+                )
+    finally:
+        with profiling.stage("cache_close"):
+            if cache is not None:
+                cache.close()
+            if parse_cache is not None:
+                parse_cache.close()
+            if responses is not None:
+                responses.close()
+
+    # The report carries every stage recorded so far; writing it is
+    # only in the printed summary.
+    stages = profiler.to_dict() if profiler is not None else None
 
-    for issue in issues:
-        entry = issue.to_dict()
-        results.append(entry)
+    with profiling.stage("report"):
+        if args.metrics:
+            write_metrics(
+                ((path, metrics[path]) for path in sorted(metrics)),
+                args.metrics,
+            )
 
-    for entry, issue in zip(results, issues):
-        ai_review = llm.review_issue(issue)
-        fix = llm.generate_fix(issue)
+        if writer is not None:
+            if stages is not None:
+                writer.profile(stages)
+            writer.summary(files=len(paths))
+            if writer.stream is not sys.stdout:
+                writer.stream.close()
+        elif args.json:
+            OUTPUT_PATH = args.output or os.path.join(
+                os.path.dirname(os.path.abspath(__file__)),
+                "review.json"
+            )
+            write_report(
+                (
+                    (path, issue, extras[n] if extras else {})
+                    for n, (path, issue) in enumerate(found)
+                ),
+                OUTPUT_PATH,
+                snippet_table=args.snippet_table,
+                profile={"stages": stages} if stages is not None else None,
+            )
+        else:
+            multi = len(paths) > 1
+            for path, issue in found:
+                where = f"{path}: " if multi else ""
+                print(f"[{issue.category}] {where}Line {issue.line}: {issue.message}")
 
-        if ai_review:
-            entry["ai"] = ai_review.to_dict()
-        if fix:
-            entry["fix"] = fix
+    if profiler is not None:
+        profiler.print_table()
+        if args.profile_trace:
+            profiler.write_trace(args.profile_trace)
 
-    if args.json:
-        OUTPUT_PATH = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            "review.json"
-        )
-        with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2)
-    else:
-        for r in results:
-            print(f"[{r['category']}] Line {r['line']}: {r['message']}")
-    
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
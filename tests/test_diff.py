@@ -0,0 +1,145 @@
+import pytest
+
+from core.diff import DiffError, overlaps, parse_diff, touched
+from core.types import Issue, Snippet
+
+
+def _git(path: str, *hunks: str, old: str = None) -> str:
+    old = old or path
+    return (
+        f"diff --git a/{old} b/{path}\n"
+        f"--- a/{old}\n"
+        f"+++ b/{path}\n"
+        + "".join(hunks)
+    )
+
+
+@pytest.mark.parametrize("text, expected", [
+    # One line replaced: the removal marks the line before it too.
+    (_git("m.py", "@@ -3 +3 @@\n-old\n+new\n"), {"m.py": [(2, 3)]}),
+    # Lines added, with context around them
+    (
+        _git("m.py", "@@ -4,2 +4,4 @@\n ctx\n+one\n+two\n ctx\n"),
+        {"m.py": [(5, 6)]},
+    ),
+    # Pure deletion: the header names the line before the gap.
+    (_git("m.py", "@@ -5,2 +4,0 @@\n-gone\n-gone\n"), {"m.py": [(4, 5)]}),
+    # Deletion at the start of the file
+    (_git("m.py", "@@ -1,2 +0,0 @@\n-gone\n-gone\n"), {"m.py": [(1, 1)]}),
+    # Deletion at the end of a 10-line file
+    (_git("m.py", "@@ -11,2 +10,0 @@\n-gone\n-gone\n"), {"m.py": [(10, 11)]}),
+    # New file
+    (
+        "diff --git a/new.py b/new.py\nnew file mode 100644\n--- /dev/null\n"
+        "+++ b/new.py\n@@ -0,0 +1,3 @@\n+a\n+b\n+c\n",
+        {"new.py": [(1, 3)]},
+    ),
+    # Deleted file: nothing left to review
+    (
+        "diff --git a/old.py b/old.py\ndeleted file mode 100644\n--- a/old.py\n"
+        "+++ /dev/null\n@@ -1,2 +0,0 @@\n-a\n-b\n",
+        {},
+    ),
+    # "\ No newline at end of file" belongs to neither side.
+    (
+        _git("m.py", "@@ -2 +2 @@\n-old\n\\ No newline at end of file\n+new\n"
+             "\\ No newline at end of file\n"),
+        {"m.py": [(1, 2)]},
+    ),
+    # Renamed and edited: the new name
+    (
+        "diff --git a/old.py b/new.py\nsimilarity index 90%\nrename from old.py\n"
+        "rename to new.py\n--- a/old.py\n+++ b/new.py\n@@ -7,0 +8 @@\n+added\n",
+        {"new.py": [(8, 8)]},
+    ),
+    # Renamed only: no changed lines
+    (
+        "diff --git a/old.py b/new.py\nsimilarity index 100%\nrename from old.py\n"
+        "rename to new.py\n",
+        {},
+    ),
+    # An added line that looks like a file header is still content.
+    (
+        _git("m.py", "@@ -1,0 +2,2 @@\n+++ not a header\n+--- nor this\n"),
+        {"m.py": [(2, 3)]},
+    ),
+    # Several hunks and files; adjacent lines merge into one range.
+    (
+        _git("a.py", "@@ -1 +1,2 @@\n-x\n+y\n+z\n", "@@ -20,0 +22 @@\n+w\n")
+        + _git("b.py", "@@ -3,0 +4 @@\n+v\n"),
+        {"a.py": [(1, 2), (22, 22)], "b.py": [(4, 4)]},
+    ),
+    # Outside git, paths are kept as written.
+    (
+        "--- x.py.orig\n+++ b/x.py\n@@ -1 +1 @@\n-a\n+b\n",
+        {"b/x.py": [(1, 1)]},
+    ),
+])
+def test_parse_diff(text, expected):
+    assert parse_diff(text) == expected
+
+
+def test_parse_diff_rejects_malformed_hunk():
+    with pytest.raises(DiffError):
+        parse_diff(_git("m.py", "@@ nonsense @@\n+a\n"))
+
+
+RANGES = [(2, 4), (8, 8), (12, 15)]
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (1, 1, False),
+    (1, 2, True),
+    (3, 3, True),
+    (4, 7, True),
+    (5, 7, False),
+    (8, 8, True),
+    (5, 9, True),
+    (9, 11, False),
+    (11, 12, True),
+    (15, 30, True),
+    (16, 30, False),
+    (1, 30, True),
+])
+def test_overlaps(start, end, expected):
+    assert overlaps(RANGES, start, end) is expected
+
+
+def test_overlaps_without_ranges():
+    assert overlaps([], 1, 100) is False
+
+
+def _issue(line, end_line=0, span=None, rule="r"):
+    return Issue(
+        line=line, category="c", rule=rule, message="m",
+        snippet=Snippet("s", span), severity=1, end_line=end_line,
+    )
+
+
+class _Function:
+    def __init__(self, line_no, span):
+        self.line_no = line_no
+        self.span = span
+
+
+def test_touched():
+    ranges = [(10, 12)]
+    body = (5, 0, 20, 8)
+    issues = [
+        _issue(0, rule="unlocated"),
+        _issue(3, rule="before"),
+        _issue(9, 10, rule="reaches_in"),
+        _issue(11, rule="inside"),
+        _issue(13, rule="after"),
+        # About the whole changed function, on its def line
+        _issue(5, 5, span=body, rule="whole"),
+        # On the def line but quoting something else
+        _issue(5, 5, span=(5, 4, 5, 9), rule="def_line"),
+    ]
+    kept = touched(issues, ranges, [_Function(5, body)])
+    assert [i.rule for i in kept] == ["reaches_in", "inside", "whole"]
+
+
+def test_touched_needs_the_function():
+    whole = _issue(5, 5, span=(5, 0, 20, 8))
+    assert touched([whole], [(10, 12)]) == []
@@ -0,0 +1,88 @@
+import pytest
+
+from analyzers import ENGINE, run_analyzers
+from core.incremental import fingerprint, first_line, run_incremental, shift
+from core.parser import CodeParser
+from core.types import Issue, Snippet
+
+
+def _issue(line, end_line=0, span=None):
+    return Issue(
+        line=line, category="c", rule="r", message="m",
+        snippet=Snippet("s", span), severity=1, col=4, end_line=end_line, end_col=9,
+    )
+
+
+@pytest.mark.parametrize("issue, delta, expected", [
+    # Everything located moves; columns stay.
+    (_issue(3, 4, (3, 0, 6, 2)), 10, _issue(13, 14, (13, 0, 16, 2))),
+    (_issue(13, 14, (13, 0, 16, 2)), -10, _issue(3, 4, (3, 0, 6, 2))),
+    # Line 0 means "no location" and stays put.
+    (_issue(0, 0, None), 5, _issue(0, 0, None)),
+    # So does an unset end line.
+    (_issue(7, 0, None), -2, _issue(5, 0, None)),
+    # A snippet that is no source region has no span to move.
+    (_issue(2, 2, None), 3, _issue(5, 5, None)),
+])
+def test_shift(issue, delta, expected):
+    assert shift([issue], delta) == [expected]
+
+
+def test_shift_by_zero_copies():
+    issues = [_issue(3, 3)]
+    shifted = shift(issues, 0)
+    assert shifted == issues
+    assert shifted is not issues
+
+
+SOURCE = '''\
+import os
+
+
+@decorator
+def first(cmd):
+    os.system(cmd)
+    for a in range(3):
+        for b in range(3):
+            print(a, b)
+
+
+def second(x):
+    unused = 1
+    return eval(x)
+'''
+
+
+def test_reused_results_land_on_the_same_lines():
+    # Issues stored relative to each function and shifted back after the
+    # code moved must match a fresh analysis of the moved code.
+    stored = {}
+
+    def lookup(key):
+        return stored.get(key)
+
+    _, fresh = run_incremental(CodeParser(SOURCE).parse(), ENGINE.run, lookup)
+    stored.update(fresh)
+
+    moved = "# header\n\n\n" + SOURCE.replace("import os\n", "import os\nimport sys\n")
+    parsed = CodeParser(moved).parse()
+    issues, fresh = run_incremental(parsed, ENGINE.run, lookup)
+
+    assert fresh == {}
+    key = lambda i: (i.line, i.col, i.rule, i.message)
+    expected = run_analyzers(CodeParser(moved).parse())
+    assert any(issue.span is not None for issue in expected)
+    assert sorted(issues, key=key) == sorted(expected, key=key)
+
+
+def test_first_line_counts_decorators():
+    parsed = CodeParser(SOURCE).parse()
+    first, second = parsed["functions"]
+    assert (first_line(first), first.line_no) == (4, 5)
+    assert first_line(second) == second.line_no == 12
+
+
+def test_fingerprint_ignores_position_and_trailing_whitespace():
+    original = CodeParser("def f(x):\n    return x\n").parse()["functions"][0]
+    moved = CodeParser("\n\ndef f(x):   \n    return x\n").parse()["functions"][0]
+    assert fingerprint(original) == fingerprint(moved)
@@ -0,0 +1,191 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm import ollama_client
+from llm.ollama_client import OllamaHTTPClient, make_model_call
+
+
+class _Stub(BaseHTTPRequestHandler):
+    # Records each request body on the server and answers with
+    # `server.reply`: (status, body lines).
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.server.requests.append(json.loads(self.rfile.read(length)))
+
+        status, lines = self.server.reply
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for line in lines:
+            self.wfile.write(line.encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    server.requests = []
+    server.reply = (200, [json.dumps({"response": "ok", "done": True})])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _host(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def stalled_port():
+    # A listener that never accepts, its backlog already full: further
+    # connects hang until they time out.
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    pending = []
+    for _ in range(3):
+        client = socket.socket()
+        client.setblocking(False)
+        client.connect_ex(("127.0.0.1", port))
+        pending.append(client)
+    try:
+        yield port
+    finally:
+        for client in pending:
+            client.close()
+        listener.close()
+
+
+def test_forwards_keep_alive_options_and_system(stub):
+    client = OllamaHTTPClient(
+        "m", host=_host(stub), keep_alive="5m", options={"temperature": 0}
+    )
+    assert client("prompt", "system") == "ok"
+    client.close()
+
+    sent = stub.requests[0]
+    assert sent["model"] == "m"
+    assert sent["prompt"] == "prompt"
+    assert sent["system"] == "system"
+    assert sent["keep_alive"] == "5m"
+    assert sent["options"] == {"temperature": 0}
+    assert sent["stream"] is False
+
+
+def test_omits_unset_keep_alive_and_options(stub):
+    client = OllamaHTTPClient("m", host=_host(stub), keep_alive=None)
+    client("prompt")
+    client.close()
+
+    sent = stub.requests[0]
+    assert "keep_alive" not in sent
+    assert "options" not in sent
+    assert "system" not in sent
+
+
+def test_assembles_streamed_chunks(stub):
+    stub.reply = (200, [
+        json.dumps({"response": "Hel", "done": False}),
+        "",
+        json.dumps({"response": "lo ", "done": False}),
+        json.dumps({"response": "world", "done": False}),
+        json.dumps({"response": "", "done": True}),
+    ])
+    tokens = []
+    client = OllamaHTTPClient(
+        "m", host=_host(stub), stream=True, on_token=tokens.append
+    )
+    assert client("prompt") == "Hello world"
+    client.close()
+
+    assert tokens == ["Hel", "lo ", "world"]
+    assert stub.requests[0]["stream"] is True
+
+
+def test_stream_error_chunk_raises(stub):
+    stub.reply = (200, [
+        json.dumps({"response": "partial", "done": False}),
+        json.dumps({"error": "model crashed"}),
+    ])
+    client = OllamaHTTPClient("m", host=_host(stub), stream=True)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        client("prompt")
+    client.close()
+
+
+def test_non_200_raises_with_body(stub):
+    stub.reply = (404, [json.dumps({"error": "model 'm' not found"})])
+    client = OllamaHTTPClient("m", host=_host(stub))
+    with pytest.raises(RuntimeError, match="404"):
+        client("prompt")
+    client.close()
+
+
+def test_http_backend_surfaces_refused_connection():
+    call = make_model_call("m", backend="http", host=f"http://127.0.0.1:{_closed_port()}")
+    with pytest.raises(ollama_client.requests.ConnectionError):
+        call("prompt")
+
+
+def test_auto_backend_falls_back_once_refused(monkeypatch):
+    calls = []
+
+    def fake_run(prompt, system, model="MODEL", timeout=None):
+        calls.append((prompt, system, model))
+        return "from subprocess"
+
+    monkeypatch.setattr(ollama_client, "ollama_call", fake_run)
+    call = make_model_call("m", backend="auto", host=f"http://127.0.0.1:{_closed_port()}")
+
+    assert call("one", "sys") == "from subprocess"
+    # Later calls go straight to the subprocess.
+    assert call("two") == "from subprocess"
+    assert calls == [("one", "sys", "m"), ("two", "", "m")]
+
+
+def test_auto_backend_keeps_http_errors(stub):
+    stub.reply = (500, ["boom"])
+    call = make_model_call("m", backend="auto", host=_host(stub))
+    # Only an unreachable server triggers the fallback.
+    with pytest.raises(RuntimeError, match="500"):
+        call("prompt")
+
+
+def test_auto_backend_keeps_http_after_connect_timeout(monkeypatch, stalled_port, stub):
+    calls = []
+    monkeypatch.setattr(
+        ollama_client, "ollama_call", lambda *args, **kwargs: calls.append(args)
+    )
+    call = make_model_call(
+        "m", backend="auto", host=f"http://127.0.0.1:{stalled_port}", timeout=0.3
+    )
+
+    # A slow connect (say, while a model loads) is a timeout, not a
+    # missing server.
+    with pytest.raises(ollama_client.requests.ConnectTimeout):
+        call("prompt")
+    assert calls == []
+
+    # HTTP is still used once the server answers.
+    call.http.url = call.http.url.replace(str(stalled_port), str(stub.server_address[1]))
+    assert call("prompt") == "ok"
+    assert calls == []
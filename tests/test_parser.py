@@ -0,0 +1,22 @@
+import pytest
+
+from core.parser import CodeParser
+
+
+def _function(source: str, name: str):
+    parsed = CodeParser(source).parse()
+    return next(fn for fn in parsed["functions"] if fn.name == name)
+
+
+@pytest.mark.parametrize("source, name, col, name_end", [
+    ("def f(x):\n    return x\n", "f", 0, 5),
+    ("async def a(y):\n    return y\n", "a", 0, 11),
+    ("async   def\tdef_(y):\n    return y\n", "def_", 0, 16),
+    ("class C:\n    def d(self):\n        pass\n", "d", 4, 9),
+    ("@wrap\ndef e():\n    pass\n", "e", 0, 5),
+    ("def défaut():\n    pass\n", "défaut", 0, 11),
+    ("def \\\n  g():\n    pass\n", "g", 0, 5),
+])
+def test_name_end(source, name, col, name_end):
+    fn = _function(source, name)
+    assert (fn.col, fn.name_end) == (col, name_end)
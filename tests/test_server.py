@@ -0,0 +1,53 @@
+import io
+
+from core.server import ReviewServer
+
+
+def _server() -> ReviewServer:
+    return ReviewServer(stdin=io.StringIO(), stdout=io.StringIO())
+
+
+def test_notifications_do_not_share_tokens():
+    server = _server()
+    first, a = server._track(None, "a.py")
+    second, b = server._track(None, "b.py")
+
+    # A newer review of a.py cancels only the older review of a.py.
+    third, a_again = server._track(None, "a.py")
+    assert a.is_set()
+    assert not b.is_set()
+    assert not a_again.is_set()
+
+    # Finishing one notification leaves the others tracked.
+    server._untrack(None, first, "a.py")
+    assert server._tokens == {second: b, third: a_again}
+    assert server._latest == {"a.py": third, "b.py": second}
+
+
+def test_cancel_finds_review_by_request_id():
+    server = _server()
+    _, token = server._track(7, "a.py")
+    _, other = server._track(None, "b.py")
+
+    server._dispatch({"jsonrpc": "2.0", "method": "cancel", "params": {"id": 7}})
+    assert token.is_set()
+    assert not other.is_set()
+
+
+def test_cancel_of_unknown_id_is_ignored():
+    server = _server()
+    _, token = server._track(None, "a.py")
+
+    server._dispatch({"jsonrpc": "2.0", "method": "cancel", "params": {"id": None}})
+    assert not token.is_set()
+
+
+def test_reused_request_id_cancels_newest():
+    server = _server()
+    old_serial, old = server._track(1, "a.py")
+    _, new = server._track(1, "b.py")
+
+    # The older review finishing must not forget the newer one's id.
+    server._untrack(1, old_serial, "a.py")
+    server._dispatch({"jsonrpc": "2.0", "method": "cancel", "params": {"id": 1}})
+    assert new.is_set()
@@ -0,0 +1,41 @@
+import pickle
+
+from analyzers import run_analyzers
+from core.parser import CodeParser
+from core.snippets import SnippetTable, pack_issues, unpack_issues
+from core.types import Issue
+
+SOURCE = '''\
+def long_one(a, b, c, d, e, f, g):
+    unused = 1
+    return eval(a)
+'''
+
+
+def _issues():
+    return run_analyzers(CodeParser(SOURCE).parse())
+
+
+def test_function_issues_share_one_lazy_snippet():
+    issues = [i for i in _issues() if i.span == (1, 0, 3, 18)]
+    assert len(issues) > 1
+    assert len({id(i.snippet) for i in issues}) == 1
+    # Not sliced out of the file until something reads it
+    assert issues[0].snippet._text is None
+    assert issues[0].code_snippet == SOURCE.rstrip("\n")
+
+
+def test_sharing_survives_pickle_and_cache_payloads():
+    issues = _issues()
+    for copied in (pickle.loads(pickle.dumps(issues)), unpack_issues(pack_issues(issues))):
+        assert copied == issues
+        assert len({id(i.snippet) for i in copied}) == len({id(i.snippet) for i in issues})
+
+
+def test_snippet_table_round_trip():
+    issues = _issues()
+    table = SnippetTable()
+    entries = [issue.to_dict(table) for issue in issues]
+    assert all("span" not in entry for entry in entries)
+    assert len(table.to_dict()) < len(issues)
+    assert [Issue.from_dict(entry, table) for entry in entries] == issues
@@ -1,5 +1,5 @@
 import * as vscode from "vscode";
-import { runReview } from "./runner";
+import { runReview, stopServer } from "./runner";
 
 // Cache: file → diagnostics
 const diagnosticsByFile = new Map<string, vscode.Diagnostic[]>();
@@ -118,4 +118,6 @@ export function activate(context: vscode.ExtensionContext) {
   );
 }
 
-export function deactivate() {}
+export function deactivate() {
+  stopServer();
+}
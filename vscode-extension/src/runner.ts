@@ -1,41 +1,132 @@
-import { exec } from "child_process";
+import { spawn, ChildProcessWithoutNullStreams } from "child_process";
+import * as readline from "readline";
 import * as vscode from "vscode";
 import * as fs from "fs";
 import * as path from "path";
 
+// Issue columns are UTF-8 byte offsets, as in Python's ast module;
+// VS Code positions count UTF-16 code units.
+function toCharacter(text: string, byteOffset: number): number {
+  if (/^[\x00-\x7f]*$/.test(text)) {
+    return Math.min(byteOffset, text.length);
+  }
+  return Buffer.from(text, "utf8")
+    .subarray(0, byteOffset)
+    .toString("utf8").length;
+}
+
 function computeRange(
   document: vscode.TextDocument,
-  line: number,
-  snippet?: string
+  item: any
 ): vscode.Range {
-  const textLine = document.lineAt(line - 1).text;
-
-  // Try exact snippet match (best effort)
-  if (snippet) {
-    const clean = snippet.trim().split("\n")[0];
-    const idx = textLine.indexOf(clean);
-    if (idx !== -1) {
-      return new vscode.Range(
-        line - 1,
-        idx,
-        line - 1,
-        idx + clean.length
-      );
-    }
+  const line = item.line - 1;
+  const textLine = document.lineAt(line).text;
+
+  // Older results carry no end position: underline the whole line
+  if (!item.end_line) {
+    return new vscode.Range(line, 0, line, textLine.length);
   }
 
-  // Fallback: underline first meaningful token
-  const match = textLine.match(/[A-Za-z_][A-Za-z0-9_]*/);
-  if (match && match.index !== undefined) {
-    return new vscode.Range(
-      line - 1,
-      match.index,
-      line - 1,
-      match.index + match[0].length
+  const endLine = Math.min(item.end_line - 1, document.lineCount - 1);
+  return document.validateRange(
+    new vscode.Range(
+      line,
+      toCharacter(textLine, item.col ?? 0),
+      endLine,
+      toCharacter(document.lineAt(endLine).text, item.end_col ?? 0)
+    )
+  );
+}
+
+// JSON-RPC error code for a request superseded by a newer one
+const REQUEST_CANCELLED = -32800;
+
+type Pending = {
+  resolve: (result: any) => void;
+  reject: (error: any) => void;
+  onStatic?: (issues: any[]) => void;
+};
+
+let server: ChildProcessWithoutNullStreams | undefined;
+let nextId = 1;
+const pending = new Map<number, Pending>();
+
+function getServer(): ChildProcessWithoutNullStreams {
+  if (server) return server;
+
+  const reviewScript = path.join(
+    __dirname,
+    "..",
+    "..",
+    "review.py"
+  );
+
+  const proc = spawn("python", [reviewScript, "--serve"]);
+
+  readline
+    .createInterface({ input: proc.stdout })
+    .on("line", line => {
+      let message: any;
+      try {
+        message = JSON.parse(line);
+      } catch {
+        console.error("AI Code Review: bad server output", line);
+        return;
+      }
+
+      // Static results arrive before AI enrichment
+      if (message.method === "review/static") {
+        pending.get(message.params.id)?.onStatic?.(message.params.issues);
+        return;
+      }
+
+      const entry = pending.get(message.id);
+      if (!entry) return;
+      pending.delete(message.id);
+
+      if (message.error) {
+        entry.reject(message.error);
+      } else {
+        entry.resolve(message.result);
+      }
+    });
+
+  proc.stderr.on("data", data => console.error(String(data)));
+
+  proc.on("exit", () => {
+    server = undefined;
+    for (const entry of pending.values()) {
+      entry.reject({ message: "review server exited" });
+    }
+    pending.clear();
+  });
+
+  server = proc;
+  return proc;
+}
+
+function request(
+  method: string,
+  params: any,
+  onStatic?: (issues: any[]) => void
+): Promise<any> {
+  const proc = getServer();
+  const id = nextId++;
+
+  return new Promise((resolve, reject) => {
+    pending.set(id, { resolve, reject, onStatic });
+    proc.stdin.write(
+      JSON.stringify({ jsonrpc: "2.0", id, method, params }) + "\n"
     );
-  }
+  });
+}
 
-  return new vscode.Range(line - 1, 0, line - 1, 1);
+export function stopServer() {
+  if (!server) return;
+  server.stdin.write(
+    JSON.stringify({ jsonrpc: "2.0", id: nextId++, method: "shutdown" }) + "\n"
+  );
+  server.stdin.end();
 }
 
 export function runReview(
@@ -48,9 +139,12 @@ export function runReview(
 
   const stat = fs.statSync(filePath);
   const cached = reviewCache.get(filePath);
+  const document = vscode.workspace.textDocuments.find(
+    d => d.uri.fsPath === uri.fsPath
+  );
 
   // Reuse cached results if unchanged
-  if (cached && cached.mtime === stat.mtimeMs) {
+  if (cached && cached.mtime === stat.mtimeMs && !document?.isDirty) {
     applyDiagnostics(uri, cached.data, diagnostics, diagnosticsByFile);
     vscode.window.setStatusBarMessage(
       "AI Code Review (cached)",
@@ -59,49 +153,31 @@ export function runReview(
     return;
   }
 
-  const reviewScript = path.join(
-    __dirname,
-    "..",
-    "..",
-    "review.py"
-  );
-
-  exec(
-    `python "${reviewScript}" "${filePath}" --json`,
-    (err, stdout, stderr) => {
-      if (err) {
-        vscode.window.showErrorMessage("AI Code Review failed");
-        console.error(stderr);
-        return;
-      }
-
-      const jsonPath = path.join(
-        path.dirname(reviewScript),
-        "review.json"
-      );
-
-      if (!fs.existsSync(jsonPath)) {
-        vscode.window.showErrorMessage(
-          "AI Code Review produced no output"
-        );
-        return;
-      }
-
-      const data = JSON.parse(
-        fs.readFileSync(jsonPath, "utf-8")
-      );
-
+  // Send the buffer itself so unsaved edits are reviewed too
+  request(
+    "review",
+    { path: filePath, text: document?.getText() },
+    issues => applyDiagnostics(uri, issues, diagnostics, diagnosticsByFile)
+  ).then(
+    result => {
       reviewCache.set(filePath, {
         mtime: stat.mtimeMs,
-        data,
+        data: result.issues,
       });
 
-      applyDiagnostics(uri, data, diagnostics, diagnosticsByFile);
+      applyDiagnostics(uri, result.issues, diagnostics, diagnosticsByFile);
 
       vscode.window.setStatusBarMessage(
         "AI Code Review completed",
         3000
       );
+    },
+    error => {
+      // Superseded by a newer review of the same file
+      if (error?.code === REQUEST_CANCELLED) return;
+
+      vscode.window.showErrorMessage("AI Code Review failed");
+      console.error(error?.message ?? error);
     }
   );
 }
@@ -122,11 +198,9 @@ function applyDiagnostics(
   for (const item of data) {
     if (!item.line || item.line < 1) continue;
 
-    const range = computeRange(
-      document,
-      item.line,
-      item.code_snippet
-    );
+    if (item.line > document.lineCount) continue;
+
+    const range = computeRange(document, item);
 
     const severity =
       item.severity >= 5